@@ -4,15 +4,97 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'asdf#FGSgvasgf$5$WGT'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Apply pending schema migrations in create_app; turn off to run `flask migrate` as a deploy step
+    MIGRATE_ON_STARTUP = os.environ.get('MIGRATE_ON_STARTUP', 'true').lower() == 'true'
+    
     # Stripe configuration
     STRIPE_PUBLISHABLE_KEY = os.environ.get('STRIPE_PUBLISHABLE_KEY') or 'pk_test_...'
     STRIPE_SECRET_KEY = os.environ.get('STRIPE_SECRET_KEY') or 'sk_test_...'
     STRIPE_WEBHOOK_SECRET = os.environ.get('STRIPE_WEBHOOK_SECRET') or 'whsec_...'
+    
+    # Sales tax charged on an order's subtotal, computed on the server at checkout
+    ORDER_TAX_RATE = float(os.environ.get('ORDER_TAX_RATE', 0.08))
+    
+    # Private directory (mode 700) where a deployment's workers exchange order update events;
+    # required outside debug and testing
+    EVENT_BROKER_DIR = os.environ.get('EVENT_BROKER_DIR')
+    
+    # Rendered restaurant and menu responses kept per worker
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 1000))
+    RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 300))
+    
+    # Object cache: a per-worker LRU in front of a store shared by all workers
+    CACHE_SHARED_BACKEND = os.environ.get('CACHE_SHARED_BACKEND', 'file')  # "redis", "file" or "none"
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    # SQLite file for the "file" backend, created with mode 600. Outside debug and testing the app
+    # refuses to start without a shared store; CACHE_SHARED_BACKEND=none opts out explicitly
+    CACHE_STORE_PATH = os.environ.get('CACHE_STORE_PATH')
+    CACHE_LOCAL_MAX_ENTRIES = int(os.environ.get('CACHE_LOCAL_MAX_ENTRIES', 5000))
+    CACHE_LOCAL_TTL = int(os.environ.get('CACHE_LOCAL_TTL', 30))
+    CACHE_SHARED_TTL = int(os.environ.get('CACHE_SHARED_TTL', 300))
+    
+    # Web worker processes on this host; gunicorn.conf.py sets WEB_CONCURRENCY for its workers
+    WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 1))
+    
+    # Password hashing runs in per-worker process pools. Processes and pending hashes are
+    # totals for the host, split between the WEB_CONCURRENCY workers; 0 workers hashes inline
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 32))
+    PASSWORD_HASH_TIMEOUT = int(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
+    
+    # Negotiated gzip/brotli compression of API responses; brotli needs the brotli package
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+    COMPRESS_GZIP_LEVEL = int(os.environ.get('COMPRESS_GZIP_LEVEL', 6))
+    COMPRESS_BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY', 4))
+    
+    # Browser cache lifetime of static files without a content hash in their name
+    STATIC_MAX_AGE = int(os.environ.get('STATIC_MAX_AGE', 3600))
+    
+    # Per-request SQL statistics: repeated SELECTs are logged as likely N+1 (0 disables),
+    # and query count and database time are sent in a Server-Timing header
+    SQL_N_PLUS_ONE_THRESHOLD = int(os.environ.get('SQL_N_PLUS_ONE_THRESHOLD', 10))
+    SQL_SERVER_TIMING = os.environ.get('SQL_SERVER_TIMING', 'true').lower() == 'true'
+    
+    # Statements slower than SQL_SLOW_QUERY_MS (0 disables) are logged with their plan,
+    # once per statement every SQL_SLOW_QUERY_WINDOW seconds; ANALYZE re-runs SELECTs
+    SQL_SLOW_QUERY_MS = int(os.environ.get('SQL_SLOW_QUERY_MS', 200))
+    SQL_SLOW_QUERY_WINDOW = int(os.environ.get('SQL_SLOW_QUERY_WINDOW', 300))
+    SQL_SLOW_QUERY_EXPLAIN = os.environ.get('SQL_SLOW_QUERY_EXPLAIN', 'true').lower() == 'true'
+    SQL_SLOW_QUERY_EXPLAIN_ANALYZE = os.environ.get('SQL_SLOW_QUERY_EXPLAIN_ANALYZE', 'false').lower() == 'true'
+    
+    # Logging: records are queued and written by a background thread, so requests never wait on disk
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    LOG_FILE = os.environ.get('LOG_FILE', 'app.log')
+    LOG_FILE_FORMAT = os.environ.get('LOG_FILE_FORMAT', 'json')  # "json" or "text"
+    LOG_MAX_BYTES = int(os.environ.get('LOG_MAX_BYTES', 10 * 1024 * 1024))
+    LOG_BACKUP_COUNT = int(os.environ.get('LOG_BACKUP_COUNT', 5))
+    LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+    # Fraction of requests whose INFO logs are kept, per endpoint
+    LOG_INFO_SAMPLE_RATES = os.environ.get(
+        'LOG_INFO_SAMPLE_RATES',
+        'restaurant.get_restaurants=0.1,order_tracking.get_order_tracking=0.1'
+    )
+    
+    # Metrics: a deployment's workers share snapshots through this directory, which must be
+    # set outside debug and testing; /metrics requires "Authorization: Bearer <METRICS_TOKEN>"
+    # when a token is set
+    METRICS_DIR = os.environ.get('METRICS_DIR')
+    METRICS_FLUSH_INTERVAL = int(os.environ.get('METRICS_FLUSH_INTERVAL', 5))
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    
+    # On-demand sampling profiler; collapsed stacks and summaries are written to PROFILE_DIR
+    PROFILE_DIR = os.environ.get('PROFILE_DIR')
+    PROFILE_INTERVAL_MS = int(os.environ.get('PROFILE_INTERVAL_MS', 5))
+    PROFILE_MAX_SECONDS = int(os.environ.get('PROFILE_MAX_SECONDS', 60))
+    PROFILE_MAX_CONCURRENT = int(os.environ.get('PROFILE_MAX_CONCURRENT', 2))
 
 class DevelopmentConfig(Config):
     DEBUG = True
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         f"sqlite:///{os.path.join(os.path.dirname(__file__), 'src', 'database', 'app.db')}"
+    CACHE_STORE_PATH = os.environ.get('CACHE_STORE_PATH') or \
+        os.path.join(os.path.dirname(__file__), 'src', 'database', 'cache.db')
 
 class ProductionConfig(Config):
     DEBUG = False
@@ -22,6 +104,8 @@ class ProductionConfig(Config):
 class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    CACHE_SHARED_BACKEND = 'none'
+    PASSWORD_HASH_WORKERS = 0
 
 config = {
     'development': DevelopmentConfig,
@@ -0,0 +1,81 @@
+"""Setup shared by the benchmark scripts: an app on a throwaway database, seed data and timing summaries"""
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LOG_FILE', '')
+
+# Registered before the app's own exit hooks, so it runs after they flush into the directory
+_workdirs = []
+atexit.register(lambda: [shutil.rmtree(path, ignore_errors=True) for path in _workdirs])
+
+from config import TestingConfig
+from src.main import create_app
+from src.models.user import User, UserType, db
+from src.models.restaurant import Restaurant
+from src.models.menu_item import MenuItem
+import statistics
+
+def create_bench_app(database_url=None, **settings):
+    """The testing app on a SQLite file in a temporary directory, or on database_url.
+
+    settings override TestingConfig attributes, e.g. PASSWORD_HASH_WORKERS=4.
+    """
+    workdir = tempfile.mkdtemp(prefix='super_delivery_bench_')
+    _workdirs.append(workdir)
+    overrides = {
+        'SQLALCHEMY_DATABASE_URI': database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        'EVENT_BROKER_DIR': os.path.join(workdir, 'events'),
+        'PROFILE_DIR': os.path.join(workdir, 'profiles'),
+        'METRICS_DIR': os.path.join(workdir, 'metrics'),
+        'SQL_SLOW_QUERY_MS': 0,
+        **settings
+    }
+    for name, value in overrides.items():
+        setattr(TestingConfig, name, value)
+    return create_app('testing')
+
+def make_user(name, user_type, password_hash='unused'):
+    return User(
+        username=name,
+        email=f'{name}@example.com',
+        password_hash=password_hash,
+        first_name=name.title(),
+        last_name='Bench',
+        user_type=user_type
+    )
+
+def seed_restaurant(menu_items=30, name='Bench Kitchen', cuisine_type='Pizza', owner=None):
+    """A restaurant with an owner and menu_items available dishes; returns the restaurant"""
+    if owner is None:
+        owner = make_user(f'owner{db.session.query(User.id).count() + 1}', UserType.RESTAURANT_OWNER)
+        db.session.add(owner)
+        db.session.flush()
+    restaurant = Restaurant(name=name, address='1 Main St', cuisine_type=cuisine_type, owner_id=owner.id)
+    db.session.add(restaurant)
+    db.session.flush()
+    db.session.add_all([
+        MenuItem(name=f'Dish {number}', price=8.0 + number % 10, restaurant_id=restaurant.id, is_available=True)
+        for number in range(menu_items)
+    ])
+    db.session.commit()
+    return restaurant
+
+def summarize(latencies_ms):
+    """p50/p95/p99/max of a list of millisecond timings"""
+    if not latencies_ms:
+        return 'no samples'
+    ordered = sorted(latencies_ms)
+    cuts = statistics.quantiles(ordered, n=100, method='inclusive') if len(ordered) > 1 else ordered * 99
+    return f"p50 {cuts[49]:.1f} ms, p95 {cuts[94]:.1f} ms, p99 {cuts[98]:.1f} ms, max {ordered[-1]:.1f} ms"
+
+def query_count(response):
+    """Statements the request ran, from its Server-Timing header"""
+    header = response.headers.get('Server-Timing', '')
+    marker = 'desc="'
+    if marker not in header:
+        return None
+    return int(header.split(marker, 1)[1].split(' ', 1)[0])
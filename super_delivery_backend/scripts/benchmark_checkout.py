@@ -0,0 +1,70 @@
+"""Load test of checkout: large orders posted at a fixed rate
+
+Seeds a restaurant whose menu has one dish per order line, then posts orders
+naming every dish at --rate orders per second for --seconds from a pool of
+--threads clients. Sends are scheduled up front, so a slow server shows up as
+latency rather than as fewer requests. Run from super_delivery_backend:
+
+    python scripts/benchmark_checkout.py [--rate 200] [--seconds 10] [--lines 30]
+"""
+from bench_app import create_bench_app, make_user, query_count, seed_restaurant, summarize
+from concurrent.futures import ThreadPoolExecutor
+from src.models.user import UserType, db
+import argparse
+import threading
+import time
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rate', type=float, default=200, help='orders per second')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--lines', type=int, default=30, help='lines per order')
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--database-url', help='defaults to a temporary SQLite file')
+    args = parser.parse_args()
+
+    app = create_bench_app(args.database_url)
+    with app.app_context():
+        customer = make_user('bench_customer', UserType.CUSTOMER)
+        db.session.add(customer)
+        db.session.commit()
+        restaurant = seed_restaurant(menu_items=args.lines)
+        payload = {
+            'customer_id': customer.id,
+            'restaurant_id': restaurant.id,
+            'delivery_address': '2 Side St',
+            'tip_amount': 5,
+            'items': [{'menu_item_id': item.id, 'quantity': 1} for item in restaurant.menu_items]
+        }
+
+    clients = threading.local()
+    results = []
+
+    def checkout(due):
+        client = getattr(clients, 'client', None) or app.test_client()
+        clients.client = client
+        response = client.post('/api/orders', json=payload)
+        # Measured from the scheduled send, so time spent queued for a free thread counts
+        results.append((response.status_code, (time.perf_counter() - due) * 1000, query_count(response)))
+
+    total = int(args.rate * args.seconds)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as pool:
+        for number in range(total):
+            due = started + number / args.rate
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(checkout, due)
+    elapsed = time.perf_counter() - started
+
+    created = [latency for status, latency, _ in results if status == 201]
+    queries = {count for status, _, count in results if status == 201}
+    print(f"{total} orders of {args.lines} lines offered at {args.rate:.0f}/s")
+    print(f"created {len(created)} ({len(results) - len(created)} failed) in {elapsed:.1f} s: "
+          f"{len(created) / elapsed:.0f} orders/s")
+    print(f"latency {summarize(created)}")
+    print(f"statements per order: {', '.join(str(count) for count in sorted(queries, key=str))}")
+
+if __name__ == '__main__':
+    main()
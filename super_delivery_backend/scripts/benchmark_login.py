@@ -0,0 +1,87 @@
+"""Login burst benchmark: sign-in throughput and the latency of other requests meanwhile
+
+Seeds users whose passwords are hashed with PASSWORD_HASH_METHOD, then runs
+--login-threads clients signing in and --read-threads clients listing
+restaurants for --seconds. Compare --hash-workers 0 (hashing inline in the
+request thread) with the default pool. Run from super_delivery_backend:
+
+    python scripts/benchmark_login.py [--hash-workers 0] [--seconds 5]
+"""
+from bench_app import create_bench_app, make_user, seed_restaurant, summarize
+from collections import Counter
+from src.models.user import UserType, db
+from src.utils.hashing import password_hasher
+from werkzeug.security import generate_password_hash
+import argparse
+import os
+import threading
+import time
+
+PASSWORD = 'correct horse battery staple'
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--hash-workers', type=int, default=os.cpu_count() or 1,
+                        help='hashing processes; 0 hashes inline')
+    parser.add_argument('--max-pending', type=int, default=32)
+    parser.add_argument('--login-threads', type=int, default=8)
+    parser.add_argument('--read-threads', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--users', type=int, default=50)
+    args = parser.parse_args()
+
+    app = create_bench_app(PASSWORD_HASH_WORKERS=args.hash_workers, PASSWORD_HASH_MAX_PENDING=args.max_pending)
+    with app.app_context():
+        # Hashed once and reused, so seeding takes one key derivation rather than one per user
+        password_hash = generate_password_hash(PASSWORD, password_hasher.method)
+        users = [make_user(f'bench{number}', UserType.CUSTOMER, password_hash) for number in range(args.users)]
+        db.session.add_all(users)
+        db.session.commit()
+        emails = [user.email for user in users]
+        seed_restaurant(menu_items=5)
+
+    stop = threading.Event()
+    logins = Counter()
+    login_latencies = []
+    read_latencies = []
+
+    def sign_in(number):
+        client = app.test_client()
+        while not stop.is_set():
+            started = time.perf_counter()
+            response = client.post('/api/auth/login', json={
+                'email': emails[number % len(emails)], 'password': PASSWORD
+            })
+            login_latencies.append((time.perf_counter() - started) * 1000)
+            logins[response.status_code] += 1
+            number += args.login_threads
+
+    def read():
+        client = app.test_client()
+        while not stop.is_set():
+            started = time.perf_counter()
+            client.get('/api/restaurants')
+            read_latencies.append((time.perf_counter() - started) * 1000)
+
+    # Start the pool before timing, so process startup is not measured
+    with app.app_context():
+        password_hasher.verify(password_hash, PASSWORD)
+
+    threads = [threading.Thread(target=sign_in, args=(number,)) for number in range(args.login_threads)]
+    threads += [threading.Thread(target=read) for _ in range(args.read_threads)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    password_hasher.shutdown()
+
+    mode = f'{args.hash_workers} hashing processes' if args.hash_workers else 'inline hashing'
+    print(f"{mode}, {args.login_threads} login and {args.read_threads} read threads for {args.seconds:.0f} s")
+    print(f"logins: {sum(logins.values()) / args.seconds:.1f}/s, by status {dict(sorted(logins.items()))}, "
+          f"latency {summarize(login_latencies)}")
+    print(f"reads: {len(read_latencies) / args.seconds:.1f}/s, latency {summarize(read_latencies)}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""Order listing benchmark: memory and latency of GET /api/orders over a large table
+
+Bulk-inserts --orders orders for one restaurant, then times the default page,
+a keyset page deep in the list and a full NDJSON stream. The process RSS is
+sampled while the stream is read. --legacy also loads every order with .all()
+and to_dict(), as the endpoint used to, for comparison; it needs several GB
+for a million orders. RSS is read from /proc, so run it on Linux, from
+super_delivery_backend:
+
+    python scripts/benchmark_orders_listing.py [--orders 1000000] [--requests 50] [--legacy]
+"""
+from bench_app import create_bench_app, make_user, query_count, seed_restaurant, summarize
+from datetime import datetime, timedelta
+from src.models.user import UserType, db
+from src.models.order import Order, OrderStatus
+from src.utils.pagination import encode_cursor
+from sqlalchemy import insert
+import argparse
+import os
+import time
+
+STATUSES = [OrderStatus.DELIVERED] * 8 + [OrderStatus.CANCELLED, OrderStatus.PREPARING]
+
+def rss_mb():
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+
+def seed(count, batch_size=20000):
+    """count orders of one customer at one restaurant, a minute apart; returns the restaurant id"""
+    customer = make_user('bench_customer', UserType.CUSTOMER)
+    db.session.add(customer)
+    db.session.commit()
+    restaurant_id = seed_restaurant(menu_items=1).id
+
+    started = datetime(2020, 1, 1)
+    for start in range(0, count, batch_size):
+        rows = []
+        for number in range(start, min(start + batch_size, count)):
+            created_at = started + timedelta(minutes=number)
+            rows.append({
+                'order_number': f'L{number:010d}',
+                'status': STATUSES[number % len(STATUSES)],
+                'customer_id': customer.id,
+                'restaurant_id': restaurant_id,
+                'delivery_address': '2 Side St',
+                'subtotal': 20.0,
+                'tax_amount': 1.6,
+                'total_amount': 24.59,
+                'created_at': created_at,
+                'updated_at': created_at,
+                'event_seq': 0
+            })
+        db.session.execute(insert(Order), rows)
+        db.session.commit()
+    return restaurant_id
+
+def time_requests(client, url, requests):
+    latencies = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = client.get(url)
+        latencies.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200, response.get_data(as_text=True)[:200]
+    return latencies, query_count(response)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--orders', type=int, default=1000000)
+    parser.add_argument('--requests', type=int, default=50, help='requests per page measurement')
+    parser.add_argument('--per-page', type=int, default=50)
+    parser.add_argument('--legacy', action='store_true', help='also time loading every order with .all()')
+    parser.add_argument('--database-url', help='defaults to a temporary SQLite file')
+    args = parser.parse_args()
+
+    app = create_bench_app(args.database_url)
+    client = app.test_client()
+    with app.app_context():
+        started = time.perf_counter()
+        restaurant_id = seed(args.orders)
+        print(f"Seeded {args.orders} orders in {time.perf_counter() - started:.1f} s")
+
+        middle = (
+            db.session.query(Order.created_at, Order.id)
+            .order_by(Order.created_at.desc(), Order.id.desc())
+            .offset(args.orders // 2).limit(1).one()
+        )
+        db.session.remove()
+
+    base_url = f'/api/orders?restaurant_id={restaurant_id}&per_page={args.per_page}'
+    for label, url in (
+        ('default page', base_url),
+        ('first keyset page', f'{base_url}&cursor='),
+        ('keyset page halfway down', f'{base_url}&cursor={encode_cursor(middle)}'),
+    ):
+        latencies, queries = time_requests(client, url, args.requests)
+        print(f"{label} ({queries} queries): {summarize(latencies)}")
+
+    baseline = rss_mb()
+    peak = baseline
+    lines = 0
+    started = time.perf_counter()
+    response = client.get(f'/api/orders?restaurant_id={restaurant_id}&format=ndjson', buffered=False)
+    first_line_ms = None
+    for chunk in response.response:
+        if first_line_ms is None:
+            first_line_ms = (time.perf_counter() - started) * 1000
+        lines += 1
+        if lines % 10000 == 0:
+            peak = max(peak, rss_mb())
+    response.close()
+    elapsed = time.perf_counter() - started
+    print(f"ndjson stream: {lines} lines in {elapsed:.1f} s ({lines / elapsed:,.0f} rows/s), "
+          f"first line after {first_line_ms:.1f} ms, RSS +{peak - baseline:.0f} MB at peak")
+
+    if args.legacy:
+        with app.app_context():
+            baseline = rss_mb()
+            started = time.perf_counter()
+            orders = Order.query.filter_by(restaurant_id=restaurant_id).order_by(Order.created_at.desc()).all()
+            payload = app.json.dumps([order.to_dict() for order in orders])
+            print(f".all() + to_dict(): {len(orders)} orders, {len(payload) / 2**20:.0f} MB of JSON "
+                  f"in {time.perf_counter() - started:.1f} s, RSS +{rss_mb() - baseline:.0f} MB")
+
+if __name__ == '__main__':
+    main()
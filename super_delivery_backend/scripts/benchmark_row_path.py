@@ -0,0 +1,100 @@
+"""Benchmark of the row path: select_fields() and serialize_row() against ORM instances
+
+Seeds --rows orders and times a whole list response built from the database
+three ways: ORM instances with to_dict(), ORM instances loaded with
+apply_fieldset() and the compiled serialize(), and plain rows from select_fields() with serialize_row(). Each is
+measured for every field and for a sparse fieldset, with the peak memory
+tracemalloc sees while building the response. Run from super_delivery_backend:
+
+    python scripts/benchmark_row_path.py [--rows 5000] [--repeat 20]
+"""
+from bench_app import create_bench_app, make_user, seed_restaurant
+from datetime import datetime, timedelta
+from flask import jsonify
+from src.models.user import UserType, db
+from src.models.order import Order, OrderStatus
+from src.utils.serialization import apply_fieldset, select_fields, serialize, serialize_row
+from sqlalchemy import insert
+import argparse
+import statistics
+import time
+import tracemalloc
+
+SPARSE_FIELDS = ('id', 'order_number', 'status', 'total_amount', 'created_at')
+
+def seed(count):
+    customer = make_user('bench_customer', UserType.CUSTOMER)
+    db.session.add(customer)
+    db.session.commit()
+    restaurant_id = seed_restaurant(menu_items=1).id
+    started = datetime(2024, 1, 1)
+    db.session.execute(insert(Order), [
+        {
+            'order_number': f'R{number:08d}',
+            'status': OrderStatus.DELIVERED,
+            'customer_id': customer.id,
+            'restaurant_id': restaurant_id,
+            'delivery_address': '2 Side St',
+            'customer_phone': '555-0100',
+            'subtotal': 20.0,
+            'tax_amount': 1.6,
+            'total_amount': 24.59,
+            'created_at': started + timedelta(minutes=number),
+            'updated_at': started + timedelta(minutes=number),
+            'confirmed_at': started + timedelta(minutes=number, seconds=30),
+            'payment_method': 'card',
+            'event_seq': 0
+        }
+        for number in range(count)
+    ])
+    db.session.commit()
+
+def orm_to_dict(fields):
+    orders = Order.query.order_by(Order.id).all()
+    if fields is None:
+        return [order.to_dict() for order in orders]
+    return [{field: value for field, value in order.to_dict().items() if field in fields} for order in orders]
+
+def orm_serialize(fields):
+    query = apply_fieldset(Order.query.order_by(Order.id), Order, fields)
+    return [serialize(order, fields) for order in query.all()]
+
+def row_path(fields):
+    query, fields = select_fields(Order.query.order_by(Order.id), Order, fields)
+    return [serialize_row(row, fields) for row in query.all()]
+
+def measure(app, build, fields, repeat):
+    """Median milliseconds and peak traced MB to fetch, convert and encode the list"""
+    timings = []
+    for _ in range(repeat):
+        db.session.expunge_all()
+        started = time.perf_counter()
+        jsonify(build(fields)).get_data()
+        timings.append((time.perf_counter() - started) * 1000)
+
+    db.session.expunge_all()
+    tracemalloc.start()
+    jsonify(build(fields)).get_data()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), peak / 2**20
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--database-url', help='defaults to a temporary SQLite file')
+    args = parser.parse_args()
+
+    app = create_bench_app(args.database_url)
+    with app.app_context(), app.test_request_context():
+        seed(args.rows)
+        for label, fields in (('every field', None), (f'{len(SPARSE_FIELDS)} fields', SPARSE_FIELDS)):
+            results = []
+            for name, build in (('ORM + to_dict', orm_to_dict), ('ORM + serialize', orm_serialize), ('row path', row_path)):
+                elapsed, peak = measure(app, build, fields, args.repeat)
+                results.append(f'{name} {elapsed:.1f} ms / {peak:.1f} MB')
+            print(f"Order x {args.rows}, {label}: " + ', '.join(results))
+
+if __name__ == '__main__':
+    main()
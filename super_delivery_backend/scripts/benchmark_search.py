@@ -0,0 +1,116 @@
+"""Restaurant search benchmark: full-text index against the ILIKE fallback
+
+Seeds --restaurants restaurants with --dishes menu items each, then times
+GET /api/restaurants?search=... with the full-text index and with the
+substring fallback used when no index is available. The fallback does not
+search dishes or match word prefixes, so the match counts printed for each
+mode differ. It also times dish renames, whose commits re-index the
+restaurant through after_flush. Run from super_delivery_backend:
+
+    python scripts/benchmark_search.py [--restaurants 2000] [--dishes 20] [--requests 200]
+"""
+from bench_app import create_bench_app, make_user, summarize
+from src.models.user import UserType, db
+from src.models.restaurant import Restaurant
+from src.models.menu_item import MenuItem
+from src.utils import search
+import argparse
+import itertools
+import time
+
+CUISINES = ['Pizza', 'Sushi', 'Thai', 'Mexican', 'Indian', 'Burgers', 'Vegan', 'Greek']
+WORDS = ['spicy', 'garlic', 'crispy', 'smoked', 'lemon', 'basil', 'truffle', 'ginger', 'chili', 'honey']
+DISHES = ['noodles', 'salad', 'wrap', 'curry', 'taco', 'soup', 'bowl', 'skewer']
+# From selective to one that matches every restaurant through its dish text
+SEARCHES = ['restaurant 1234', 'nothing matches this', 'pizza', 'truffle chili', 'smok', 'garlic', 'dish']
+
+def seed(restaurants, dishes):
+    owner = make_user('owner', UserType.RESTAURANT_OWNER)
+    db.session.add(owner)
+    db.session.flush()
+    for start in range(0, restaurants, 200):
+        batch = [
+            Restaurant(
+                name=f'Restaurant {number}',
+                address='1 Main St',
+                description=f'Family run {CUISINES[number % len(CUISINES)].lower()} kitchen since {1950 + number % 70}',
+                cuisine_type=CUISINES[number % len(CUISINES)],
+                owner_id=owner.id
+            )
+            for number in range(start, min(start + 200, restaurants))
+        ]
+        db.session.add_all(batch)
+        db.session.flush()
+        # Each restaurant uses three of the flavour words, so a flavour matches about 30% of them
+        db.session.add_all([
+            MenuItem(
+                name=f'{WORDS[(restaurant.id + number % 3) % len(WORDS)].title()} {DISHES[number % len(DISHES)]}',
+                description=f'House dish {number}',
+                price=8.0 + number % 10,
+                restaurant_id=restaurant.id
+            )
+            for restaurant in batch
+            for number in range(dishes)
+        ])
+        db.session.commit()
+
+def time_searches(client, requests):
+    """Latencies and match count of each search term, requested in turn"""
+    results = {term: ([], None) for term in SEARCHES}
+    for _, term in zip(range(requests), itertools.cycle(SEARCHES)):
+        started = time.perf_counter()
+        response = client.get('/api/restaurants', query_string={'search': term, 'per_page': 20})
+        latencies, _ = results[term]
+        latencies.append((time.perf_counter() - started) * 1000)
+        results[term] = (latencies, response.get_json()['pagination']['total'])
+    return results
+
+def time_renames(requests):
+    latencies = []
+    dish_ids = [dish_id for (dish_id,) in db.session.query(MenuItem.id).limit(requests)]
+    for number, dish_id in enumerate(dish_ids):
+        started = time.perf_counter()
+        dish = db.session.get(MenuItem, dish_id)
+        dish.name = f'Renamed dish {number}'
+        db.session.commit()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--restaurants', type=int, default=2000)
+    parser.add_argument('--dishes', type=int, default=20)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--database-url', help='run against this database instead of a temporary SQLite file')
+    args = parser.parse_args()
+
+    app = create_bench_app(args.database_url)
+    client = app.test_client()
+    with app.app_context():
+        started = time.perf_counter()
+        seed(args.restaurants, args.dishes)
+        print(f"Seeded {args.restaurants} restaurants with {args.dishes} dishes each in {time.perf_counter() - started:.1f} s")
+
+        backend = search._search_backends.get(db.engine)
+        if not backend:
+            print("No full-text index on this database; only the ILIKE fallback can be measured")
+
+        modes = [(backend, backend)] if backend else []
+        modes.append(('ilike', None))
+        for label, mode_backend in modes:
+            if mode_backend:
+                search._search_backends[db.engine] = mode_backend
+            else:
+                search._search_backends.pop(db.engine, None)
+            print(f"search ({label}):")
+            for term, (latencies, total) in time_searches(client, args.requests).items():
+                print(f"  {term!r:24} {total:>6} matches: {summarize(latencies)}")
+
+            # Renames only re-index while a backend is registered
+            print(f"dish rename commit ({'re-indexed' if mode_backend else 'no index'}): {summarize(time_renames(args.requests))}")
+
+        if backend:
+            search._search_backends[db.engine] = backend
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""Micro-benchmark of encoding model rows into a JSON response
+
+Compares to_dict() with the standard library encoder, to_dict() with orjson,
+and the compiled serializers with orjson, on in-memory rows so only encoding
+is measured. Run from super_delivery_backend:
+
+    python scripts/benchmark_serialization.py [--rows 1000] [--repeat 50]
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LOG_FILE', '')
+
+from datetime import datetime, timedelta
+from flask import jsonify
+from src.main import create_app
+from src.models.menu_item import MenuItem
+from src.models.order import Order, OrderStatus
+from src.utils import serialization
+import argparse
+import statistics
+import time
+
+def make_orders(count):
+    created_at = datetime(2024, 1, 1, 12, 0)
+    return [
+        Order(
+            id=number,
+            order_number=f'B{number:08d}',
+            status=OrderStatus.PREPARING,
+            customer_id=2,
+            delivery_address='2 Side St',
+            customer_phone='555-0100',
+            special_instructions='Leave at the door',
+            restaurant_id=1,
+            driver_id=3,
+            subtotal=20.0,
+            delivery_fee=2.99,
+            tax_amount=1.6,
+            tip_amount=3.0,
+            discount_amount=0.0,
+            total_amount=27.59,
+            created_at=created_at,
+            updated_at=created_at + timedelta(minutes=5),
+            confirmed_at=created_at + timedelta(minutes=1),
+            estimated_delivery_time=created_at + timedelta(minutes=40),
+            payment_method='card',
+            payment_status='paid',
+            payment_transaction_id=f'pi_{number}'
+        )
+        for number in range(1, count + 1)
+    ]
+
+def make_menu_items(count):
+    created_at = datetime(2024, 1, 1, 12, 0)
+    return [
+        MenuItem(
+            id=number,
+            name=f'Dish {number}',
+            description='House special with seasonal vegetables',
+            price=12.5,
+            category='Mains',
+            image_url=f'/static/dishes/{number}.jpg',
+            is_available=True,
+            is_vegetarian=number % 2 == 0,
+            is_vegan=False,
+            is_gluten_free=number % 3 == 0,
+            calories=650,
+            preparation_time=15,
+            ingredients='rice, peppers, onion',
+            allergens='soy',
+            created_at=created_at,
+            updated_at=created_at,
+            restaurant_id=1
+        )
+        for number in range(1, count + 1)
+    ]
+
+def median_ms(repeat, encode):
+    """Median wall time of encode() in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        encode()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+def run(app, rows, repeat):
+    orjson = serialization.orjson
+    to_dict = lambda obj: obj.to_dict()
+    variants = [('to_dict, stdlib', to_dict, None)]
+    if orjson is not None:
+        variants += [('to_dict, orjson', to_dict, orjson), ('serialize, orjson', serialization.serialize, orjson)]
+    else:
+        print("orjson is not installed; only the standard library encoder is measured")
+
+    for name, objects in (('Order', make_orders(rows)), ('MenuItem', make_menu_items(rows))):
+        results = []
+        for label, convert, encoder in variants:
+            serialization.orjson = encoder
+            try:
+                with app.test_request_context():
+                    elapsed = median_ms(repeat, lambda: jsonify([convert(obj) for obj in objects]).get_data())
+            finally:
+                serialization.orjson = orjson
+            results.append(f'{label}: {elapsed:.1f} ms')
+        print(f"{name} x {rows}: " + ', '.join(results))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+    app = create_app('testing')
+    run(app, args.rows, args.repeat)
+
+if __name__ == '__main__':
+    main()
@@ -3,14 +3,16 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
+from flask import Flask
 from flask_cors import CORS
 from src.models.user import User, db
 from src.models.restaurant import Restaurant
 from src.models.menu_item import MenuItem
 from src.models.order import Order
 from src.models.order_item import OrderItem
+from src.models.order_event import OrderEvent
 from src.models.review import Review
+from src.models.rating_aggregate import RatingAggregate
 from src.models.cart import Cart, CartItem
 from src.routes.user import user_bp
 from src.routes.restaurant import restaurant_bp
@@ -20,6 +22,23 @@ from src.routes.error_handler import error_bp
 from src.routes.order_tracking import order_tracking_bp
 from src.routes.auth import auth_bp
 from src.routes.cart import cart_bp
+from src.routes.admin import admin_bp
+from src.routes.metrics import metrics_bp
+from src.utils.search import init_search_index
+from src.utils.events import init_event_broker
+from src.utils.ratings import backfill_ratings_command
+from src.utils.response_cache import init_response_cache
+from src.utils.cache import init_object_cache
+from src.utils.hashing import init_password_hasher
+from src.utils.serialization import init_json
+from src.utils.logging_pipeline import init_logging
+from src.utils.compression import init_compression
+from src.utils.sql_instrumentation import init_sql_instrumentation
+from src.utils.metrics import init_metrics
+from src.utils.static_files import init_static_manifest, serve_static
+from src.utils.profiler import init_profiler
+from src.utils.migrations import init_migrations, migrate_command
+from src.utils.query_plans import check_query_plans_command
 from config import config
 
 def create_app(config_name='development'):
@@ -27,9 +46,14 @@ def create_app(config_name='development'):
     
     # Load configuration
     app.config.from_object(config[config_name])
+    init_logging(app)
+    init_json(app)
     
     # Enable CORS for all routes
     CORS(app)
+    init_compression(app)
+    init_sql_instrumentation(app)
+    init_metrics(app)
     
     # Register blueprints
     app.register_blueprint(user_bp, url_prefix='/api')
@@ -39,28 +63,34 @@ def create_app(config_name='development'):
     app.register_blueprint(order_tracking_bp, url_prefix='/api')
     app.register_blueprint(auth_bp, url_prefix='/api')
     app.register_blueprint(cart_bp, url_prefix='/api')
+    app.register_blueprint(admin_bp, url_prefix='/api')
+    app.register_blueprint(metrics_bp)
     app.register_blueprint(error_bp)
     
     # Initialize database
     db.init_app(app)
-    with app.app_context():
-        db.create_all()
+    init_migrations(app)
+    init_search_index(app)
+    init_event_broker(app)
+    init_response_cache(app)
+    init_object_cache(app)
+    init_password_hasher(app)
+    init_static_manifest(app)
+    init_profiler(app)
+    app.cli.add_command(backfill_ratings_command)
+    app.cli.add_command(migrate_command)
+    app.cli.add_command(check_query_plans_command)
     
     @app.route('/', defaults={'path': ''})
     @app.route('/<path:path>')
     def serve(path):
-        static_folder_path = app.static_folder
-        if static_folder_path is None:
+        if app.static_folder is None:
                 return "Static folder not configured", 404
 
-        if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-            return send_from_directory(static_folder_path, path)
-        else:
-            index_path = os.path.join(static_folder_path, 'index.html')
-            if os.path.exists(index_path):
-                return send_from_directory(static_folder_path, 'index.html')
-            else:
-                return "index.html not found", 404
+        response = serve_static(path)
+        if response is None:
+            return "index.html not found", 404
+        return response
     
     return app
 
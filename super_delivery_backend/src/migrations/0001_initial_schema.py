@@ -0,0 +1,183 @@
+"""Tables as they stood before migrations were introduced
+
+Databases created earlier by db.create_all() already have some of these
+tables, so only missing ones are created and existing data is left alone.
+Columns an older database lacks are added by 0002.
+"""
+from sqlalchemy import (
+    Boolean, Column, DateTime, Enum, Float, ForeignKey, Index, Integer, MetaData, Numeric, String, Table, Text
+)
+
+metadata = MetaData()
+
+Table(
+    'user', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('username', String(80), unique=True, nullable=False),
+    Column('email', String(120), unique=True, nullable=False),
+    Column('password_hash', String(128), nullable=False),
+    Column('first_name', String(50)),
+    Column('last_name', String(50)),
+    Column('phone', String(20)),
+    Column('user_type', Enum('CUSTOMER', 'RESTAURANT_OWNER', 'DRIVER', 'ADMIN', name='usertype'), nullable=False),
+    Column('is_active', Boolean),
+    Column('is_verified', Boolean),
+    Column('profile_image_url', String(200)),
+    Column('created_at', DateTime),
+    Column('last_login', DateTime),
+    Column('driver_license', String(50)),
+    Column('vehicle_type', String(50)),
+    Column('vehicle_plate', String(20)),
+    Column('is_available', Boolean),
+    Column('current_location_lat', Float),
+    Column('current_location_lng', Float),
+    Column('default_address', String(200))
+)
+
+Table(
+    'restaurant', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('name', String(100), nullable=False),
+    Column('description', Text),
+    Column('address', String(200), nullable=False),
+    Column('phone', String(20)),
+    Column('email', String(120)),
+    Column('cuisine_type', String(50)),
+    Column('rating', Float),
+    Column('delivery_fee', Float),
+    Column('minimum_order', Float),
+    Column('estimated_delivery_time', Integer),
+    Column('is_active', Boolean),
+    Column('image_url', String(200)),
+    Column('opening_hours', String(100)),
+    Column('created_at', DateTime),
+    Column('owner_id', Integer, ForeignKey('user.id'), nullable=False)
+)
+
+Table(
+    'menu_item', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('name', String(100), nullable=False),
+    Column('description', Text),
+    Column('price', Float, nullable=False),
+    Column('category', String(50)),
+    Column('image_url', String(200)),
+    Column('is_available', Boolean),
+    Column('is_vegetarian', Boolean),
+    Column('is_vegan', Boolean),
+    Column('is_gluten_free', Boolean),
+    Column('calories', Integer),
+    Column('preparation_time', Integer),
+    Column('ingredients', Text),
+    Column('allergens', Text),
+    Column('created_at', DateTime),
+    Column('updated_at', DateTime),
+    Column('restaurant_id', Integer, ForeignKey('restaurant.id'), nullable=False)
+)
+
+Table(
+    'order', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('order_number', String(20), unique=True, nullable=False),
+    Column('status', Enum(
+        'PENDING', 'CONFIRMED', 'PREPARING', 'READY_FOR_PICKUP', 'OUT_FOR_DELIVERY', 'DELIVERED', 'CANCELLED',
+        name='orderstatus'
+    )),
+    Column('customer_id', Integer, ForeignKey('user.id'), nullable=False),
+    Column('delivery_address', String(200), nullable=False),
+    Column('customer_phone', String(20)),
+    Column('special_instructions', Text),
+    Column('restaurant_id', Integer, ForeignKey('restaurant.id'), nullable=False),
+    Column('driver_id', Integer, ForeignKey('user.id')),
+    Column('subtotal', Float, nullable=False),
+    Column('delivery_fee', Float),
+    Column('tax_amount', Float),
+    Column('tip_amount', Float),
+    Column('discount_amount', Float),
+    Column('total_amount', Float, nullable=False),
+    Column('created_at', DateTime),
+    Column('updated_at', DateTime),
+    Column('confirmed_at', DateTime),
+    Column('estimated_delivery_time', DateTime),
+    Column('delivered_at', DateTime),
+    Column('payment_method', String(50)),
+    Column('payment_status', String(20)),
+    Column('payment_transaction_id', String(100)),
+    Column('event_seq', Integer, nullable=False)
+)
+
+Table(
+    'order_item', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('quantity', Integer, nullable=False),
+    Column('unit_price', Float, nullable=False),
+    Column('total_price', Float, nullable=False),
+    Column('special_instructions', Text),
+    Column('customizations', Text),
+    Column('order_id', Integer, ForeignKey('order.id'), nullable=False),
+    Column('menu_item_id', Integer, ForeignKey('menu_item.id'), nullable=False)
+)
+
+Table(
+    'order_event', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('seq', Integer, nullable=False),
+    Column('status', String(20), nullable=False),
+    Column('source', String(30)),
+    Column('note', Text),
+    Column('created_at', DateTime, nullable=False),
+    Column('order_id', Integer, ForeignKey('order.id'), nullable=False),
+    Index('ix_order_event_order_id_seq', 'order_id', 'seq', unique=True)
+)
+
+Table(
+    'review', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('rating', Integer, nullable=False),
+    Column('comment', Text),
+    Column('food_rating', Integer),
+    Column('delivery_rating', Integer),
+    Column('created_at', DateTime),
+    Column('customer_id', Integer, ForeignKey('user.id'), nullable=False),
+    Column('restaurant_id', Integer, ForeignKey('restaurant.id'), nullable=False),
+    Column('order_id', Integer, ForeignKey('order.id'), nullable=False),
+    Column('driver_id', Integer, ForeignKey('user.id'))
+)
+
+Table(
+    'rating_aggregate', metadata,
+    Column('subject_type', String(20), primary_key=True),
+    Column('subject_id', Integer, primary_key=True),
+    Column('dimension', String(20), primary_key=True),
+    Column('count', Integer, nullable=False),
+    Column('total', Integer, nullable=False),
+    Column('stars_1', Integer, nullable=False),
+    Column('stars_2', Integer, nullable=False),
+    Column('stars_3', Integer, nullable=False),
+    Column('stars_4', Integer, nullable=False),
+    Column('stars_5', Integer, nullable=False)
+)
+
+Table(
+    'carts', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer, ForeignKey('user.id'), nullable=False),
+    Column('restaurant_id', Integer, ForeignKey('restaurant.id'), nullable=False),
+    Column('created_at', DateTime),
+    Column('updated_at', DateTime)
+)
+
+Table(
+    'cart_items', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('cart_id', Integer, ForeignKey('carts.id'), nullable=False),
+    Column('menu_item_id', Integer, ForeignKey('menu_item.id'), nullable=False),
+    Column('quantity', Integer, nullable=False),
+    Column('customizations', Text),
+    Column('price', Numeric(10, 2), nullable=False),
+    Column('created_at', DateTime),
+    Column('updated_at', DateTime)
+)
+
+def upgrade(connection):
+    metadata.create_all(connection, checkfirst=True)
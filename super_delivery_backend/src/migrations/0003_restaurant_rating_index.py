@@ -0,0 +1,28 @@
+"""Index for keyset pages of the restaurant list
+
+The list is filtered on is_active and walked in (coalesce(rating, 0.0), id)
+order, so an index on exactly that expression returns each page without
+sorting the active restaurants. The expression must match RESTAURANT_RATING
+in src/routes/restaurant.py character for character for the planner to use it.
+"""
+from sqlalchemy import Boolean, Column, Float, Index, Integer, MetaData, Table, func, literal_column
+from sqlalchemy.schema import CreateIndex
+
+metadata = MetaData()
+
+restaurant = Table(
+    'restaurant', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('rating', Float),
+    Column('is_active', Boolean)
+)
+
+RATING_INDEX = Index(
+    'ix_restaurant_is_active_rating_id',
+    restaurant.c.is_active,
+    func.coalesce(restaurant.c.rating, literal_column('0.0')),
+    restaurant.c.id
+)
+
+def upgrade(connection):
+    connection.execute(CreateIndex(RATING_INDEX, if_not_exists=True))
@@ -0,0 +1,22 @@
+"""Index for a restaurant's order history, newest first
+
+GET /api/orders?restaurant_id=... pages through every order of a restaurant in
+(created_at, id) order. The kitchen index from 0002 has status between the two,
+so without this one a busy restaurant's orders were sorted on every page.
+"""
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, Table
+from sqlalchemy.schema import CreateIndex
+
+metadata = MetaData()
+
+order = Table(
+    'order', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('restaurant_id', Integer),
+    Column('created_at', DateTime)
+)
+
+HISTORY_INDEX = Index('ix_order_restaurant_id_created_at_id', order.c.restaurant_id, order.c.created_at, order.c.id)
+
+def upgrade(connection):
+    connection.execute(CreateIndex(HISTORY_INDEX, if_not_exists=True))
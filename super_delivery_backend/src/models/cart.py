@@ -5,21 +5,25 @@ class Cart(db.Model):
     __tablename__ = 'carts'
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    restaurant_id = db.Column(db.Integer, db.ForeignKey('restaurants.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    restaurant_id = db.Column(db.Integer, db.ForeignKey('restaurant.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     user = db.relationship('User', backref='carts')
     restaurant = db.relationship('Restaurant', backref='carts')
+    
+    __table_args__ = (
+        db.Index('ix_carts_user_id_restaurant_id', 'user_id', 'restaurant_id'),
+    )
 
 class CartItem(db.Model):
     __tablename__ = 'cart_items'
     
     id = db.Column(db.Integer, primary_key=True)
     cart_id = db.Column(db.Integer, db.ForeignKey('carts.id'), nullable=False)
-    menu_item_id = db.Column(db.Integer, db.ForeignKey('menu_items.id'), nullable=False)
+    menu_item_id = db.Column(db.Integer, db.ForeignKey('menu_item.id'), nullable=False)
     quantity = db.Column(db.Integer, nullable=False, default=1)
     customizations = db.Column(db.Text, default='')
     price = db.Column(db.Numeric(10, 2), nullable=False)
@@ -29,4 +33,8 @@ class CartItem(db.Model):
     # Relationships
     cart = db.relationship('Cart', backref='items')
     menu_item = db.relationship('MenuItem', backref='cart_items')
+    
+    __table_args__ = (
+        db.Index('ix_cart_items_cart_id_menu_item_id', 'cart_id', 'menu_item_id'),
+    )
 
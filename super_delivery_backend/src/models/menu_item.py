@@ -25,6 +25,10 @@ class MenuItem(db.Model):
     
     # Relationships
     order_items = db.relationship('OrderItem', backref='menu_item', lazy=True)
+    
+    __table_args__ = (
+        db.Index('ix_menu_item_restaurant_id_is_available', 'restaurant_id', 'is_available'),
+    )
 
     def __repr__(self):
         return f'<MenuItem {self.name}>'
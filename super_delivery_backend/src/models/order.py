@@ -39,6 +39,7 @@ class Order(db.Model):
     
     # Timing
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     confirmed_at = db.Column(db.DateTime)
     estimated_delivery_time = db.Column(db.DateTime)
     delivered_at = db.Column(db.DateTime)
@@ -48,9 +49,25 @@ class Order(db.Model):
     payment_status = db.Column(db.String(20), default="pending")  # "pending", "completed", "failed"
     payment_transaction_id = db.Column(db.String(100))
     
+    # Sequence number of the latest entry in the order's event log
+    event_seq = db.Column(db.Integer, nullable=False, default=0)
+    
     # Relationships
     order_items = db.relationship('OrderItem', backref='order', lazy=True, cascade='all, delete-orphan')
     reviews = db.relationship('Review', backref='order', lazy=True)
+    events = db.relationship('OrderEvent', backref='order', lazy=True, cascade='all, delete-orphan', order_by='OrderEvent.seq')
+    
+    # Matched to the dashboard queries; created by migrations 0002 and 0004
+    __table_args__ = (
+        db.Index('ix_order_restaurant_id_status_created_at', 'restaurant_id', 'status', 'created_at'),  # kitchen queue
+        db.Index('ix_order_restaurant_id_updated_at', 'restaurant_id', 'updated_at'),  # kitchen delta polling
+        db.Index('ix_order_restaurant_id_created_at_id', 'restaurant_id', 'created_at', 'id'),  # restaurant order history
+        db.Index('ix_order_customer_id_created_at', 'customer_id', 'created_at'),  # order history, active orders
+        db.Index('ix_order_driver_id_status_created_at', 'driver_id', 'status', 'created_at'),  # driver orders, pickup queue
+        db.Index('ix_order_status_created_at', 'status', 'created_at'),
+        db.Index('ix_order_created_at_id', 'created_at', 'id'),  # newest-first listing and keyset pages
+        db.Index('ix_order_payment_transaction_id', 'payment_transaction_id'),  # Stripe webhooks
+    )
 
     def __repr__(self):
         return f'<Order {self.order_number}>'
@@ -73,6 +90,7 @@ class Order(db.Model):
             'discount_amount': self.discount_amount,
             'total_amount': self.total_amount,
             'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             'confirmed_at': self.confirmed_at.isoformat() if self.confirmed_at else None,
             'estimated_delivery_time': self.estimated_delivery_time.isoformat() if self.estimated_delivery_time else None,
             'delivered_at': self.delivered_at.isoformat() if self.delivered_at else None,
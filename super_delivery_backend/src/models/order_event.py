@@ -0,0 +1,33 @@
+from flask_sqlalchemy import SQLAlchemy
+from src.models.user import db
+from datetime import datetime
+
+class OrderEvent(db.Model):
+    """Append-only record of an order's status transitions"""
+    id = db.Column(db.Integer, primary_key=True)
+    seq = db.Column(db.Integer, nullable=False)  # 1, 2, 3... per order
+    status = db.Column(db.String(20), nullable=False)
+    source = db.Column(db.String(30))  # e.g. "order", "tracking", "payment"
+    note = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    # Foreign key to Order
+    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False)
+    
+    __table_args__ = (
+        db.Index('ix_order_event_order_id_seq', 'order_id', 'seq', unique=True),
+    )
+
+    def __repr__(self):
+        return f'<OrderEvent {self.order_id}#{self.seq}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'order_id': self.order_id,
+            'seq': self.seq,
+            'status': self.status,
+            'source': self.source,
+            'note': self.note,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
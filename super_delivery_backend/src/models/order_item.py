@@ -12,6 +12,10 @@ class OrderItem(db.Model):
     # Foreign keys
     order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False)
     menu_item_id = db.Column(db.Integer, db.ForeignKey('menu_item.id'), nullable=False)
+    
+    __table_args__ = (
+        db.Index('ix_order_item_order_id', 'order_id'),
+    )
 
     def __repr__(self):
         return f'<OrderItem {self.id}>'
@@ -0,0 +1,39 @@
+from flask_sqlalchemy import SQLAlchemy
+from src.models.user import db
+
+class RatingAggregate(db.Model):
+    """Running totals of review scores for one restaurant or driver"""
+    subject_type = db.Column(db.String(20), primary_key=True)  # "restaurant" or "driver"
+    subject_id = db.Column(db.Integer, primary_key=True)
+    dimension = db.Column(db.String(20), primary_key=True)  # "rating", "food_rating" or "delivery_rating"
+    
+    count = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    
+    # Histogram of 1-5 star scores
+    stars_1 = db.Column(db.Integer, nullable=False, default=0)
+    stars_2 = db.Column(db.Integer, nullable=False, default=0)
+    stars_3 = db.Column(db.Integer, nullable=False, default=0)
+    stars_4 = db.Column(db.Integer, nullable=False, default=0)
+    stars_5 = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<RatingAggregate {self.subject_type}:{self.subject_id} {self.dimension}>'
+
+    @property
+    def average(self):
+        return round(self.total / self.count, 1) if self.count else None
+
+    def to_dict(self):
+        return {
+            'dimension': self.dimension,
+            'count': self.count,
+            'average': self.average,
+            'histogram': {
+                '1': self.stars_1,
+                '2': self.stars_2,
+                '3': self.stars_3,
+                '4': self.stars_4,
+                '5': self.stars_5
+            }
+        }
@@ -15,6 +15,11 @@ class Review(db.Model):
     restaurant_id = db.Column(db.Integer, db.ForeignKey('restaurant.id'), nullable=False)
     order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False)
     driver_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    
+    __table_args__ = (
+        db.Index('ix_review_restaurant_id', 'restaurant_id'),
+        db.Index('ix_review_order_id', 'order_id'),
+    )
 
     def __repr__(self):
         return f'<Review {self.id}>'
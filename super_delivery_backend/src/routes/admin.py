@@ -0,0 +1,98 @@
+from flask import Blueprint, jsonify, request
+from src.routes.error_handler import APIError, log_error
+from src.routes.auth import current_auth
+from src.utils.cache import object_cache
+from src.utils.hashing import password_hasher
+from src.utils.logging_pipeline import log_pipeline
+from src.utils.profiler import profiler
+import os
+
+admin_bp = Blueprint('admin', __name__)
+
+def require_admin():
+    """Reject the request unless it carries a valid admin token"""
+    payload = current_auth("Authentication required")
+    if payload.get('user_type') != 'admin':
+        raise APIError("Admin access required", 403)
+    
+    return payload
+
+@admin_bp.route('/admin/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """Get object cache hit, miss and eviction counters for this worker"""
+    try:
+        require_admin()
+        
+        return jsonify({
+            'success': True,
+            'cache': object_cache.stats()
+        })
+        
+    except APIError:
+        raise
+    except Exception as e:
+        log_error(f"Error fetching cache stats: {str(e)}", exc_info=True)
+        raise APIError("Failed to fetch cache stats", 500)
+
+@admin_bp.route('/admin/hashing/stats', methods=['GET'])
+def get_hashing_stats():
+    """Get password hashing pool load and queue depth for this worker"""
+    try:
+        require_admin()
+        
+        return jsonify({
+            'success': True,
+            'hashing': password_hasher.stats()
+        })
+        
+    except APIError:
+        raise
+    except Exception as e:
+        log_error(f"Error fetching hashing stats: {str(e)}", exc_info=True)
+        raise APIError("Failed to fetch hashing stats", 500)
+
+@admin_bp.route('/admin/logging/stats', methods=['GET'])
+def get_logging_stats():
+    """Get log queue depth, dropped and sampled-out record counts for this worker"""
+    try:
+        require_admin()
+        
+        return jsonify({
+            'success': True,
+            'logging': log_pipeline.stats()
+        })
+        
+    except APIError:
+        raise
+    except Exception as e:
+        log_error(f"Error fetching logging stats: {str(e)}", exc_info=True)
+        raise APIError("Failed to fetch logging stats", 500)
+
+@admin_bp.route('/admin/profile', methods=['POST'])
+def start_worker_profile():
+    """Sample every thread of the worker serving this request for a few seconds"""
+    try:
+        require_admin()
+        data = request.get_json(silent=True) or {}
+        
+        seconds = data.get('seconds', 10)
+        if not isinstance(seconds, int) or isinstance(seconds, bool) or not 1 <= seconds <= profiler.max_seconds:
+            raise APIError(f"seconds must be a whole number from 1 to {profiler.max_seconds}", 400)
+        
+        name = profiler.start_worker(seconds)
+        if name is None:
+            raise APIError("Too many profiles are already running on this worker", 409)
+        
+        return jsonify({
+            'success': True,
+            'profile': name,
+            'pid': os.getpid(),
+            'seconds': seconds,
+            'directory': profiler.directory
+        }), 202
+        
+    except APIError:
+        raise
+    except Exception as e:
+        log_error(f"Error starting profile: {str(e)}", exc_info=True)
+        raise APIError("Failed to start profile", 500)
@@ -1,10 +1,14 @@
-from flask import Blueprint, request, jsonify, session
-from werkzeug.security import check_password_hash, generate_password_hash
+from flask import Blueprint, g, request, jsonify, session
 from src.models.user import User, db
-from src.routes.error_handler import APIError, log_info, log_error
+from src.routes.error_handler import APIError, log_info, log_error, log_warning
+from src.utils.cache import cached_get
+from src.utils.hashing import password_hasher
+from collections import OrderedDict
 from datetime import datetime, timedelta
 import jwt
 import os
+import threading
+import time
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -12,6 +16,11 @@ auth_bp = Blueprint('auth', __name__)
 JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'super-delivery-secret-key-change-in-production')
 JWT_EXPIRATION_HOURS = 24
 
+# Tokens whose signature was already checked by this worker, until they expire
+VERIFIED_TOKEN_CACHE_SIZE = 10000
+_verified_tokens = OrderedDict()
+_verified_tokens_lock = threading.Lock()
+
 def generate_jwt_token(user_id, user_type):
     """Generate JWT token for user authentication"""
     payload = {
@@ -24,13 +33,55 @@ def generate_jwt_token(user_id, user_type):
 
 def verify_jwt_token(token):
     """Verify JWT token and return user data"""
+    now = time.time()
+    with _verified_tokens_lock:
+        payload = _verified_tokens.get(token)
+        if payload is not None:
+            if payload['exp'] > now:
+                _verified_tokens.move_to_end(token)
+                return dict(payload)
+            del _verified_tokens[token]
+    
     try:
         payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=['HS256'])
-        return payload
     except jwt.ExpiredSignatureError:
         return None
     except jwt.InvalidTokenError:
         return None
+    
+    # Only tokens that expire can be cached; they are dropped once they do
+    if 'exp' in payload:
+        with _verified_tokens_lock:
+            _verified_tokens[token] = payload
+            while len(_verified_tokens) > VERIFIED_TOKEN_CACHE_SIZE:
+                _verified_tokens.popitem(last=False)
+    return dict(payload)
+
+@auth_bp.before_app_request
+def authenticate_request():
+    """Verify the request's bearer token once for every handler that needs it"""
+    token = request.headers.get('Authorization')
+    if token and token.startswith('Bearer '):
+        token = token[7:]  # Remove 'Bearer ' prefix
+    g.auth_token = token
+    g.auth_payload = verify_jwt_token(token) if token else None
+
+def current_auth(missing_message="No token provided"):
+    """Get the verified token payload of the current request"""
+    if not g.get('auth_token'):
+        raise APIError(missing_message, 401)
+    if not g.auth_payload:
+        raise APIError("Invalid or expired token", 401)
+    return g.auth_payload
+
+def current_user():
+    """Get the authenticated user, loading it at most once per request"""
+    payload = current_auth()
+    if 'auth_user' not in g:
+        g.auth_user = cached_get(User, payload['user_id'])
+    if not g.auth_user:
+        raise APIError("User not found", 404)
+    return g.auth_user
 
 @auth_bp.route('/auth/register', methods=['POST'])
 def register():
@@ -65,7 +116,7 @@ def register():
         from src.models.user import UserType
         user = User(
             email=data['email'],
-            password_hash=generate_password_hash(password),
+            password_hash=password_hasher.hash(password),
             first_name=data['first_name'],
             last_name=data['last_name'],
             phone=data.get('phone', ''),
@@ -121,9 +172,16 @@ def login():
             raise APIError("Invalid email or password", 401)
         
         # Check password
-        if not check_password_hash(user.password_hash, password):
+        if not password_hasher.verify(user.password_hash, password):
             raise APIError("Invalid email or password", 401)
         
+        # Upgrade hashes made with older parameters while the password is at hand
+        if password_hasher.needs_rehash(user.password_hash):
+            try:
+                user.password_hash = password_hasher.hash(password)
+            except APIError:
+                log_warning(f"Skipped password rehash for user {user.id}; hashing pool is busy")
+        
         # Update last login
         user.updated_at = datetime.utcnow()
         db.session.commit()
@@ -160,12 +218,9 @@ def logout():
         # In JWT-based authentication, logout is primarily handled on the client side
         # by removing the token. We can log the logout event here.
         
-        token = request.headers.get('Authorization')
-        if token and token.startswith('Bearer '):
-            token = token[7:]  # Remove 'Bearer ' prefix
-            payload = verify_jwt_token(token)
-            if payload:
-                log_info(f"User logged out: user_id={payload['user_id']}")
+        payload = g.get('auth_payload')
+        if payload:
+            log_info(f"User logged out: user_id={payload['user_id']}")
         
         return jsonify({
             'success': True,
@@ -183,21 +238,7 @@ def logout():
 def verify_token():
     """Verify JWT token and return user information"""
     try:
-        token = request.headers.get('Authorization')
-        if not token:
-            raise APIError("No token provided", 401)
-        
-        if token.startswith('Bearer '):
-            token = token[7:]  # Remove 'Bearer ' prefix
-        
-        payload = verify_jwt_token(token)
-        if not payload:
-            raise APIError("Invalid or expired token", 401)
-        
-        # Get user from database
-        user = User.query.get(payload['user_id'])
-        if not user:
-            raise APIError("User not found", 404)
+        user = current_user()
         
         return jsonify({
             'success': True,
@@ -223,16 +264,7 @@ def verify_token():
 def refresh_token():
     """Refresh JWT token"""
     try:
-        token = request.headers.get('Authorization')
-        if not token:
-            raise APIError("No token provided", 401)
-        
-        if token.startswith('Bearer '):
-            token = token[7:]  # Remove 'Bearer ' prefix
-        
-        payload = verify_jwt_token(token)
-        if not payload:
-            raise APIError("Invalid or expired token", 401)
+        payload = current_auth()
         
         # Generate new token
         new_token = generate_jwt_token(payload['user_id'], payload['user_type'])
@@ -254,16 +286,7 @@ def refresh_token():
 def change_password():
     """Change user password"""
     try:
-        token = request.headers.get('Authorization')
-        if not token:
-            raise APIError("No token provided", 401)
-        
-        if token.startswith('Bearer '):
-            token = token[7:]  # Remove 'Bearer ' prefix
-        
-        payload = verify_jwt_token(token)
-        if not payload:
-            raise APIError("Invalid or expired token", 401)
+        user = current_user()
         
         data = request.json
         if not data:
@@ -275,13 +298,8 @@ def change_password():
             if field not in data or not data[field]:
                 raise APIError(f"Missing required field: {field}", 400)
         
-        # Get user
-        user = User.query.get(payload['user_id'])
-        if not user:
-            raise APIError("User not found", 404)
-        
         # Verify current password
-        if not check_password_hash(user.password_hash, data['current_password']):
+        if not password_hasher.verify(user.password_hash, data['current_password']):
             raise APIError("Current password is incorrect", 401)
         
         # Validate new password
@@ -290,7 +308,7 @@ def change_password():
             raise APIError("New password must be at least 6 characters long", 400)
         
         # Update password
-        user.password_hash = generate_password_hash(new_password)
+        user.password_hash = password_hasher.hash(new_password)
         user.updated_at = datetime.utcnow()
         db.session.commit()
         
@@ -311,21 +329,7 @@ def change_password():
 def get_profile():
     """Get user profile information"""
     try:
-        token = request.headers.get('Authorization')
-        if not token:
-            raise APIError("No token provided", 401)
-        
-        if token.startswith('Bearer '):
-            token = token[7:]  # Remove 'Bearer ' prefix
-        
-        payload = verify_jwt_token(token)
-        if not payload:
-            raise APIError("Invalid or expired token", 401)
-        
-        # Get user from database
-        user = User.query.get(payload['user_id'])
-        if not user:
-            raise APIError("User not found", 404)
+        user = current_user()
         
         return jsonify({
             'success': True,
@@ -352,26 +356,12 @@ def get_profile():
 def update_profile():
     """Update user profile information"""
     try:
-        token = request.headers.get('Authorization')
-        if not token:
-            raise APIError("No token provided", 401)
-        
-        if token.startswith('Bearer '):
-            token = token[7:]  # Remove 'Bearer ' prefix
-        
-        payload = verify_jwt_token(token)
-        if not payload:
-            raise APIError("Invalid or expired token", 401)
+        user = current_user()
         
         data = request.json
         if not data:
             raise APIError("No data provided", 400)
         
-        # Get user
-        user = User.query.get(payload['user_id'])
-        if not user:
-            raise APIError("User not found", 404)
-        
         # Update allowed fields
         updatable_fields = ['first_name', 'last_name', 'phone', 'address']
         for field in updatable_fields:
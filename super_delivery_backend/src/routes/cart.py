@@ -4,7 +4,8 @@ from src.models.menu_item import MenuItem
 from src.models.restaurant import Restaurant
 from src.models.cart import Cart, CartItem
 from src.routes.error_handler import APIError, log_info, log_error
-from src.routes.auth import verify_jwt_token
+from src.routes.auth import current_auth
+from src.utils.cache import cached_get
 from datetime import datetime
 import json
 
@@ -12,18 +13,7 @@ cart_bp = Blueprint('cart', __name__)
 
 def get_user_from_token():
     """Extract user ID from JWT token"""
-    token = request.headers.get('Authorization')
-    if not token:
-        raise APIError("Authentication required", 401)
-    
-    if token.startswith('Bearer '):
-        token = token[7:]  # Remove 'Bearer ' prefix
-    
-    payload = verify_jwt_token(token)
-    if not payload:
-        raise APIError("Invalid or expired token", 401)
-    
-    return payload['user_id']
+    return current_auth("Authentication required")['user_id']
 
 @cart_bp.route('/cart', methods=['GET'])
 def get_cart():
@@ -124,7 +114,7 @@ def add_to_cart():
             raise APIError("Quantity must be greater than 0", 400)
         
         # Get menu item
-        menu_item = MenuItem.query.get(menu_item_id)
+        menu_item = cached_get(MenuItem, menu_item_id)
         if not menu_item:
             raise APIError("Menu item not found", 404)
         
@@ -190,12 +180,10 @@ def get_cart_count():
     try:
         user_id = get_user_from_token()
         
-        # Get cart item count
-        cart = Cart.query.filter_by(user_id=user_id).first()
-        total_items = 0
-        
-        if cart:
-            total_items = db.session.query(db.func.sum(CartItem.quantity)).filter_by(cart_id=cart.id).scalar() or 0
+        # Get cart item count in one round trip; polled by every page header
+        total_items = db.session.query(db.func.sum(CartItem.quantity)).join(
+            Cart, CartItem.cart_id == Cart.id
+        ).filter(Cart.user_id == user_id).scalar() or 0
         
         return jsonify({
             'success': True,
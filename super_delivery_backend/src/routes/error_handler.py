@@ -1,18 +1,12 @@
 from flask import Blueprint, jsonify, current_app
+from src.utils.logging_pipeline import log_pipeline
 import logging
 import traceback
 
 error_bp = Blueprint('error', __name__)
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('app.log'),
-        logging.StreamHandler()
-    ]
-)
+# Configure logging; records are written by a background thread, see init_logging()
+log_pipeline.configure({})
 
 logger = logging.getLogger(__name__)
 
@@ -0,0 +1,22 @@
+from flask import Blueprint, Response, current_app, request
+from src.routes.error_handler import APIError, log_error
+from src.utils.metrics import metrics
+import hmac
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Get every worker's metrics in the Prometheus text format"""
+    try:
+        token = current_app.config.get('METRICS_TOKEN')
+        if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            raise APIError("Invalid metrics token", 401)
+        
+        return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+        
+    except APIError:
+        raise
+    except Exception as e:
+        log_error(f"Error collecting metrics: {str(e)}", exc_info=True)
+        raise APIError("Failed to collect metrics", 500)
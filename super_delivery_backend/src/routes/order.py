@@ -1,15 +1,29 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context, url_for
 from src.models.user import User, db
 from src.models.restaurant import Restaurant
 from src.models.menu_item import MenuItem
 from src.models.order import Order, OrderStatus
 from src.models.order_item import OrderItem
 from src.models.review import Review
+from src.routes.error_handler import log_error
+from src.utils.pagination import clamp_per_page, keyset_paginate
+from src.utils.events import publish_order_update, record_order_event
+from src.utils.ratings import record_review_ratings
+from src.utils.cache import cached_get
+from src.utils.serialization import parse_fields, select_fields, serialize_row
+from sqlalchemy import insert, or_, update
 from datetime import datetime, timedelta
+import math
 import uuid
 
 order_bp = Blueprint('order', __name__)
 
+# Rows fetched per round trip when streaming order lists
+ORDER_STREAM_BATCH_SIZE = 500
+
+# Unclaimed orders fetched per round of compare-and-set claim attempts
+CLAIM_CANDIDATES = 10
+
 @order_bp.route('/orders', methods=['GET'])
 def get_orders():
     """Get orders with optional filtering"""
@@ -17,6 +31,9 @@ def get_orders():
     restaurant_id = request.args.get('restaurant_id')
     driver_id = request.args.get('driver_id')
     status = request.args.get('status')
+    cursor = request.args.get('cursor')
+    per_page = request.args.get('per_page', 50, type=int)
+    fields = parse_fields(Order, request.args.get('fields'))
     
     query = Order.query
     
@@ -29,8 +46,60 @@ def get_orders():
     if status:
         query = query.filter_by(status=OrderStatus(status))
     
-    orders = query.order_by(Order.created_at.desc()).all()
-    return jsonify([order.to_dict() for order in orders])
+    ndjson = request.args.get('format') == 'ndjson' or request.accept_mimetypes.best == 'application/x-ndjson'
+    
+    # Plain rows straight to JSON; pages also read the sort key of their last row
+    query, fields = select_fields(query, Order, fields, required=() if ndjson else ('created_at', 'id'))
+    
+    if ndjson:
+        # Every matching order, streamed so memory stays flat on large result sets
+        query = query.order_by(Order.created_at.desc(), Order.id.desc())
+        return Response(stream_with_context(_stream_orders(query, fields)), mimetype='application/x-ndjson')
+    
+    # Keyset page on (created_at, id), newest first
+    per_page = clamp_per_page(per_page)
+    orders, next_cursor = keyset_paginate(
+        query,
+        [Order.created_at, Order.id],
+        lambda row: (row.created_at, row.id),
+        cursor=cursor,
+        per_page=per_page
+    )
+    rows = [serialize_row(row, fields) for row in orders]
+    
+    if cursor is not None:
+        return jsonify({
+            'orders': rows,
+            'pagination': {
+                'per_page': per_page,
+                'next_cursor': next_cursor,
+                'has_next': next_cursor is not None
+            }
+        })
+    
+    # Existing clients get a plain array of the newest page, built in full before anything is
+    # sent so a failure still gets an error status; a Link header points at the next page
+    response = jsonify(rows)
+    if next_cursor is not None:
+        response.headers['Link'] = f'<{_next_page_url(next_cursor, per_page)}>; rel="next"'
+    return response
+
+def _next_page_url(cursor, per_page):
+    """URL of the keyset page that follows, with the request's filters and fields"""
+    args = request.args.to_dict()
+    args.update(cursor=cursor, per_page=per_page)
+    return url_for('order.get_orders', **args)
+
+def _stream_orders(query, fields):
+    """Serialize order rows one NDJSON line at a time from a server-side cursor"""
+    dumps = current_app.json.dumps
+    try:
+        for row in query.yield_per(ORDER_STREAM_BATCH_SIZE):
+            yield dumps(serialize_row(row, fields)) + '\n'
+    except Exception as e:
+        # The status line has gone out; a final error record tells clients the list is incomplete
+        log_error(f"Error streaming orders: {str(e)}", exc_info=True)
+        yield dumps({'error': 'Failed to stream orders'}) + '\n'
 
 @order_bp.route('/orders', methods=['POST'])
 def create_order():
@@ -38,14 +107,31 @@ def create_order():
     data = request.json
     
     # Verify customer and restaurant exist
-    customer = User.query.get(data.get('customer_id'))
-    restaurant = Restaurant.query.get(data.get('restaurant_id'))
+    customer = cached_get(User, data.get('customer_id'))
+    restaurant = cached_get(Restaurant, data.get('restaurant_id'))
     
     if not customer or customer.user_type.value != 'customer':
         return jsonify({'error': 'Invalid customer'}), 400
     if not restaurant:
         return jsonify({'error': 'Invalid restaurant'}), 400
     
+    # Price every line from the menu: one IN query for all referenced items
+    order_lines, error = _price_order_lines(data.get('items') or [], restaurant)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    subtotal = round(sum(line['total_price'] for line in order_lines), 2)
+    delivery_fee = restaurant.delivery_fee or 0.0
+    tax_amount = round(subtotal * current_app.config['ORDER_TAX_RATE'], 2)
+    tip_amount = _client_amount(data, 'tip_amount')
+    discount_amount = _client_amount(data, 'discount_amount')
+    if tip_amount is None:
+        return jsonify({'error': 'Invalid tip amount'}), 400
+    if discount_amount is None:
+        return jsonify({'error': 'Invalid discount amount'}), 400
+    # A discount can make the food free, never the order negative
+    discount_amount = min(discount_amount, subtotal)
+    
     # Generate unique order number
     order_number = f"SD{datetime.now().strftime('%Y%m%d')}{str(uuid.uuid4())[:8].upper()}"
     
@@ -59,39 +145,84 @@ def create_order():
         delivery_address=data['delivery_address'],
         customer_phone=data.get('customer_phone'),
         special_instructions=data.get('special_instructions'),
-        subtotal=data['subtotal'],
-        delivery_fee=data.get('delivery_fee', restaurant.delivery_fee),
-        tax_amount=data.get('tax_amount', 0.0),
-        tip_amount=data.get('tip_amount', 0.0),
-        discount_amount=data.get('discount_amount', 0.0),
-        total_amount=data['total_amount'],
+        subtotal=subtotal,
+        delivery_fee=delivery_fee,
+        tax_amount=tax_amount,
+        tip_amount=tip_amount,
+        discount_amount=discount_amount,
+        total_amount=round(subtotal + delivery_fee + tax_amount + tip_amount - discount_amount, 2),
         payment_method=data.get('payment_method'),
         estimated_delivery_time=estimated_delivery
     )
     
     db.session.add(order)
-    db.session.flush()  # Get the order ID
+    record_order_event(order, source='order')  # Flushes, which assigns the order ID
     
-    # Add order items
-    for item_data in data.get('items', []):
-        menu_item = MenuItem.query.get(item_data['menu_item_id'])
-        if not menu_item:
-            return jsonify({'error': f'Invalid menu item ID: {item_data["menu_item_id"]}'}), 400
-        
-        order_item = OrderItem(
-            order_id=order.id,
-            menu_item_id=item_data['menu_item_id'],
-            quantity=item_data['quantity'],
-            unit_price=item_data['unit_price'],
-            total_price=item_data['total_price'],
-            special_instructions=item_data.get('special_instructions'),
-            customizations=item_data.get('customizations')
-        )
-        db.session.add(order_item)
+    # Add all order items in a single multi-row INSERT
+    for line in order_lines:
+        line['order_id'] = order.id
+    db.session.execute(insert(OrderItem), order_lines)
     
     db.session.commit()
+    publish_order_update(order)
     return jsonify(order.to_dict()), 201
 
+def _client_amount(data, name):
+    """A non-negative, finite amount chosen by the client, or None when it is not one"""
+    value = data.get(name) or 0.0
+    if isinstance(value, bool):
+        return None
+    try:
+        amount = float(value)
+    except (TypeError, ValueError):
+        return None
+    if not math.isfinite(amount) or amount < 0:
+        return None
+    return round(amount, 2)
+
+def _price_order_lines(items, restaurant):
+    """Validate requested lines against the menu and price them server-side.
+
+    Returns (lines, None) with rows ready for a bulk OrderItem insert, or
+    (None, message) when the request is invalid. Client-sent prices are ignored.
+    """
+    if not items:
+        return None, 'Order must contain at least one item'
+    
+    for item_data in items:
+        if not isinstance(item_data.get('menu_item_id'), int):
+            return None, f'Invalid menu item ID: {item_data.get("menu_item_id")}'
+        quantity = item_data.get('quantity')
+        if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity <= 0:
+            return None, f'Invalid quantity for menu item ID: {item_data.get("menu_item_id")}'
+    
+    menu_item_ids = {item_data.get('menu_item_id') for item_data in items}
+    menu_items = {
+        menu_item.id: menu_item
+        for menu_item in MenuItem.query.filter(MenuItem.id.in_(menu_item_ids)).all()
+    }
+    
+    lines = []
+    for item_data in items:
+        menu_item = menu_items.get(item_data.get('menu_item_id'))
+        if not menu_item:
+            return None, f'Invalid menu item ID: {item_data.get("menu_item_id")}'
+        if menu_item.restaurant_id != restaurant.id:
+            return None, f'Menu item {menu_item.id} does not belong to this restaurant'
+        if not menu_item.is_available:
+            return None, f'Menu item {menu_item.id} is not available'
+        
+        lines.append({
+            'menu_item_id': menu_item.id,
+            'quantity': item_data['quantity'],
+            'unit_price': menu_item.price,
+            'total_price': round(menu_item.price * item_data['quantity'], 2),
+            'special_instructions': item_data.get('special_instructions'),
+            'customizations': item_data.get('customizations')
+        })
+    
+    return lines, None
+
 @order_bp.route('/orders/<int:order_id>', methods=['GET'])
 def get_order(order_id):
     """Get a specific order by ID"""
@@ -114,6 +245,7 @@ def update_order_status(order_id):
         return jsonify({'error': 'Status is required'}), 400
     
     try:
+        previous_status = order.status
         order.status = OrderStatus(new_status)
         
         # Update timestamps based on status
@@ -124,11 +256,14 @@ def update_order_status(order_id):
         
         # Assign driver if provided
         if 'driver_id' in data:
-            driver = User.query.get(data['driver_id'])
+            driver = cached_get(User, data['driver_id'])
             if driver and driver.user_type.value == 'driver':
                 order.driver_id = data['driver_id']
         
+        if order.status != previous_status:
+            record_order_event(order, source='order')
         db.session.commit()
+        publish_order_update(order)
         return jsonify(order.to_dict())
     
     except ValueError:
@@ -140,15 +275,28 @@ def assign_driver(order_id):
     order = Order.query.get_or_404(order_id)
     data = request.json
     
-    driver = User.query.get(data.get('driver_id'))
+    driver = cached_get(User, data.get('driver_id'))
     if not driver or driver.user_type.value != 'driver':
         return jsonify({'error': 'Invalid driver'}), 400
     
-    order.driver_id = data['driver_id']
+    # Compare-and-set so a driver never silently replaces another one
+    result = db.session.execute(
+        update(Order)
+        .where(Order.id == order_id, or_(Order.driver_id.is_(None), Order.driver_id == driver.id))
+        .values(driver_id=driver.id, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        db.session.rollback()
+        return jsonify({'error': 'Order is already assigned to another driver'}), 409
+    db.session.refresh(order)
+    
     if order.status == OrderStatus.READY_FOR_PICKUP:
         order.status = OrderStatus.OUT_FOR_DELIVERY
+        record_order_event(order, source='order', note=f"Picked up by driver {order.driver_id}")
     
     db.session.commit()
+    publish_order_update(order)
     return jsonify(order.to_dict())
 
 @order_bp.route('/orders/<int:order_id>/review', methods=['POST'])
@@ -166,11 +314,15 @@ def add_review(order_id):
     if existing_review:
         return jsonify({'error': 'Order already reviewed'}), 400
     
+    scores, error = _parse_review_scores(data)
+    if error:
+        return jsonify({'error': error}), 400
+    
     review = Review(
-        rating=data['rating'],
+        rating=scores['rating'],
         comment=data.get('comment'),
-        food_rating=data.get('food_rating'),
-        delivery_rating=data.get('delivery_rating'),
+        food_rating=scores['food_rating'],
+        delivery_rating=scores['delivery_rating'],
         customer_id=order.customer_id,
         restaurant_id=order.restaurant_id,
         order_id=order_id,
@@ -178,24 +330,106 @@ def add_review(order_id):
     )
     
     db.session.add(review)
+    db.session.flush()
     
-    # Update restaurant rating (simple average)
-    restaurant = order.restaurant
-    reviews = Review.query.filter_by(restaurant_id=restaurant.id).all()
-    if reviews:
-        avg_rating = sum(r.rating for r in reviews) / len(reviews)
-        restaurant.rating = round(avg_rating, 1)
+    # Running totals replace re-averaging every review of the restaurant
+    record_review_ratings(review)
     
     db.session.commit()
     return jsonify(review.to_dict()), 201
 
+def _parse_review_scores(data):
+    """Validate the 1-5 star scores of a review.
+
+    Returns (scores, None) or (None, message). Only the overall rating is required.
+    """
+    scores = {}
+    for field in ('rating', 'food_rating', 'delivery_rating'):
+        score = data.get(field)
+        if score is None and field != 'rating':
+            scores[field] = None
+            continue
+        if not isinstance(score, int) or isinstance(score, bool) or not 1 <= score <= 5:
+            return None, f'{field} must be a whole number from 1 to 5'
+        scores[field] = score
+    return scores, None
+
 @order_bp.route('/orders/available', methods=['GET'])
 def get_available_orders():
     """Get orders available for pickup by drivers"""
-    orders = Order.query.filter_by(
+    fields = parse_fields(Order, request.args.get('fields'))
+    
+    query = Order.query.filter_by(
         status=OrderStatus.READY_FOR_PICKUP,
         driver_id=None
-    ).order_by(Order.created_at.asc()).all()
+    ).order_by(Order.created_at.asc())
+    query, fields = select_fields(query, Order, fields)
+    
+    return jsonify([serialize_row(row, fields) for row in query.all()])
+
+
+@order_bp.route('/orders/claim', methods=['POST'])
+def claim_order():
+    """Atomically assign the oldest available order to the requesting driver"""
+    data = request.json or {}
+    
+    driver = cached_get(User, data.get('driver_id'))
+    if not driver or driver.user_type.value != 'driver':
+        return jsonify({'error': 'Invalid driver'}), 400
+    
+    order = _claim_next_order(driver.id)
+    if not order:
+        return jsonify({'error': 'No orders available'}), 404
     
-    return jsonify([order.to_dict() for order in orders])
+    publish_order_update(order)
+    return jsonify(order.to_dict())
 
+def _claim_next_order(driver_id):
+    """Hand the oldest unassigned ready order to a driver without blocking other drivers.
+
+    PostgreSQL locks the first unclaimed row with FOR UPDATE SKIP LOCKED, so concurrent
+    claims each take a different order. Other databases use a compare-and-set UPDATE
+    that only succeeds while the order is still unassigned, moving on to the next
+    candidate when another driver won the race and fetching fresh candidates until
+    one is claimed or none are left.
+    """
+    query = Order.query.filter(
+        Order.status == OrderStatus.READY_FOR_PICKUP,
+        Order.driver_id.is_(None)
+    ).order_by(Order.created_at.asc(), Order.id.asc())
+    
+    if db.session.get_bind().dialect.name == 'postgresql':
+        order = query.with_for_update(skip_locked=True).first()
+        if not order:
+            db.session.rollback()
+            return None
+        order.driver_id = driver_id
+        order.status = OrderStatus.OUT_FOR_DELIVERY
+    else:
+        order = None
+        while order is None:
+            # Every candidate lost means other drivers claimed them, so the next batch is newer
+            candidate_ids = [row.id for row in query.with_entities(Order.id).limit(CLAIM_CANDIDATES).all()]
+            if not candidate_ids:
+                break
+            for candidate_id in candidate_ids:
+                result = db.session.execute(
+                    update(Order)
+                    .where(
+                        Order.id == candidate_id,
+                        Order.status == OrderStatus.READY_FOR_PICKUP,
+                        Order.driver_id.is_(None)
+                    )
+                    .values(driver_id=driver_id, status=OrderStatus.OUT_FOR_DELIVERY, updated_at=datetime.utcnow())
+                    .execution_options(synchronize_session=False)
+                )
+                if result.rowcount == 1:
+                    order = db.session.get(Order, candidate_id, populate_existing=True)
+                    break
+        if not order:
+            db.session.rollback()
+            return None
+    
+    record_order_event(order, source='claim', note=f"Claimed by driver {driver_id}")
+    db.session.commit()
+    return order
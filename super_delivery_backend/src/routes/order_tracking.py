@@ -1,13 +1,45 @@
-from flask import Blueprint, jsonify, request
-from src.models.user import db
-from src.models.order import Order
+from flask import Blueprint, Response, jsonify, request
+from src.models.user import User, db
+from src.models.order import Order, OrderStatus
+from src.models.order_item import OrderItem
+from src.models.order_event import OrderEvent
 from src.models.restaurant import Restaurant
 from src.routes.error_handler import APIError, log_info, log_error
+from src.utils.events import broker, format_sse, publish_order_update, record_order_event
+from src.utils.ratings import get_driver_rating
+from src.utils.cache import cached_get
+from sqlalchemy.orm import aliased, joinedload, selectinload
 from datetime import datetime, timedelta
 import json
 
 order_tracking_bp = Blueprint('order_tracking', __name__)
 
+# Statuses shown on the restaurant kitchen screen
+KITCHEN_STATUSES = [OrderStatus.PENDING, OrderStatus.CONFIRMED, OrderStatus.PREPARING]
+
+# Orders still on their way to the customer
+CUSTOMER_ACTIVE_STATUSES = KITCHEN_STATUSES + [OrderStatus.READY_FOR_PICKUP, OrderStatus.OUT_FOR_DELIVERY]
+
+# Orders a driver still has to pick up or drop off
+DRIVER_ACTIVE_STATUSES = [OrderStatus.READY_FOR_PICKUP, OrderStatus.OUT_FOR_DELIVERY]
+
+# Statuses after which an order stream has nothing more to send
+FINAL_STATUSES = (OrderStatus.DELIVERED.value, OrderStatus.CANCELLED.value)
+
+# Idle seconds between keepalive comments on event streams
+SSE_KEEPALIVE_SECONDS = 15
+
+# Order status -> (timeline step id used by the frontend, title, description)
+TIMELINE_STEPS = {
+    OrderStatus.PENDING.value: ('placed', 'Order Placed', 'Your order has been received and is being processed'),
+    OrderStatus.CONFIRMED.value: ('confirmed', 'Order Confirmed', 'Restaurant has confirmed your order'),
+    OrderStatus.PREPARING.value: ('preparing', 'Preparing Your Order', 'The restaurant is preparing your delicious meal'),
+    OrderStatus.READY_FOR_PICKUP.value: ('ready', 'Ready for Pickup', 'Your order is ready and waiting for the driver'),
+    OrderStatus.OUT_FOR_DELIVERY.value: ('picked_up', 'Out for Delivery', 'Your order is on its way to you'),
+    OrderStatus.DELIVERED.value: ('delivered', 'Delivered', 'Your order has been delivered. Enjoy your meal!'),
+    OrderStatus.CANCELLED.value: ('cancelled', 'Order Cancelled', 'Your order has been cancelled')
+}
+
 @order_tracking_bp.route('/orders/<int:order_id>/tracking', methods=['GET'])
 def get_order_tracking(order_id):
     """Get real-time tracking information for an order"""
@@ -17,7 +49,7 @@ def get_order_tracking(order_id):
             raise APIError("Order not found", 404)
         
         # Get restaurant information
-        restaurant = Restaurant.query.get(order.restaurant_id)
+        restaurant = cached_get(Restaurant, order.restaurant_id)
         
         # Calculate estimated times based on order status
         tracking_info = {
@@ -32,92 +64,32 @@ def get_order_tracking(order_id):
             },
             'delivery_address': order.delivery_address,
             'total_amount': float(order.total_amount),
-            'estimated_delivery_time': order.estimated_delivery_time,
+            'estimated_delivery_time': order.estimated_delivery_time.isoformat() if order.estimated_delivery_time else None,
             'driver_info': None,
             'timeline': []
         }
         
         # Add driver information if assigned
         if order.driver_id:
-            from src.models.user import User
-            driver = User.query.get(order.driver_id)
+            driver = cached_get(User, order.driver_id)
             if driver:
                 tracking_info['driver_info'] = {
                     'name': driver.first_name + ' ' + driver.last_name,
                     'phone': driver.phone,
-                    'rating': 4.5  # Mock rating for now
+                    'rating': get_driver_rating(driver.id)
                 }
         
-        # Generate timeline based on order status
-        timeline = []
-        base_time = order.created_at
-        
-        # Order placed
-        timeline.append({
-            'status': 'placed',
-            'title': 'Order Placed',
-            'description': 'Your order has been received and is being processed',
-            'timestamp': base_time.isoformat(),
-            'completed': True
-        })
+        # Timeline comes straight from the order's event log (one indexed range read)
+        events = OrderEvent.query.filter_by(order_id=order.id).order_by(OrderEvent.seq).all()
+        timeline = [_timeline_step(event.status, event.created_at) for event in events]
         
-        # Order confirmed
-        if order.status.value in ['confirmed', 'preparing', 'ready', 'picked_up', 'delivered']:
-            confirm_time = base_time + timedelta(minutes=2)
-            timeline.append({
-                'status': 'confirmed',
-                'title': 'Order Confirmed',
-                'description': f'Restaurant has confirmed your order',
-                'timestamp': confirm_time.isoformat(),
-                'completed': True
-            })
+        if not timeline:
+            # Orders placed before the event log existed only know when they were created
+            timeline.append(_timeline_step(OrderStatus.PENDING.value, order.created_at))
         
-        # Preparing
-        if order.status.value in ['preparing', 'ready', 'picked_up', 'delivered']:
-            prep_time = base_time + timedelta(minutes=5)
-            timeline.append({
-                'status': 'preparing',
-                'title': 'Preparing Your Order',
-                'description': 'The restaurant is preparing your delicious meal',
-                'timestamp': prep_time.isoformat(),
-                'completed': True
-            })
-        
-        # Ready for pickup
-        if order.status.value in ['ready', 'picked_up', 'delivered']:
-            ready_time = base_time + timedelta(minutes=15)
-            timeline.append({
-                'status': 'ready',
-                'title': 'Ready for Pickup',
-                'description': 'Your order is ready and waiting for the driver',
-                'timestamp': ready_time.isoformat(),
-                'completed': True
-            })
-        
-        # Picked up
-        if order.status.value in ['picked_up', 'delivered']:
-            pickup_time = base_time + timedelta(minutes=20)
-            timeline.append({
-                'status': 'picked_up',
-                'title': 'Out for Delivery',
-                'description': 'Your order is on its way to you',
-                'timestamp': pickup_time.isoformat(),
-                'completed': True
-            })
-        
-        # Delivered
-        if order.status.value == 'delivered':
-            delivery_time = base_time + timedelta(minutes=order.estimated_delivery_time or 30)
-            timeline.append({
-                'status': 'delivered',
-                'title': 'Delivered',
-                'description': 'Your order has been delivered. Enjoy your meal!',
-                'timestamp': delivery_time.isoformat(),
-                'completed': True
-            })
-        else:
+        if order.status.value not in FINAL_STATUSES:
             # Add estimated delivery time
-            estimated_delivery = base_time + timedelta(minutes=order.estimated_delivery_time or 30)
+            estimated_delivery = order.estimated_delivery_time or order.created_at + timedelta(minutes=30)
             timeline.append({
                 'status': 'delivered',
                 'title': 'Estimated Delivery',
@@ -141,6 +113,100 @@ def get_order_tracking(order_id):
         log_error(f"Error fetching tracking info for order {order_id}: {str(e)}", exc_info=True)
         raise APIError("Failed to fetch order tracking information", 500)
 
+@order_tracking_bp.route('/orders/<int:order_id>/events', methods=['GET'])
+def get_order_events(order_id):
+    """Get an order's status events, optionally only those after a known sequence number"""
+    try:
+        after_seq = request.args.get('after_seq', 0, type=int)
+        
+        events = OrderEvent.query.filter(
+            OrderEvent.order_id == order_id,
+            OrderEvent.seq > after_seq
+        ).order_by(OrderEvent.seq).all()
+        
+        return jsonify({
+            'success': True,
+            'order_id': order_id,
+            'events': [event.to_dict() for event in events],
+            'last_seq': events[-1].seq if events else after_seq
+        })
+        
+    except Exception as e:
+        log_error(f"Error fetching events for order {order_id}: {str(e)}", exc_info=True)
+        raise APIError("Failed to fetch order events", 500)
+
+def _timeline_step(status, timestamp):
+    """Describe one completed status event for the tracking timeline"""
+    step_status, title, description = TIMELINE_STEPS.get(status, (status, status.replace('_', ' ').title(), ''))
+    return {
+        'status': step_status,
+        'title': title,
+        'description': description,
+        'timestamp': timestamp.isoformat(),
+        'completed': True
+    }
+
+@order_tracking_bp.route('/orders/<int:order_id>/stream', methods=['GET'])
+def stream_order_updates(order_id):
+    """Stream status changes for one order as Server-Sent Events"""
+    # Subscribe before reading the snapshot so no update can slip in between
+    subscription = broker.subscribe(f'order:{order_id}')
+    order = db.session.query(
+        Order.id, Order.status, Order.updated_at, Order.customer_id,
+        Order.restaurant_id, Order.driver_id
+    ).filter(Order.id == order_id).first()
+    if not order:
+        subscription.close()
+        raise APIError("Order not found", 404)
+    if order.status.value in FINAL_STATUSES:
+        # A finished order never changes again; 204 tells EventSource not to reconnect
+        subscription.close()
+        return Response(status=204)
+    
+    snapshot = {
+        'order_id': order.id,
+        'status': order.status.value,
+        'updated_at': order.updated_at.isoformat() if order.updated_at else None,
+        'customer_id': order.customer_id,
+        'restaurant_id': order.restaurant_id,
+        'driver_id': order.driver_id
+    }
+    log_info(f"Opened update stream for order {order_id}")
+    return _sse_response(subscription, snapshot, close_on_final_status=True)
+
+@order_tracking_bp.route('/orders/customer/<int:customer_id>/stream', methods=['GET'])
+def stream_customer_updates(customer_id):
+    """Stream status changes for all of a customer's orders as Server-Sent Events"""
+    log_info(f"Opened update stream for customer {customer_id}")
+    subscription = broker.subscribe(f'customer:{customer_id}')
+    return _sse_response(subscription, {'customer_id': customer_id})
+
+def _sse_response(subscription, snapshot, close_on_final_status=False):
+    """Build a long-lived event-stream response fed by a broker subscription.
+
+    The generator runs after the request's database session is released and only
+    waits on the broker, so an open stream costs no queries between updates.
+    """
+    def generate():
+        try:
+            yield format_sse(snapshot, event='snapshot')
+            while True:
+                update = subscription.get(timeout=SSE_KEEPALIVE_SECONDS)
+                if update is None:
+                    # Comment line keeps proxies from closing an idle connection
+                    yield ': keepalive\n\n'
+                    continue
+                yield format_sse(update, event='status')
+                if close_on_final_status and update.get('status') in FINAL_STATUSES:
+                    return
+        finally:
+            subscription.close()
+    
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @order_tracking_bp.route('/orders/<int:order_id>/status', methods=['PUT'])
 def update_order_status(order_id):
     """Update order status for real-time tracking"""
@@ -160,7 +226,7 @@ def update_order_status(order_id):
             raise APIError(f"Invalid status. Must be one of: {', '.join(valid_statuses)}", 400)
         
         # Update order status
-        from src.models.order import OrderStatus
+        previous_status = order.status
         order.status = OrderStatus(new_status)
         order.updated_at = datetime.utcnow()
         
@@ -172,7 +238,10 @@ def update_order_status(order_id):
         if 'notes' in data:
             order.special_instructions = data['notes']
         
+        if order.status != previous_status:
+            record_order_event(order, source='tracking', note=data.get('notes'))
         db.session.commit()
+        publish_order_update(order)
         
         log_info(f"Updated order {order_id} status to {new_status}")
         return jsonify({
@@ -196,28 +265,36 @@ def update_order_status(order_id):
 def get_customer_active_orders(customer_id):
     """Get active orders for a customer for tracking"""
     try:
-        # Get orders that are not delivered or cancelled
-        active_statuses = ['pending', 'confirmed', 'preparing', 'ready', 'picked_up']
-        orders = Order.query.filter(
+        # Orders that are not delivered or cancelled, with the restaurant name in the same query
+        rows = db.session.query(
+            Order.id,
+            Order.status,
+            Order.created_at,
+            Order.updated_at,
+            Order.total_amount,
+            Order.estimated_delivery_time,
+            Order.delivery_address,
+            Restaurant.name.label('restaurant_name')
+        ).outerjoin(
+            Restaurant, Restaurant.id == Order.restaurant_id
+        ).filter(
             Order.customer_id == customer_id,
-            Order.status.in_([OrderStatus(status) for status in active_statuses])
+            Order.status.in_(CUSTOMER_ACTIVE_STATUSES)
         ).order_by(Order.created_at.desc()).all()
         
-        active_orders = []
-        for order in orders:
-            restaurant = Restaurant.query.get(order.restaurant_id)
-            
-            order_info = {
-                'id': order.id,
-                'status': order.status.value,
-                'created_at': order.created_at.isoformat(),
-                'updated_at': order.updated_at.isoformat(),
-                'restaurant_name': restaurant.name if restaurant else 'Unknown Restaurant',
-                'total_amount': float(order.total_amount),
-                'estimated_delivery_time': order.estimated_delivery_time,
-                'delivery_address': order.delivery_address
+        active_orders = [
+            {
+                'id': row.id,
+                'status': row.status.value,
+                'created_at': row.created_at.isoformat(),
+                'updated_at': row.updated_at.isoformat() if row.updated_at else None,
+                'restaurant_name': row.restaurant_name or 'Unknown Restaurant',
+                'total_amount': float(row.total_amount),
+                'estimated_delivery_time': row.estimated_delivery_time.isoformat() if row.estimated_delivery_time else None,
+                'delivery_address': row.delivery_address
             }
-            active_orders.append(order_info)
+            for row in rows
+        ]
         
         log_info(f"Retrieved {len(active_orders)} active orders for customer {customer_id}")
         return jsonify({
@@ -233,53 +310,71 @@ def get_customer_active_orders(customer_id):
 def get_restaurant_pending_orders(restaurant_id):
     """Get pending orders for a restaurant"""
     try:
-        # Get orders that need restaurant attention
-        pending_statuses = ['pending', 'confirmed', 'preparing']
-        orders = Order.query.filter(
-            Order.restaurant_id == restaurant_id,
-            Order.status.in_([OrderStatus(status) for status in pending_statuses])
-        ).order_by(Order.created_at.asc()).all()
+        since = request.args.get('since')
+        
+        # Customer, items and their menu items come back with the orders in two queries total
+        query = Order.query.options(
+            joinedload(Order.customer),
+            selectinload(Order.order_items).joinedload(OrderItem.menu_item)
+        ).filter(Order.restaurant_id == restaurant_id)
+        
+        if since:
+            # Delta mode: every order changed since the last poll, whatever its status,
+            # so tablets can also drop orders that left the kitchen queue
+            try:
+                since_time = datetime.fromisoformat(since)
+            except ValueError:
+                raise APIError("Invalid since timestamp, expected ISO 8601", 400)
+            query = query.filter(Order.updated_at > since_time)
+        else:
+            # Get orders that need restaurant attention
+            query = query.filter(Order.status.in_(KITCHEN_STATUSES))
+        
+        orders = query.order_by(Order.created_at.asc()).all()
         
         pending_orders = []
         for order in orders:
-            from src.models.user import User
-            customer = User.query.get(order.customer_id)
+            customer = order.customer
             
             order_info = {
                 'id': order.id,
                 'status': order.status.value,
                 'created_at': order.created_at.isoformat(),
+                'updated_at': order.updated_at.isoformat() if order.updated_at else None,
                 'customer_name': f"{customer.first_name} {customer.last_name}" if customer else 'Unknown Customer',
                 'customer_phone': customer.phone if customer else None,
                 'total_amount': float(order.total_amount),
                 'delivery_address': order.delivery_address,
                 'special_instructions': order.special_instructions,
-                'items': []
-            }
-            
-            # Get order items
-            from src.models.order_item import OrderItem
-            from src.models.menu_item import MenuItem
-            order_items = OrderItem.query.filter_by(order_id=order.id).all()
-            
-            for item in order_items:
-                menu_item = MenuItem.query.get(item.menu_item_id)
-                if menu_item:
-                    order_info['items'].append({
-                        'name': menu_item.name,
+                'items': [
+                    {
+                        'name': item.menu_item.name,
                         'quantity': item.quantity,
-                        'price': float(item.price),
+                        'price': float(item.unit_price),
                         'customizations': item.customizations
-                    })
+                    }
+                    for item in order.order_items if item.menu_item
+                ]
+            }
             
             pending_orders.append(order_info)
         
+        # Clients pass this back as since= on their next poll
+        changed_at = [order.updated_at for order in orders if order.updated_at]
+        if changed_at:
+            next_since = max(changed_at).isoformat()
+        else:
+            next_since = since or datetime.utcnow().isoformat()
+        
         log_info(f"Retrieved {len(pending_orders)} pending orders for restaurant {restaurant_id}")
         return jsonify({
             'success': True,
-            'pending_orders': pending_orders
+            'pending_orders': pending_orders,
+            'next_since': next_since
         })
         
+    except APIError:
+        raise
     except Exception as e:
         log_error(f"Error fetching pending orders for restaurant {restaurant_id}: {str(e)}", exc_info=True)
         raise APIError("Failed to fetch pending orders", 500)
@@ -288,37 +383,50 @@ def get_restaurant_pending_orders(restaurant_id):
 def get_driver_assigned_orders(driver_id):
     """Get orders assigned to a driver"""
     try:
-        # Get orders assigned to this driver that are not delivered
-        active_statuses = ['ready', 'picked_up']
-        orders = Order.query.filter(
+        # Driver manifest: one joined read of the order, pickup and drop-off details
+        customer = aliased(User)
+        rows = db.session.query(
+            Order.id,
+            Order.status,
+            Order.created_at,
+            Order.delivery_address,
+            Order.total_amount,
+            Order.special_instructions,
+            Restaurant.name.label('restaurant_name'),
+            Restaurant.address.label('restaurant_address'),
+            Restaurant.phone.label('restaurant_phone'),
+            customer.first_name.label('customer_first_name'),
+            customer.last_name.label('customer_last_name'),
+            customer.phone.label('customer_phone')
+        ).outerjoin(
+            Restaurant, Restaurant.id == Order.restaurant_id
+        ).outerjoin(
+            customer, customer.id == Order.customer_id
+        ).filter(
             Order.driver_id == driver_id,
-            Order.status.in_([OrderStatus(status) for status in active_statuses])
+            Order.status.in_(DRIVER_ACTIVE_STATUSES)
         ).order_by(Order.created_at.asc()).all()
         
-        assigned_orders = []
-        for order in orders:
-            restaurant = Restaurant.query.get(order.restaurant_id)
-            from src.models.user import User
-            customer = User.query.get(order.customer_id)
-            
-            order_info = {
-                'id': order.id,
-                'status': order.status.value,
-                'created_at': order.created_at.isoformat(),
+        assigned_orders = [
+            {
+                'id': row.id,
+                'status': row.status.value,
+                'created_at': row.created_at.isoformat(),
                 'restaurant': {
-                    'name': restaurant.name if restaurant else 'Unknown Restaurant',
-                    'address': restaurant.address if restaurant else None,
-                    'phone': restaurant.phone if restaurant else None
+                    'name': row.restaurant_name or 'Unknown Restaurant',
+                    'address': row.restaurant_address,
+                    'phone': row.restaurant_phone
                 },
                 'customer': {
-                    'name': f"{customer.first_name} {customer.last_name}" if customer else 'Unknown Customer',
-                    'phone': customer.phone if customer else None
+                    'name': f"{row.customer_first_name} {row.customer_last_name}" if row.customer_first_name is not None else 'Unknown Customer',
+                    'phone': row.customer_phone
                 },
-                'delivery_address': order.delivery_address,
-                'total_amount': float(order.total_amount),
-                'special_instructions': order.special_instructions
+                'delivery_address': row.delivery_address,
+                'total_amount': float(row.total_amount),
+                'special_instructions': row.special_instructions
             }
-            assigned_orders.append(order_info)
+            for row in rows
+        ]
         
         log_info(f"Retrieved {len(assigned_orders)} assigned orders for driver {driver_id}")
         return jsonify({
@@ -329,4 +437,3 @@ def get_driver_assigned_orders(driver_id):
     except Exception as e:
         log_error(f"Error fetching assigned orders for driver {driver_id}: {str(e)}", exc_info=True)
         raise APIError("Failed to fetch assigned orders", 500)
-
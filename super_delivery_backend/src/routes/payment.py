@@ -3,6 +3,8 @@ import os
 from flask import Blueprint, request, jsonify
 from src.models.user import db
 from src.models.order import Order, OrderStatus
+from src.utils.events import publish_order_update, record_order_event
+from src.utils.metrics import track_external_call
 from datetime import datetime
 
 payment_bp = Blueprint('payment', __name__)
@@ -26,14 +28,15 @@ def create_payment_intent():
             return jsonify({'error': 'Order not found'}), 404
         
         # Create payment intent with Stripe
-        intent = stripe.PaymentIntent.create(
-            amount=int(order.total_amount * 100),  # Stripe expects amount in cents
-            currency='usd',
-            metadata={
-                'order_id': str(order.id),
-                'order_number': order.order_number
-            }
-        )
+        with track_external_call('stripe', 'payment_intent.create'):
+            intent = stripe.PaymentIntent.create(
+                amount=int(order.total_amount * 100),  # Stripe expects amount in cents
+                currency='usd',
+                metadata={
+                    'order_id': str(order.id),
+                    'order_number': order.order_number
+                }
+            )
         
         # Update order with payment intent ID
         order.payment_transaction_id = intent.id
@@ -61,18 +64,23 @@ def confirm_payment():
             return jsonify({'error': 'Payment intent ID is required'}), 400
         
         # Retrieve payment intent from Stripe
-        intent = stripe.PaymentIntent.retrieve(payment_intent_id)
+        with track_external_call('stripe', 'payment_intent.retrieve'):
+            intent = stripe.PaymentIntent.retrieve(payment_intent_id)
         
         if intent.status == 'succeeded':
             # Find the order
             order = Order.query.filter_by(payment_transaction_id=payment_intent_id).first()
             if order:
                 # Update order status
+                previous_status = order.status
                 order.payment_status = 'completed'
                 order.status = OrderStatus.CONFIRMED
                 order.confirmed_at = datetime.utcnow()
                 order.payment_method = 'credit_card'
+                if previous_status != OrderStatus.CONFIRMED:
+                    record_order_event(order, source='payment', note='Payment confirmed')
                 db.session.commit()
+                publish_order_update(order)
                 
                 return jsonify({
                     'success': True,
@@ -112,10 +120,14 @@ def stripe_webhook():
         # Find and update the order
         order = Order.query.filter_by(payment_transaction_id=payment_intent['id']).first()
         if order:
+            previous_status = order.status
             order.payment_status = 'completed'
             order.status = OrderStatus.CONFIRMED
             order.confirmed_at = datetime.utcnow()
+            if previous_status != OrderStatus.CONFIRMED:
+                record_order_event(order, source='payment', note='Stripe payment_intent.succeeded')
             db.session.commit()
+            publish_order_update(order)
     
     elif event['type'] == 'payment_intent.payment_failed':
         payment_intent = event['data']['object']
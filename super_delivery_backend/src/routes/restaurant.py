@@ -3,10 +3,19 @@ from src.models.user import User, db
 from src.models.restaurant import Restaurant
 from src.models.menu_item import MenuItem
 from src.routes.error_handler import APIError, log_info, log_error
-from sqlalchemy import or_
+from src.utils.search import apply_restaurant_search
+from src.utils.pagination import clamp_per_page, keyset_paginate
+from src.utils.ratings import get_rating_aggregates
+from src.utils.response_cache import cached_restaurant_response
+from src.utils.serialization import apply_fieldset, parse_fields, select_fields, serialize, serialize_row
+from sqlalchemy import literal_column
 
 restaurant_bp = Blueprint('restaurant', __name__)
 
+# Sort key for cursor pagination; unrated restaurants sort as 0.0. A literal rather than a
+# bound 0.0, so the statement matches the expression index from migration 0003
+RESTAURANT_RATING = db.func.coalesce(Restaurant.rating, literal_column('0.0'))
+
 @restaurant_bp.route('/restaurants', methods=['GET'])
 def get_restaurants():
     """Get all restaurants with optional filtering"""
@@ -18,6 +27,12 @@ def get_restaurants():
         is_active = request.args.get('is_active', 'true').lower() == 'true'
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
+        cursor = request.args.get('cursor')
+        fields = parse_fields(Restaurant, request.args.get('fields'))
+        
+        if search and cursor is not None:
+            # Keyset pages follow (rating, id), which would drop the relevance order of a search
+            raise APIError("cursor pagination cannot be combined with search; use page and per_page", 400)
         
         query = Restaurant.query.filter_by(is_active=is_active)
         
@@ -25,35 +40,66 @@ def get_restaurants():
             query = query.filter(Restaurant.cuisine_type.ilike(f'%{cuisine_type}%'))
         
         if search:
-            search_term = f'%{search}%'
-            query = query.filter(or_(
-                Restaurant.name.ilike(search_term),
-                Restaurant.description.ilike(search_term),
-                Restaurant.cuisine_type.ilike(search_term)
-            ))
-        
-        # Apply pagination
-        restaurants = query.paginate(
-            page=page, 
-            per_page=per_page, 
-            error_out=False
-        )
-        
-        result = {
-            'restaurants': [restaurant.to_dict() for restaurant in restaurants.items],
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': restaurants.total,
-                'pages': restaurants.pages,
-                'has_next': restaurants.has_next,
-                'has_prev': restaurants.has_prev
+            # Ranked full-text match over restaurant fields and their dishes
+            query = apply_restaurant_search(query, search)
+        
+        # Plain rows straight to JSON; cursor mode also reads the sort key of the last row
+        query, fields = select_fields(query, Restaurant, fields, required=('rating', 'id') if cursor is not None else ())
+        
+        if cursor is not None:
+            # Keyset pagination on (rating, id): constant cost at any depth, no COUNT(*)
+            include_total = request.args.get('include_total', 'false').lower() == 'true'
+            per_page = clamp_per_page(per_page)
+            restaurants, next_cursor = keyset_paginate(
+                query,
+                [RESTAURANT_RATING, Restaurant.id],
+                lambda row: (row.rating or 0.0, row.id),
+                cursor=cursor,
+                per_page=per_page
+            )
+            
+            result = {
+                'restaurants': [serialize_row(row, fields) for row in restaurants],
+                'pagination': {
+                    'per_page': per_page,
+                    'next_cursor': next_cursor,
+                    'has_next': next_cursor is not None
+                }
+            }
+            if include_total:
+                result['pagination']['total'] = query.order_by(None).count()
+        else:
+            include_total = request.args.get('include_total', 'true').lower() == 'true'
+            restaurants = query.paginate(
+                page=page, 
+                per_page=per_page, 
+                error_out=False,
+                count=include_total
+            )
+            
+            if include_total:
+                has_next = restaurants.has_next
+            else:
+                # Without a total, probe for a single row past this page instead
+                has_next = query.offset(page * per_page).limit(1).first() is not None
+            
+            result = {
+                'restaurants': [serialize_row(row, fields) for row in restaurants.items],
+                'pagination': {
+                    'page': page,
+                    'per_page': per_page,
+                    'total': restaurants.total,
+                    'pages': restaurants.pages if include_total else None,
+                    'has_next': has_next,
+                    'has_prev': restaurants.has_prev
+                }
             }
-        }
         
         log_info(f"Retrieved {len(result['restaurants'])} restaurants")
         return jsonify(result)
         
+    except APIError:
+        raise
     except Exception as e:
         log_error(f"Error fetching restaurants: {str(e)}", exc_info=True)
         raise APIError("Failed to fetch restaurants", 500)
@@ -119,15 +165,18 @@ def create_restaurant():
 def get_restaurant(restaurant_id):
     """Get a specific restaurant by ID"""
     try:
-        restaurant = Restaurant.query.get(restaurant_id)
-        if not restaurant:
-            raise APIError("Restaurant not found", 404)
+        def render():
+            restaurant = Restaurant.query.get(restaurant_id)
+            if not restaurant:
+                raise APIError("Restaurant not found", 404)
+            
+            log_info(f"Retrieved restaurant: {restaurant.name}")
+            return {
+                'success': True,
+                'restaurant': restaurant.to_dict()
+            }
         
-        log_info(f"Retrieved restaurant: {restaurant.name}")
-        return jsonify({
-            'success': True,
-            'restaurant': restaurant.to_dict()
-        })
+        return cached_restaurant_response(restaurant_id, 'restaurant', (), render)
         
     except APIError:
         raise
@@ -203,32 +252,59 @@ def delete_restaurant(restaurant_id):
 def get_restaurant_menu(restaurant_id):
     """Get menu items for a specific restaurant"""
     try:
-        restaurant = Restaurant.query.get(restaurant_id)
-        if not restaurant:
-            raise APIError("Restaurant not found", 404)
-        
         category = request.args.get('category')
         is_available = request.args.get('is_available', 'true').lower() == 'true'
+        fields = parse_fields(MenuItem, request.args.get('fields'))
+        
+        def render():
+            restaurant = Restaurant.query.get(restaurant_id)
+            if not restaurant:
+                raise APIError("Restaurant not found", 404)
+            
+            query = MenuItem.query.filter_by(restaurant_id=restaurant_id, is_available=is_available)
+            query = apply_fieldset(query, MenuItem, fields)
+            
+            if category:
+                query = query.filter(MenuItem.category.ilike(f'%{category}%'))
+            
+            menu_items = query.all()
+            
+            log_info(f"Retrieved {len(menu_items)} menu items for restaurant {restaurant_id}")
+            return {
+                'success': True,
+                'menu_items': [serialize(item, fields) for item in menu_items],
+                'restaurant': restaurant.to_dict()
+            }
         
-        query = MenuItem.query.filter_by(restaurant_id=restaurant_id, is_available=is_available)
+        return cached_restaurant_response(restaurant_id, 'menu', (category or None, is_available, fields), render)
         
-        if category:
-            query = query.filter(MenuItem.category.ilike(f'%{category}%'))
+    except APIError:
+        raise
+    except Exception as e:
+        log_error(f"Error fetching menu for restaurant {restaurant_id}: {str(e)}", exc_info=True)
+        raise APIError("Failed to fetch restaurant menu", 500)
+
+@restaurant_bp.route('/restaurants/<int:restaurant_id>/ratings', methods=['GET'])
+def get_restaurant_ratings(restaurant_id):
+    """Get a restaurant's rating averages and star histograms"""
+    try:
+        restaurant = Restaurant.query.get(restaurant_id)
+        if not restaurant:
+            raise APIError("Restaurant not found", 404)
         
-        menu_items = query.all()
+        aggregates = get_rating_aggregates('restaurant', restaurant_id)
         
-        log_info(f"Retrieved {len(menu_items)} menu items for restaurant {restaurant_id}")
         return jsonify({
             'success': True,
-            'menu_items': [item.to_dict() for item in menu_items],
-            'restaurant': restaurant.to_dict()
+            'restaurant_id': restaurant_id,
+            'ratings': {dimension: aggregate.to_dict() for dimension, aggregate in aggregates.items()}
         })
         
     except APIError:
         raise
     except Exception as e:
-        log_error(f"Error fetching menu for restaurant {restaurant_id}: {str(e)}", exc_info=True)
-        raise APIError("Failed to fetch restaurant menu", 500)
+        log_error(f"Error fetching ratings for restaurant {restaurant_id}: {str(e)}", exc_info=True)
+        raise APIError("Failed to fetch restaurant ratings", 500)
 
 @restaurant_bp.route('/restaurants/<int:restaurant_id>/menu', methods=['POST'])
 def add_menu_item(restaurant_id):
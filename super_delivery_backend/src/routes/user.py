@@ -1,12 +1,14 @@
 from flask import Blueprint, jsonify, request
 from src.models.user import User, db
+from src.utils.serialization import parse_fields, select_fields, serialize_row
 
 user_bp = Blueprint('user', __name__)
 
 @user_bp.route('/users', methods=['GET'])
 def get_users():
-    users = User.query.all()
-    return jsonify([user.to_dict() for user in users])
+    fields = parse_fields(User, request.args.get('fields'))
+    query, fields = select_fields(User.query, User, fields)
+    return jsonify([serialize_row(row, fields) for row in query.all()])
 
 @user_bp.route('/users', methods=['POST'])
 def create_user():
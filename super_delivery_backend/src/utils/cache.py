@@ -0,0 +1,415 @@
+from collections import Counter, OrderedDict
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import DateTime, Enum, Numeric, event, inspect
+from sqlalchemy.orm import make_transient_to_detached
+from src.models.user import User, db
+from src.models.restaurant import Restaurant
+from src.models.menu_item import MenuItem
+from src.routes.error_handler import log_info, log_warning
+from src.utils.events import broker
+import enum
+import json
+import os
+import sqlite3
+import threading
+import time
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+INVALIDATION_CHANNEL = 'cache:objects'
+
+# Models read often and written rarely enough to be worth caching by primary key
+CACHED_MODELS = (User, Restaurant, MenuItem)
+_MODELS_BY_TABLE = {model.__tablename__: model for model in CACHED_MODELS}
+
+# Session.info key for cache tags a transaction will invalidate
+_PENDING_KEY = 'object_cache_tags'
+
+# Expired rows are swept from the file store once every this many writes
+_FILE_STORE_SWEEP_INTERVAL = 1000
+
+class LocalCache:
+    """Per-worker LRU of object snapshots with a TTL.
+
+    Any invalidation bumps a generation number; a snapshot read from the
+    database before that bump is not stored, so a fill racing a commit cannot
+    reinstate the old row.
+    """
+    def __init__(self, max_entries=5000, ttl=30):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = Counter()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.counters['expirations'] += 1
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, generation):
+        """Store a snapshot unless something was invalidated since generation was read"""
+        with self._lock:
+            if generation != self.generation:
+                return False
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.counters['evictions'] += 1
+            return True
+
+    def invalidate(self, keys):
+        with self._lock:
+            self.generation += 1
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+class FileStore:
+    """Redis-compatible subset (get/set/incr) backed by a SQLite file.
+
+    Stands in for Redis on single-host deployments: every worker on the host
+    opens the same file, so a row loaded by one worker serves the others.
+    Cached rows decide who a user is, so the file must belong to this user
+    and be closed to everyone else; it is created that way when missing.
+    """
+    name = 'file'
+
+    def __init__(self, path):
+        self.path = path
+        _check_private_file(path)
+        self._local = threading.local()
+        self._writes = 0
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    def _connection(self):
+        # One connection per thread, reopened in forked workers
+        if getattr(self._local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=1, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection, self._local.pid = connection, os.getpid()
+        return self._local.connection
+
+    def get(self, key):
+        row = self._connection().execute(
+            "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value, ex):
+        connection = self._connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, time.time() + ex)
+        )
+        self._writes += 1
+        if self._writes % _FILE_STORE_SWEEP_INTERVAL == 0:
+            connection.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+
+    def incr(self, key):
+        # Counters never expire, like a Redis key set without a TTL
+        return self._connection().execute(
+            "INSERT INTO cache (key, value, expires_at) VALUES (?, 1, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = CAST(value AS INTEGER) + 1 RETURNING value",
+            (key, float('inf'))
+        ).fetchone()[0]
+
+class RedisStore:
+    """Shared store on a Redis server"""
+    name = 'redis'
+
+    def __init__(self, url):
+        self._client = redis.Redis.from_url(url, socket_timeout=0.25)
+
+    def get(self, key):
+        return self._client.get(key)
+
+    def set(self, key, value, ex):
+        self._client.set(key, value, ex=ex)
+
+    def incr(self, key):
+        return self._client.incr(key)
+
+class ObjectCache:
+    """Two-level cache of model rows by primary key.
+
+    Level one is a per-worker LRU; level two is shared by every worker (Redis,
+    or a SQLite file on a single host). Rows are cached as column snapshots and
+    merged into the caller's session without touching the database. Committed
+    changes to a cached model drop its entries from both levels in every worker.
+
+    Shared entries are keyed by a per-row generation that invalidation bumps.
+    A fill writes under the generation it read before loading the row, so a
+    fill that raced another worker's commit lands under a key nobody reads.
+    """
+    def __init__(self):
+        self.local = LocalCache()
+        self.shared = None
+        self.shared_ttl = 300
+        self.counters = Counter()
+        self._lock = threading.Lock()
+
+    def configure(self, app):
+        self.local.max_entries = app.config.get('CACHE_LOCAL_MAX_ENTRIES', self.local.max_entries)
+        self.local.ttl = app.config.get('CACHE_LOCAL_TTL', self.local.ttl)
+        self.shared_ttl = app.config.get('CACHE_SHARED_TTL', self.shared_ttl)
+        self.shared = _create_shared_store(app)
+        self.local.clear()
+
+    def get(self, model, pk):
+        """Load a row by primary key, consulting the caches before the database"""
+        try:
+            pk = int(pk)
+        except (TypeError, ValueError):
+            return db.session.get(model, pk) if pk is not None else None
+
+        # Rows already in this session are returned as-is, like Query.get
+        identity = inspect(model).identity_key_from_primary_key((pk,))
+        obj = db.session.identity_map.get(identity)
+        if obj is not None:
+            return obj
+
+        # Entries may only be stored once this worker receives invalidations from its peers
+        broker.ensure_listener()
+
+        tag = _tag(model, pk)
+        values = self.local.get(tag)
+        if values is not None:
+            self._count('local_hits')
+            return _attach(model, values)
+
+        generation = self.local.generation
+        shared_generation, values = self._shared_get(tag)
+        if values is not None:
+            self._count('shared_hits')
+            self.local.set(tag, values, generation)
+            return _attach(model, values)
+
+        self._count('misses')
+        obj = db.session.get(model, pk)
+        if obj is None:
+            return None
+        values = _snapshot(obj)
+        if self.local.set(tag, values, generation):
+            self._shared_set(tag, shared_generation, values)
+        return obj
+
+    def invalidate(self, tags):
+        """Drop entries from the shared store and from every worker's local cache"""
+        tags = sorted(set(tags))
+        if not tags:
+            return
+        self._count('invalidations', len(tags))
+        # Bump the local generation first so in-flight fills skip the shared store
+        self.local.invalidate(tags)
+        if self.shared:
+            try:
+                # Entries under the old generations are never read again and expire on their own
+                for tag in tags:
+                    self.shared.incr(_generation_key(tag))
+            except Exception as e:
+                self._count('shared_errors')
+                log_warning(f"Object cache could not invalidate shared entries: {str(e)}")
+        broker.publish(INVALIDATION_CHANNEL, {'tags': tags})
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        lookups = counters.get('local_hits', 0) + counters.get('shared_hits', 0) + counters.get('misses', 0)
+        hits = lookups - counters.get('misses', 0)
+        return {
+            'pid': os.getpid(),
+            'shared_backend': self.shared.name if self.shared else None,
+            'local_entries': len(self.local),
+            'local_max_entries': self.local.max_entries,
+            'local_hits': counters.get('local_hits', 0),
+            'shared_hits': counters.get('shared_hits', 0),
+            'misses': counters.get('misses', 0),
+            'hit_ratio': round(hits / lookups, 4) if lookups else None,
+            'evictions': self.local.counters['evictions'],
+            'expirations': self.local.counters['expirations'],
+            'invalidations': counters.get('invalidations', 0),
+            'shared_errors': counters.get('shared_errors', 0)
+        }
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def _shared_get(self, tag):
+        """(current generation, values) of a shared entry; generation is None when the store is unusable"""
+        if not self.shared:
+            return None, None
+        try:
+            generation = int(self.shared.get(_generation_key(tag)) or 0)
+            raw = self.shared.get(_shared_key(tag, generation))
+            return generation, (_decode(tag, raw) if raw is not None else None)
+        except Exception as e:
+            self._count('shared_errors')
+            log_warning(f"Object cache read failed for {tag}: {str(e)}")
+            return None, None
+
+    def _shared_set(self, tag, generation, values):
+        if not self.shared or generation is None:
+            return
+        try:
+            self.shared.set(_shared_key(tag, generation), _encode(values), ex=self.shared_ttl)
+        except Exception as e:
+            self._count('shared_errors')
+            log_warning(f"Object cache write failed for {tag}: {str(e)}")
+
+object_cache = ObjectCache()
+
+def init_object_cache(app):
+    """Set up both cache levels and invalidate them from every commit"""
+    object_cache.configure(app)
+
+    broker.add_handler(INVALIDATION_CHANNEL, _handle_invalidation)
+    for name, listener in (
+        ('after_flush', _collect_changed_objects),
+        ('after_commit', _invalidate_committed),
+        ('after_soft_rollback', _discard_pending)
+    ):
+        if not event.contains(db.session, name, listener):
+            event.listen(db.session, name, listener)
+
+    log_info(f"Object cache ready (shared store: {object_cache.shared.name if object_cache.shared else 'none'})")
+
+def cached_get(model, pk):
+    """Cache-backed equivalent of model.query.get(pk)"""
+    if model not in CACHED_MODELS:
+        return db.session.get(model, pk) if pk is not None else None
+    return object_cache.get(model, pk)
+
+def invalidate_objects(model, pks):
+    """Drop cached rows changed outside the ORM unit of work, such as bulk updates"""
+    object_cache.invalidate(_tag(model, pk) for pk in pks)
+
+def _create_shared_store(app):
+    backend = app.config.get('CACHE_SHARED_BACKEND', 'file')
+    if backend == 'redis':
+        if redis is None:
+            _missing_shared_store(app, "CACHE_SHARED_BACKEND is redis but the redis package is not installed")
+            return None
+        return RedisStore(app.config['CACHE_REDIS_URL'])
+    if backend == 'file':
+        path = app.config.get('CACHE_STORE_PATH')
+        if not path:
+            # A guessable shared default would let other users on the host plant rows
+            _missing_shared_store(app, "CACHE_SHARED_BACKEND is file but CACHE_STORE_PATH is not set")
+            return None
+        try:
+            return FileStore(path)
+        except (OSError, sqlite3.Error) as e:
+            log_warning(f"Could not open shared cache file {path}: {str(e)}")
+    return None
+
+def _missing_shared_store(app, reason):
+    """Refuse to start a deployment whose workers would each cache on their own"""
+    if not (app.debug or app.testing):
+        raise RuntimeError(f"{reason}; configure a shared cache store or set CACHE_SHARED_BACKEND=none")
+    log_warning(f"{reason}; using the local cache only")
+
+def _check_private_file(path):
+    """Create path readable only by this user, or refuse one that others can read or write"""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, 'O_NOFOLLOW', 0), 0o600)
+    try:
+        info = os.fstat(fd)
+    finally:
+        os.close(fd)
+    if hasattr(os, 'getuid') and info.st_uid != os.getuid():
+        raise PermissionError(f"{path} belongs to another user")
+    if info.st_mode & 0o077:
+        raise PermissionError(f"{path} is open to other users; it must have mode 600")
+
+def _tag(model, pk):
+    return f'{model.__tablename__}:{pk}'
+
+def _shared_key(tag, generation):
+    return f'obj:{tag}:{generation}'
+
+def _generation_key(tag):
+    return f'gen:{tag}'
+
+def _snapshot(obj):
+    """Copy a row's column values into a plain dict"""
+    return {attr.key: getattr(obj, attr.key) for attr in inspect(obj).mapper.column_attrs}
+
+def _encode(values):
+    """Column values as JSON; types JSON lacks are restored from the column types by _decode"""
+    def default(value):
+        if isinstance(value, datetime):
+            return value.isoformat()
+        if isinstance(value, enum.Enum):
+            return value.name
+        if isinstance(value, Decimal):
+            return str(value)
+        raise TypeError(f"Cannot cache a {type(value).__name__} column value")
+    return json.dumps(values, default=default, separators=(',', ':'))
+
+def _decode(tag, raw):
+    """Column values stored by _encode, with datetimes, enums and decimals rebuilt"""
+    model = _MODELS_BY_TABLE[tag.split(':', 1)[0]]
+    values = json.loads(raw)
+    for attr in inspect(model).column_attrs:
+        value = values.get(attr.key)
+        if value is None:
+            continue
+        column_type = attr.columns[0].type
+        if isinstance(column_type, DateTime):
+            values[attr.key] = datetime.fromisoformat(value)
+        elif isinstance(column_type, Enum) and column_type.enum_class is not None:
+            values[attr.key] = column_type.enum_class[value]
+        elif isinstance(column_type, Numeric) and column_type.asdecimal:
+            values[attr.key] = Decimal(value)
+    return values
+
+def _attach(model, values):
+    """Rebuild a row from a snapshot as a clean persistent object in the current session"""
+    mapper = inspect(model)
+    obj = model(**{attr.key: values[attr.key] for attr in mapper.column_attrs if attr.key in values})
+    make_transient_to_detached(obj)
+    return db.session.merge(obj, load=False)
+
+def _handle_invalidation(data):
+    object_cache.local.invalidate(data.get('tags', ()))
+
+def _collect_changed_objects(session, flush_context):
+    """Remember cached rows changed by this flush until the transaction ends"""
+    pending = session.info.setdefault(_PENDING_KEY, set())
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, CACHED_MODELS):
+            pending.add(_tag(type(obj), inspect(obj).identity[0]))
+
+def _invalidate_committed(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        object_cache.invalidate(pending)
+
+def _discard_pending(session, previous_transaction):
+    if previous_transaction.parent is None:
+        session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,156 @@
+from flask import request
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+# Response types worth compressing; images and archives are already compressed.
+# Event streams stay uncompressed: each long-lived connection would pin a
+# compressor window, and every event would have to be flushed on its own.
+COMPRESSIBLE_MIMETYPES = frozenset((
+    'application/json',
+    'application/x-ndjson',
+    'application/javascript',
+    'text/html',
+    'text/css',
+    'text/plain',
+    'text/javascript',
+    'image/svg+xml'
+))
+
+# A streamed response is flushed to the client once this much input is buffered
+STREAM_FLUSH_SIZE = 16 * 1024
+
+# Suffixes of the variants the frontend build writes next to each asset
+PRECOMPRESSED_SUFFIXES = (('br', '.br'), ('gzip', '.gz'))
+
+class _GzipEncoder:
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+class _BrotliEncoder:
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+class ResponseCompressor:
+    """Compresses API responses with the best encoding the client accepts.
+
+    Buffered bodies are compressed when they reach min_size. Streamed bodies
+    are compressed chunk by chunk and flushed every STREAM_FLUSH_SIZE bytes of
+    input, so a long list reaches the client progressively without ever being
+    held in memory whole.
+    """
+    def __init__(self, min_size=1024, gzip_level=6, brotli_quality=4):
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def configure(self, app):
+        self.min_size = app.config.get('COMPRESS_MIN_SIZE', self.min_size)
+        self.gzip_level = app.config.get('COMPRESS_GZIP_LEVEL', self.gzip_level)
+        self.brotli_quality = app.config.get('COMPRESS_BROTLI_QUALITY', self.brotli_quality)
+
+    def encodings(self):
+        """Encodings this worker can produce, most preferred first"""
+        return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+    def process(self, response):
+        if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+            return response
+        # The body now depends on Accept-Encoding whether or not it ends up compressed
+        response.vary.add('Accept-Encoding')
+
+        if (response.status_code < 200 or response.status_code in (204, 206, 304)
+                or response.direct_passthrough
+                or 'Content-Encoding' in response.headers
+                or 'no-transform' in response.headers.get('Cache-Control', '')):
+            return response
+
+        encoding = negotiate_encoding(self.encodings())
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            self._compress_stream(response, encoding)
+        else:
+            body = response.get_data()
+            if len(body) < self.min_size:
+                return response
+            encoder = self._encoder(encoding)
+            response.set_data(encoder.compress(body) + encoder.finish())
+
+        response.headers['Content-Encoding'] = encoding
+        # Each encoding is a different representation, so a strong ETag must not carry over
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+    def _encoder(self, encoding):
+        if encoding == 'br':
+            return _BrotliEncoder(self.brotli_quality)
+        return _GzipEncoder(self.gzip_level)
+
+    def _compress_stream(self, response, encoding):
+        source = response.response
+        chunks = response.iter_encoded()
+        encoder = self._encoder(encoding)
+
+        def generate():
+            try:
+                pending = 0
+                for chunk in chunks:
+                    output = encoder.compress(chunk)
+                    pending += len(chunk)
+                    if pending >= STREAM_FLUSH_SIZE:
+                        output += encoder.flush()
+                        pending = 0
+                    if output:
+                        yield output
+                yield encoder.finish()
+            finally:
+                # Closing the original iterable releases its request context
+                if hasattr(source, 'close'):
+                    source.close()
+
+        response.response = generate()
+        response.headers.pop('Content-Length', None)
+
+response_compressor = ResponseCompressor()
+
+def init_compression(app):
+    """Compress eligible responses after every request"""
+    response_compressor.configure(app)
+    app.after_request(response_compressor.process)
+
+def negotiate_encoding(available):
+    """Pick the first of available with the highest quality in Accept-Encoding, or None"""
+    best, best_quality = None, 0
+    for encoding in available:
+        quality = request.accept_encodings.quality(encoding)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
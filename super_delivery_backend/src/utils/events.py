@@ -0,0 +1,247 @@
+from sqlalchemy import inspect
+from src.models.user import db
+from src.models.order import Order
+from src.models.order_event import OrderEvent
+from src.routes.error_handler import log_error, log_warning
+import json
+import os
+import queue
+import socket
+import stat
+import tempfile
+import threading
+
+# Largest datagram a worker will accept from its peers
+MAX_MESSAGE_BYTES = 64 * 1024
+
+# Events buffered per subscriber before the slowest ones start dropping
+SUBSCRIBER_QUEUE_SIZE = 100
+
+class Subscription:
+    """A subscriber's queue of events on one channel"""
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+        self.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def get(self, timeout=None):
+        """Wait for the next event, returning None on timeout"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+class EventBroker:
+    """In-process pub/sub with fan-out to the other workers on this host.
+
+    Every worker process that has subscribers binds a Unix datagram socket in a
+    shared directory. Publishing delivers to local subscribers directly and
+    sends one datagram to every other socket in the directory, so events reach
+    subscribers connected to any gunicorn worker.
+    """
+    def __init__(self, directory=None):
+        self.directory = directory
+        self._subscribers = {}
+        self._handlers = {}
+        self._lock = threading.Lock()
+        self._socket = None
+        self._socket_path = None
+        self._pid = None
+
+    def configure(self, directory):
+        _check_private_directory(directory)
+        self.directory = directory
+
+    def subscribe(self, channel):
+        """Start receiving events published on a channel"""
+        subscription = Subscription(self, channel)
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(subscription)
+        self.ensure_listener()
+        return subscription
+
+    def add_handler(self, channel, handler):
+        """Call handler(data) for every event on a channel received by this process.
+
+        Handlers run on the publishing thread for local events and on the receive
+        thread for events from other workers, so they must be quick and thread-safe.
+        """
+        with self._lock:
+            self._handlers.setdefault(channel, []).append(handler)
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+    def publish(self, channel, data):
+        """Deliver an event to subscribers in every worker"""
+        self._deliver(channel, data)
+        if self.directory and hasattr(socket, 'AF_UNIX'):
+            message = json.dumps({'channel': channel, 'data': data}, default=str).encode()
+            if len(message) > MAX_MESSAGE_BYTES:
+                log_warning(f"Event on {channel} is too large to fan out ({len(message)} bytes)")
+                return
+            self._broadcast(message)
+
+    def _deliver(self, channel, data):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+            handlers = list(self._handlers.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(data)
+            except queue.Full:
+                # A stalled client must not hold up publishers; it resyncs on reconnect
+                log_warning(f"Dropped event on {channel} for a slow subscriber")
+        for handler in handlers:
+            try:
+                handler(data)
+            except Exception as e:
+                log_error(f"Event handler for {channel} failed: {str(e)}")
+
+    def _broadcast(self, message):
+        own_path = self._socket_path if self._pid == os.getpid() else None
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+
+        sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sender.setblocking(False)
+        try:
+            for name in names:
+                if not name.endswith('.sock'):
+                    continue
+                path = os.path.join(self.directory, name)
+                if path == own_path:
+                    continue
+                try:
+                    sender.sendto(message, path)
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # The worker behind this socket has exited
+                    self._remove_stale(path)
+                except BlockingIOError:
+                    log_warning(f"Event dropped, peer queue full: {name}")
+                except OSError as e:
+                    log_warning(f"Could not deliver event to {name}: {str(e)}")
+        finally:
+            sender.close()
+
+    def _remove_stale(self, path):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+    def ensure_listener(self):
+        """Bind this worker's socket and start its receive thread once per process"""
+        if not self.directory or not hasattr(socket, 'AF_UNIX'):
+            return
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            path = os.path.join(self.directory, f'{pid}.sock')
+            self._remove_stale(path)
+            listener = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            listener.bind(path)
+            self._socket, self._socket_path, self._pid = listener, path, pid
+
+        thread = threading.Thread(target=self._listen, args=(listener,), name='event-broker', daemon=True)
+        thread.start()
+
+    def _listen(self, listener):
+        while True:
+            try:
+                raw = listener.recv(MAX_MESSAGE_BYTES)
+            except OSError as e:
+                log_error(f"Event broker listener stopped: {str(e)}")
+                return
+            try:
+                message = json.loads(raw)
+                self._deliver(message['channel'], message['data'])
+            except (ValueError, KeyError, TypeError) as e:
+                log_error(f"Ignoring malformed event: {str(e)}")
+
+broker = EventBroker()
+
+def init_event_broker(app):
+    """Point the broker at the directory shared by this host's workers.
+
+    Anyone who can send to the sockets there can inject status events into
+    customers' streams, so the directory must be private to this user.
+    Outside debug and testing EVENT_BROKER_DIR must be set; otherwise a
+    per-user default in the temp directory is used.
+    """
+    directory = app.config.get('EVENT_BROKER_DIR')
+    if not directory:
+        if not (app.debug or app.testing):
+            raise RuntimeError("EVENT_BROKER_DIR must be set to a directory used only by this deployment's workers")
+        directory = os.path.join(tempfile.gettempdir(), f'super_delivery_events_{_user_id()}')
+    broker.configure(directory)
+
+def _check_private_directory(path):
+    """Create path with mode 700, or refuse one that is a link, another user's, or open to others"""
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode):
+        raise PermissionError(f"{path} is not a directory")
+    if hasattr(os, 'getuid') and info.st_uid != os.getuid():
+        raise PermissionError(f"{path} belongs to another user")
+    if info.st_mode & 0o077:
+        raise PermissionError(f"{path} is open to other users; it must have mode 700")
+
+def _user_id():
+    return os.getuid() if hasattr(os, 'getuid') else 'default'
+
+def format_sse(data, event=None):
+    """Encode one Server-Sent Events message"""
+    message = f'event: {event}\n' if event else ''
+    return message + f'data: {json.dumps(data, default=str)}\n\n'
+
+def record_order_event(order, source, note=None):
+    """Append the order's current status to its event log in the current transaction"""
+    if inspect(order).persistent:
+        # Incremented in SQL so concurrent writers serialize on the order row
+        order.event_seq = Order.event_seq + 1
+    else:
+        order.event_seq = 1
+    db.session.flush()
+    
+    event = OrderEvent(
+        order_id=order.id,
+        seq=order.event_seq,
+        status=order.status.value,
+        source=source,
+        note=note
+    )
+    db.session.add(event)
+    return event
+
+def publish_order_update(order):
+    """Push an order's current status to its order, customer and restaurant channels"""
+    data = {
+        'order_id': order.id,
+        'seq': order.event_seq,
+        'status': order.status.value if order.status else None,
+        'updated_at': order.updated_at.isoformat() if order.updated_at else None,
+        'customer_id': order.customer_id,
+        'restaurant_id': order.restaurant_id,
+        'driver_id': order.driver_id
+    }
+    try:
+        broker.publish(f'order:{order.id}', data)
+        broker.publish(f'customer:{order.customer_id}', data)
+        broker.publish(f'restaurant:{order.restaurant_id}', data)
+    except Exception as e:
+        # Notifications are best effort; the status change itself is already committed
+        log_error(f"Failed to publish update for order {order.id}: {str(e)}")
@@ -0,0 +1,147 @@
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from werkzeug.security import check_password_hash, generate_password_hash
+from src.routes.error_handler import APIError, log_error, log_info
+import multiprocessing
+import os
+import threading
+import time
+
+DEFAULT_HASH_METHOD = 'scrypt:32768:8:1'
+
+class PasswordHasher:
+    """Hashes and checks passwords in a per-worker process pool.
+
+    Key derivation takes tens of milliseconds of CPU; running it in separate
+    processes keeps request threads responsive during login bursts. The pool
+    size and the pending-hash cap are configured for the whole host and split
+    evenly between the web workers, so a host never runs more hashing
+    processes than it has cores (or one per web worker, if that is more),
+    and never admits more than the host cap. Beyond its share a worker
+    rejects sign-ins with 503 instead of queueing without bound.
+    """
+    def __init__(self):
+        self.method = DEFAULT_HASH_METHOD
+        self.workers = os.cpu_count() or 1
+        self.max_pending = 32
+        self.web_workers = 1
+        self.timeout = 10
+        self.counters = Counter()
+        self._in_flight = 0
+        self._hash_seconds = 0.0
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+
+    def configure(self, app):
+        self.method = app.config.get('PASSWORD_HASH_METHOD', self.method)
+        self.web_workers = max(1, app.config.get('WEB_CONCURRENCY', 1))
+        host_workers = app.config.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 1)
+        host_pending = app.config.get('PASSWORD_HASH_MAX_PENDING', 32)
+        # 0 processes still means hashing inline
+        self.workers = max(1, host_workers // self.web_workers) if host_workers else 0
+        self.max_pending = max(1, host_pending // self.web_workers)
+        self.timeout = app.config.get('PASSWORD_HASH_TIMEOUT', self.timeout)
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self.shutdown()
+
+    def hash(self, password):
+        """Hash a password with the configured method"""
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        """Check a password against a stored hash"""
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """Whether a stored hash was made with other parameters than the configured ones"""
+        return password_hash.split('$', 1)[0] != self.method
+
+    def stats(self):
+        with self._lock:
+            in_flight = self._in_flight
+            counters = dict(self.counters)
+            hash_seconds = self._hash_seconds
+        completed = counters.get('completed', 0)
+        return {
+            'pid': os.getpid(),
+            'method': self.method,
+            'workers': self.workers,
+            'max_pending': self.max_pending,
+            'web_workers': self.web_workers,
+            'in_flight': in_flight,
+            'queue_depth': max(0, in_flight - self.workers),
+            'completed': completed,
+            'rejected': counters.get('rejected', 0),
+            'timeouts': counters.get('timeouts', 0),
+            'failures': counters.get('failures', 0),
+            'average_ms': round(hash_seconds / completed * 1000, 2) if completed else None
+        }
+
+    def shutdown(self):
+        with self._lock:
+            executor, owner_pid = self._executor, self._pid
+            self._executor = self._pid = None
+        # A pool inherited through fork belongs to the parent process
+        if executor and owner_pid == os.getpid():
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _get_executor(self):
+        """Start the pool lazily so each forked worker gets its own"""
+        pid = os.getpid()
+        with self._lock:
+            if self._executor is None or self._pid != pid:
+                # Spawned children stay safe to start from a threaded worker
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+                self._pid = pid
+                log_info(f"Started password hashing pool with {self.workers} processes")
+            return self._executor
+
+    def _run(self, func, *args):
+        if not self.workers:
+            return func(*args)
+
+        if not self._slots.acquire(blocking=False):
+            self._count('rejected')
+            raise APIError("Too many sign-in requests, please retry shortly", 503)
+
+        started = time.perf_counter()
+        with self._lock:
+            self._in_flight += 1
+        try:
+            executor = self._get_executor()
+            result = executor.submit(func, *args).result(timeout=self.timeout)
+            with self._lock:
+                self.counters['completed'] += 1
+                self._hash_seconds += time.perf_counter() - started
+            return result
+        except FutureTimeoutError:
+            self._count('timeouts')
+            raise APIError("Sign-in is taking too long, please retry shortly", 503)
+        except BrokenProcessPool as e:
+            self._count('failures')
+            log_error(f"Password hashing pool failed: {str(e)}")
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            raise APIError("Sign-in is temporarily unavailable, please retry shortly", 503)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            self._slots.release()
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+password_hasher = PasswordHasher()
+
+def init_password_hasher(app):
+    """Apply the hashing pool configuration"""
+    password_hasher.configure(app)
@@ -0,0 +1,244 @@
+from datetime import datetime, timezone
+from flask import g, has_request_context, request
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Request details copied onto every record logged while handling a request
+REQUEST_FIELDS = ('endpoint', 'method', 'path')
+
+_exception_formatter = logging.Formatter()
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line, with the request a record was logged in"""
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'pid': record.process,
+            'thread': record.threadName
+        }
+        for field in REQUEST_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class SharedRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler for a log file written by several worker processes.
+
+    Rollover takes an exclusive lock and re-checks the size, so only one
+    process rotates the file; the others notice the new file by its inode and
+    reopen it instead of writing to the rotated one.
+    """
+    def emit(self, record):
+        if self.stream is not None:
+            try:
+                if os.stat(self.baseFilename).st_ino != os.fstat(self.stream.fileno()).st_ino:
+                    self._reopen()
+            except FileNotFoundError:
+                self._reopen()
+        super().emit(record)
+
+    def doRollover(self):
+        with open(self.baseFilename + '.lock', 'a') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                if os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename) >= self.maxBytes:
+                    super().doRollover()
+                else:
+                    # Another process rotated the file first
+                    self._reopen()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _reopen(self):
+        if self.stream is not None:
+            self.stream.close()
+        self.stream = self._open()
+
+class PipelineQueueHandler(QueueHandler):
+    """Hands records to the pipeline's queue without ever blocking the caller"""
+    def __init__(self, pipeline):
+        super().__init__(None)
+        self.pipeline = pipeline
+
+    def filter(self, record):
+        return self.pipeline.accepts(record) and super().filter(record)
+
+    def prepare(self, record):
+        # Resolve arguments and tracebacks here, while the objects they refer to are still live
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        if has_request_context():
+            record.endpoint = request.endpoint
+            record.method = request.method
+            record.path = request.path
+        return record
+
+    def enqueue(self, record):
+        self.pipeline.enqueue(record)
+
+class LogPipeline:
+    """Root logging through a bounded in-memory queue drained by a background thread.
+
+    Request threads only format the message and enqueue it; the listener
+    thread writes the rotating JSON file and the console. When the queue is
+    full records are dropped and counted rather than waiting on the disk. INFO
+    records from endpoints listed in sample_rates are kept for that fraction of
+    requests, decided once per request so a sampled request logs every line.
+    """
+    def __init__(self):
+        self.level = logging.INFO
+        self.filename = 'app.log'
+        self.file_format = 'json'
+        self.max_bytes = 10 * 1024 * 1024
+        self.backup_count = 5
+        self.queue_size = 10000
+        self.sample_rates = {}
+        self.handler = PipelineQueueHandler(self)
+        self.queue = None
+        self._listener = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._dropped = 0
+        self._unreported_drops = 0
+        self._sampled_out = 0
+
+    def configure(self, settings):
+        self.level = logging.getLevelName(settings.get('LOG_LEVEL', 'INFO').upper())
+        self.filename = settings.get('LOG_FILE', self.filename)
+        self.file_format = settings.get('LOG_FILE_FORMAT', self.file_format)
+        self.max_bytes = settings.get('LOG_MAX_BYTES', self.max_bytes)
+        self.backup_count = settings.get('LOG_BACKUP_COUNT', self.backup_count)
+        self.queue_size = settings.get('LOG_QUEUE_SIZE', self.queue_size)
+        self.sample_rates = parse_sample_rates(settings.get('LOG_INFO_SAMPLE_RATES', ''))
+
+        root = logging.getLogger()
+        root.setLevel(self.level)
+        if self.handler not in root.handlers:
+            root.addHandler(self.handler)
+        # Restart so new handler settings apply
+        self.stop()
+        self._start()
+
+    def accepts(self, record):
+        """Apply per-endpoint sampling to INFO and lower records logged during a request"""
+        if record.levelno > logging.INFO or not self.sample_rates or not has_request_context():
+            return True
+        rate = self.sample_rates.get(request.endpoint)
+        if rate is None:
+            return True
+        keep = g.get('log_sampled')
+        if keep is None:
+            keep = g.log_sampled = random.random() < rate
+        if not keep:
+            with self._lock:
+                self._sampled_out += 1
+        return keep
+
+    def enqueue(self, record):
+        if self._pid != os.getpid():
+            self._start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self._dropped += 1
+                self._unreported_drops += 1
+            return
+
+        if self._unreported_drops:
+            with self._lock:
+                dropped, self._unreported_drops = self._unreported_drops, 0
+            try:
+                self.queue.put_nowait(logging.makeLogRecord({
+                    'name': __name__,
+                    'levelno': logging.WARNING,
+                    'levelname': 'WARNING',
+                    'msg': f"Dropped {dropped} log records because the log queue was full"
+                }))
+            except queue.Full:
+                with self._lock:
+                    self._unreported_drops += dropped
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'queue_depth': self.queue.qsize() if self.queue else 0,
+                'queue_size': self.queue_size,
+                'dropped': self._dropped,
+                'sampled_out': self._sampled_out,
+                'sample_rates': dict(self.sample_rates)
+            }
+
+    def stop(self):
+        """Write out queued records and stop the listener thread"""
+        with self._lock:
+            listener, owner_pid = self._listener, self._pid
+            self._listener = self._pid = None
+        # A listener inherited through fork has no thread in this process
+        if listener is not None and owner_pid == os.getpid():
+            listener.stop()
+            for handler in listener.handlers:
+                handler.close()
+
+    def _start(self):
+        """Start a listener with its own queue and files, once per process"""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self.queue = queue.Queue(maxsize=self.queue_size)
+            self._listener = QueueListener(self.queue, *self._handlers(), respect_handler_level=True)
+            self._listener.start()
+            self._pid = os.getpid()
+
+    def _handlers(self):
+        console = logging.StreamHandler()
+        console.setFormatter(logging.Formatter(TEXT_FORMAT))
+        if not self.filename:
+            return [console]
+
+        logfile = SharedRotatingFileHandler(self.filename, maxBytes=self.max_bytes, backupCount=self.backup_count)
+        logfile.setFormatter(JSONFormatter() if self.file_format == 'json' else logging.Formatter(TEXT_FORMAT))
+        return [logfile, console]
+
+log_pipeline = LogPipeline()
+atexit.register(log_pipeline.stop)
+
+def init_logging(app):
+    """Apply the app's logging configuration to the pipeline"""
+    log_pipeline.configure(app.config)
+
+def parse_sample_rates(raw):
+    """Parse 'endpoint=rate,...' into a dict of endpoint -> fraction of requests to log"""
+    rates = {}
+    for item in raw.split(','):
+        endpoint, _, rate = item.partition('=')
+        if endpoint.strip() and rate.strip():
+            rates[endpoint.strip()] = min(1.0, max(0.0, float(rate)))
+    return rates
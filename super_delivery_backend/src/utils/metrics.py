@@ -0,0 +1,408 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+from flask import g, request
+from src.routes.error_handler import log_warning
+from src.utils.cache import object_cache
+from src.utils.hashing import password_hasher
+from src.utils.logging_pipeline import log_pipeline
+from src.utils.sql_instrumentation import current_query_stats, slow_query_log
+import atexit
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+EXTERNAL_CALL_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Snapshot files are named after the worker that writes them
+_SNAPSHOT_FILE = re.compile(r'^metrics_(\d+)\.json$')
+_ARCHIVE_FILE = 'metrics_archive.json'
+# Written by the gunicorn master (gunicorn.conf.py) into the directory it cleared for its workers
+_MASTER_PID_FILE = 'master.pid'
+
+class Metric:
+    """A named family of series keyed by label values"""
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def export(self):
+        with self._lock:
+            return {
+                'kind': self.kind,
+                'help': self.help,
+                'labels': list(self.labels),
+                'series': [[list(key), _copy(value)] for key, value in self._series.items()]
+            }
+
+class CounterMetric(Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+class GaugeMetric(Metric):
+    kind = 'gauge'
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+class HistogramMetric(Metric):
+    """Cumulative histogram; each series is a count per bucket, then +Inf, then the sum"""
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def export(self):
+        exported = super().export()
+        exported['buckets'] = list(self.buckets)
+        return exported
+
+class MetricsRegistry:
+    """Metrics of this worker, merged with its peers' when scraped.
+
+    Every worker writes a JSON snapshot of its metrics to a directory shared
+    by the host's workers, at most flush_interval seconds apart. A scrape
+    merges all snapshots: counters and histograms are summed, including those
+    of workers that have exited, whose last snapshot is folded into an
+    archive file; gauges are summed over live workers only.
+    """
+    def __init__(self):
+        self.directory = None
+        self.flush_interval = 5
+        self.metrics = {}
+        self.collectors = []
+        self._lock = threading.Lock()
+        self._pid = None
+        self._owner_pid = None
+
+    def configure(self, directory, flush_interval, temporary=False):
+        if self._owner_pid == os.getpid() and directory != self.directory:
+            shutil.rmtree(self.directory, ignore_errors=True)
+        self.directory = directory
+        self.flush_interval = flush_interval
+        # A directory made for this process is removed when the process exits
+        self._owner_pid = os.getpid() if temporary else None
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+
+    def clear(self):
+        """Delete every snapshot and the archive, so counters start from zero"""
+        for name in os.listdir(self.directory):
+            if _SNAPSHOT_FILE.match(name) or name == _ARCHIVE_FILE:
+                os.remove(os.path.join(self.directory, name))
+
+    def register(self, metric):
+        with self._lock:
+            return self.metrics.setdefault(metric.name, metric)
+
+    def add_collector(self, collector):
+        """Call collector() at every snapshot; it returns (name, kind, help, value) tuples"""
+        self.collectors.append(collector)
+
+    def snapshot(self):
+        metrics = {name: metric.export() for name, metric in list(self.metrics.items())}
+        for collector in self.collectors:
+            try:
+                samples = collector()
+            except Exception as e:
+                log_warning(f"Metrics collector failed: {str(e)}")
+                continue
+            for name, kind, help, value in samples:
+                metrics[name] = {'kind': kind, 'help': help, 'labels': [], 'series': [[[], value]]}
+        return metrics
+
+    def reset(self):
+        """Forget every recorded value"""
+        for metric in list(self.metrics.values()):
+            with metric._lock:
+                metric._series.clear()
+
+    def ensure_flusher(self):
+        """Start this worker's snapshot thread, once per process"""
+        if self._pid == os.getpid() or not self.directory:
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._flush_loop, name='metrics-flusher', daemon=True).start()
+
+    def flush(self):
+        """Write this worker's snapshot for its peers to read"""
+        if not self.directory:
+            return
+        path = os.path.join(self.directory, f'metrics_{os.getpid()}.json')
+        _write_json(path, self.snapshot())
+
+    def collect(self):
+        """Merge the snapshots of every worker on this host, this one included"""
+        self.flush()
+        merged = {}
+        for name in os.listdir(self.directory):
+            match = _SNAPSHOT_FILE.match(name)
+            if not match:
+                continue
+            path = os.path.join(self.directory, name)
+            snapshot = _read_json(path)
+            if snapshot is None:
+                continue
+            if _process_alive(int(match.group(1))):
+                _merge(merged, snapshot, gauges=True)
+            else:
+                self._archive(path)
+        archive = _read_json(os.path.join(self.directory, _ARCHIVE_FILE))
+        if archive:
+            _merge(merged, archive, gauges=False)
+        return merged
+
+    def render(self):
+        """Prometheus text exposition of the merged metrics"""
+        lines = []
+        for name, metric in sorted(self.collect().items()):
+            lines.append(f"# HELP {name} {metric['help']}")
+            lines.append(f"# TYPE {name} {metric['kind']}")
+            labels = metric['labels']
+            for key, value in sorted(metric['series'], key=lambda series: series[0]):
+                pairs = list(zip(labels, key))
+                if metric['kind'] != 'histogram':
+                    lines.append(f"{name}{_format_labels(pairs)} {_format_value(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric['buckets'] + ['+Inf'], value[:-1]):
+                    cumulative += count
+                    le = bound if bound == '+Inf' else _format_value(bound)
+                    lines.append(f"{name}_bucket{_format_labels(pairs + [('le', le)])} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(pairs)} {_format_value(value[-1])}")
+                lines.append(f"{name}_count{_format_labels(pairs)} {cumulative}")
+        return '\n'.join(lines) + '\n'
+
+    def flush_at_exit(self):
+        if self._owner_pid == os.getpid():
+            shutil.rmtree(self.directory, ignore_errors=True)
+            return
+        # Counters recorded since the last snapshot would otherwise be lost with the worker
+        if self._pid == os.getpid():
+            self.flush()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                log_warning(f"Could not write metrics snapshot: {str(e)}")
+
+    def _archive(self, path):
+        """Fold an exited worker's counters into the archive so totals never go backwards"""
+        archive_path = os.path.join(self.directory, _ARCHIVE_FILE)
+        with open(archive_path + '.lock', 'a') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                # Another worker may have archived it while this one waited for the lock
+                snapshot = _read_json(path)
+                if snapshot is None:
+                    return
+                archive = _read_json(archive_path) or {}
+                _merge(archive, snapshot, gauges=False)
+                _write_json(archive_path, archive)
+                os.remove(path)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+metrics = MetricsRegistry()
+atexit.register(metrics.flush_at_exit)
+# A forked worker starts from zero; what it inherited is still counted by its parent
+os.register_at_fork(after_in_child=metrics.reset)
+
+http_requests = metrics.register(HistogramMetric(
+    'http_request_duration_seconds', 'Time to produce a response, by endpoint, method and status',
+    ('endpoint', 'method', 'status')
+))
+http_in_flight = metrics.register(GaugeMetric(
+    'http_requests_in_flight', 'Requests being handled, including open streams'
+))
+db_time = metrics.register(HistogramMetric(
+    'db_request_duration_seconds', 'Database time spent by a request before its response', ('endpoint',)
+))
+db_queries = metrics.register(HistogramMetric(
+    'db_queries_per_request', 'Statements run by a request before its response', ('endpoint',),
+    buckets=QUERY_COUNT_BUCKETS
+))
+external_calls = metrics.register(HistogramMetric(
+    'external_call_duration_seconds', 'Calls to third-party services, by outcome',
+    ('service', 'operation', 'outcome'), buckets=EXTERNAL_CALL_BUCKETS
+))
+
+def init_metrics(app):
+    """Record request metrics and share them with the other workers of this deployment.
+
+    Outside debug and testing METRICS_DIR must be set. A directory shared by
+    every deployment on the host would merge their counters. Without it, a
+    private temporary directory is used, and gunicorn.conf.py passes its own
+    to the workers. A directory that no running gunicorn master cleared for
+    this process holds snapshots from an earlier run, so it is cleared here.
+    """
+    directory = app.config.get('METRICS_DIR')
+    flush_interval = app.config.get('METRICS_FLUSH_INTERVAL', metrics.flush_interval)
+    if directory:
+        metrics.configure(directory, flush_interval)
+        if not _cleared_by_master(directory):
+            metrics.clear()
+    elif app.debug or app.testing:
+        metrics.configure(tempfile.mkdtemp(prefix='super_delivery_metrics_'), flush_interval, temporary=True)
+    else:
+        raise RuntimeError("METRICS_DIR must be set to a directory used only by this deployment's workers")
+    if _subsystem_samples not in metrics.collectors:
+        metrics.add_collector(_subsystem_samples)
+
+    @app.before_request
+    def start_request_metrics():
+        metrics.ensure_flusher()
+        g.metrics_started = time.perf_counter()
+        http_in_flight.inc()
+
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.get('metrics_started')
+        if started is None:
+            return response
+        endpoint = request.endpoint or 'none'
+        http_requests.observe(time.perf_counter() - started, endpoint, request.method, str(response.status_code))
+        stats = current_query_stats()
+        if stats is not None:
+            db_time.observe(stats.seconds, endpoint)
+            db_queries.observe(stats.count, endpoint)
+        return response
+
+    @app.teardown_request
+    def finish_request_metrics(exc):
+        # Teardown runs once a streamed body is finished
+        if g.pop('metrics_started', None) is not None:
+            http_in_flight.dec()
+
+@contextmanager
+def track_external_call(service, operation):
+    """Time a call to a third-party service, labelled ok or error by whether it raised"""
+    started = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'ok'
+    finally:
+        external_calls.observe(time.perf_counter() - started, service, operation, outcome)
+
+def _subsystem_samples():
+    cache = object_cache.stats()
+    hashing = password_hasher.stats()
+    logging_stats = log_pipeline.stats()
+    slow_queries = slow_query_log.stats()
+    return [
+        ('object_cache_hits_total', 'counter', 'Object cache lookups served without the database',
+         cache['local_hits'] + cache['shared_hits']),
+        ('object_cache_misses_total', 'counter', 'Object cache lookups that went to the database', cache['misses']),
+        ('password_hashes_in_flight', 'gauge', 'Password hashes running or queued', hashing['in_flight']),
+        ('password_hash_rejections_total', 'counter', 'Sign-ins rejected because the hashing queue was full',
+         hashing['rejected']),
+        ('log_records_dropped_total', 'counter', 'Log records dropped because the log queue was full',
+         logging_stats['dropped']),
+        ('db_slow_queries_total', 'counter', 'Statements slower than SQL_SLOW_QUERY_MS, logged or deduplicated',
+         slow_queries['reported'] + slow_queries['suppressed'])
+    ]
+
+def _copy(value):
+    return list(value) if isinstance(value, list) else value
+
+def _merge(into, snapshot, gauges):
+    for name, metric in snapshot.items():
+        if metric['kind'] == 'gauge' and not gauges:
+            continue
+        target = into.get(name)
+        if target is None:
+            target = into[name] = dict(metric, series=[])
+        series = {tuple(key): value for key, value in target['series']}
+        for key, value in metric['series']:
+            key = tuple(key)
+            current = series.get(key)
+            if current is None:
+                series[key] = _copy(value)
+            elif isinstance(value, list):
+                series[key] = [a + b for a, b in zip(current, value)]
+            else:
+                series[key] = current + value
+        target['series'] = [[list(key), value] for key, value in series.items()]
+
+def _cleared_by_master(directory):
+    """Whether the gunicorn master running this process, or this process itself under preload, owns directory"""
+    try:
+        with open(os.path.join(directory, _MASTER_PID_FILE)) as f:
+            pid = int(f.read().strip())
+    except (OSError, ValueError):
+        return False
+    return pid in (os.getpid(), os.getppid())
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+def _write_json(path, data):
+    # Write then rename so readers never see a partial file
+    temporary = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(temporary, 'w') as f:
+        json.dump(data, f)
+    os.replace(temporary, path)
+
+def _format_labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
@@ -0,0 +1,140 @@
+from contextlib import contextmanager
+from datetime import datetime
+from flask.cli import with_appcontext
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, select, text
+from src.models.user import db
+from src.routes.error_handler import log_info
+import click
+import importlib
+import os
+import re
+import tempfile
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+MIGRATIONS_PACKAGE = 'src.migrations'
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'migrations')
+
+# Migrations are files named <4 digit version>_<name>.py, applied in version order
+_MIGRATION_FILE = re.compile(r'^(\d{4})_(\w+)\.py$')
+
+# Key of the PostgreSQL advisory lock held while migrating, shared by every worker and host
+_ADVISORY_LOCK_KEY = 72_190_525
+
+_version_metadata = MetaData()
+schema_version = Table(
+    'schema_version', _version_metadata,
+    Column('version', Integer, primary_key=True),
+    Column('name', String(100), nullable=False),
+    Column('applied_at', DateTime, nullable=False)
+)
+
+class Migration:
+    """One schema change: a module with a docstring and an upgrade(connection) function"""
+    __slots__ = ('version', 'name', 'description', 'upgrade')
+
+    def __init__(self, version, name, description, upgrade):
+        self.version = version
+        self.name = name
+        self.description = description
+        self.upgrade = upgrade
+
+def load_migrations(directory=MIGRATIONS_DIR):
+    """Every migration in the migrations folder, oldest first"""
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        match = _MIGRATION_FILE.match(filename)
+        if not match:
+            continue
+        module = importlib.import_module(f'{MIGRATIONS_PACKAGE}.{filename[:-3]}')
+        description = (module.__doc__ or '').strip().split('\n')[0]
+        migrations.append(Migration(int(match.group(1)), match.group(2), description, module.upgrade))
+
+    versions = [migration.version for migration in migrations]
+    if len(set(versions)) != len(versions):
+        raise RuntimeError(f"Two migrations share a version number in {directory}")
+    return migrations
+
+def applied_versions(connection):
+    """Versions already applied to the database, creating the bookkeeping table if needed"""
+    _version_metadata.create_all(connection, checkfirst=True)
+    return set(connection.execute(select(schema_version.c.version)).scalars())
+
+def migrate(engine=None):
+    """Apply pending migrations in order, each in its own transaction; returns those applied.
+
+    Workers starting together wait on a lock, and each re-reads the applied
+    versions once it holds it, so every migration runs exactly once. SQLite
+    commits DDL as it runs, so a migration that fails halfway stays partly
+    applied; migrations check before each change so the next run finishes it.
+    """
+    engine = engine or db.engine
+    migrations = load_migrations()
+    applied = []
+    with _migration_lock(engine):
+        with engine.begin() as connection:
+            done = applied_versions(connection)
+        for migration in migrations:
+            if migration.version in done:
+                continue
+            with engine.begin() as connection:
+                migration.upgrade(connection)
+                connection.execute(schema_version.insert().values(
+                    version=migration.version,
+                    name=migration.name,
+                    applied_at=datetime.utcnow()
+                ))
+            log_info(f"Applied migration {migration.version:04d} {migration.name}")
+            applied.append(migration)
+    return applied
+
+def init_migrations(app):
+    """Bring the schema up to date at startup unless deployments run `flask migrate` themselves"""
+    if not app.config.get('MIGRATE_ON_STARTUP', True):
+        return
+    with app.app_context():
+        migrate()
+
+@contextmanager
+def _migration_lock(engine):
+    if engine.dialect.name == 'postgresql':
+        with engine.connect() as connection:
+            connection.execute(text('SELECT pg_advisory_lock(:key)'), {'key': _ADVISORY_LOCK_KEY})
+            try:
+                yield
+            finally:
+                connection.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': _ADVISORY_LOCK_KEY})
+                connection.commit()
+        return
+
+    # SQLite lives on this host, so a lock file is enough to serialize the workers
+    with open(os.path.join(tempfile.gettempdir(), 'super_delivery_migrations.lock'), 'a') as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+@click.command('migrate')
+@click.option('--status', is_flag=True, help='List migrations and whether they are applied, without applying any')
+@with_appcontext
+def migrate_command(status):
+    """Apply pending schema migrations"""
+    if status:
+        with db.engine.begin() as connection:
+            done = applied_versions(connection)
+        for migration in load_migrations():
+            state = 'applied' if migration.version in done else 'pending'
+            click.echo(f"{migration.version:04d} {migration.name} [{state}] {migration.description}")
+        return
+
+    applied = migrate()
+    for migration in applied:
+        click.echo(f"Applied {migration.version:04d} {migration.name}")
+    if not applied:
+        click.echo("Database schema is up to date")
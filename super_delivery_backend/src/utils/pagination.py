@@ -0,0 +1,58 @@
+from sqlalchemy import tuple_
+from src.routes.error_handler import APIError
+from datetime import datetime
+import base64
+import json
+
+MAX_PER_PAGE = 100
+
+def encode_cursor(values):
+    """Encode the sort key of the last row into an opaque cursor string"""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor, types):
+    """Decode a cursor string back into sort key values of the given types"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(payload, list) or len(payload) != len(types):
+            raise ValueError("cursor does not match sort key")
+        return [
+            datetime.fromisoformat(value) if value_type is datetime else value_type(value)
+            for value, value_type in zip(payload, types)
+        ]
+    except (ValueError, TypeError):
+        raise APIError("Invalid pagination cursor", 400)
+
+def clamp_per_page(per_page):
+    """The page size keyset_paginate() actually uses for a requested per_page"""
+    return max(1, min(per_page, MAX_PER_PAGE))
+
+def keyset_paginate(query, sort_columns, sort_key, cursor=None, per_page=20):
+    """Fetch one page of a query in descending sort_columns order, starting after cursor.
+
+    sort_key maps a result row to the values of sort_columns. The last column must be
+    unique (normally the primary key) so every row has a distinct position. Returns the
+    rows and the cursor of the following page, or None on the last page.
+    """
+    per_page = clamp_per_page(per_page)
+
+    if cursor:
+        after = decode_cursor(cursor, [column.type.python_type for column in sort_columns])
+        # The redundant bound on the leading column lets the database seek into the index;
+        # SQLite does not turn a row-value comparison on an expression into a range
+        query = query.filter(sort_columns[0] <= after[0], tuple_(*sort_columns) < tuple_(*after))
+
+    # One extra row tells us whether another page exists without counting
+    rows = (
+        query.order_by(None)
+        .order_by(*[column.desc() for column in sort_columns])
+        .limit(per_page + 1)
+        .all()
+    )
+    if len(rows) <= per_page:
+        return rows, None
+    rows = rows[:per_page]
+    return rows, encode_cursor(sort_key(rows[-1]))
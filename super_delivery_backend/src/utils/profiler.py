@@ -0,0 +1,219 @@
+from collections import Counter
+from datetime import datetime
+from flask import after_this_request, g, request
+from src.routes.error_handler import log_info, log_warning
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+
+PROFILE_HEADER = 'X-Profile'
+
+# Innermost frame whose module starts with one of these decides where a sample's time goes
+CATEGORY_PREFIXES = (
+    ('sqlalchemy', ('sqlalchemy', 'sqlite3', 'psycopg2')),
+    ('json', ('json', 'flask.json', 'src.utils.serialization')),
+    ('jwt', ('jwt',)),
+    ('handler', ('src',)),
+    ('waiting', ('threading', 'queue', 'selectors', 'socket', 'ssl'))
+)
+
+_UNSAFE_NAME = re.compile(r'[^A-Za-z0-9_.-]+')
+
+class StackSampler:
+    """Samples the Python stacks of running threads from a background thread.
+
+    Stacks are kept in collapsed form (outermost;...;innermost frame -> count)
+    for flame graph tools, and each sample is attributed to the category of
+    its innermost recognisable frame.
+    """
+    def __init__(self, interval, thread_ids):
+        self.interval = interval
+        # Live set of thread ids to sample; it may change while sampling
+        self.thread_ids = thread_ids
+        self.stacks = Counter()
+        self.categories = Counter()
+        self.samples = 0
+        self.started_at = None
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self.started_at
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id in tuple(self.thread_ids):
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    self._record(frame)
+
+    def _record(self, frame):
+        names = []
+        category = None
+        while frame is not None:
+            module = frame.f_globals.get('__name__', '?')
+            if category is None:
+                category = _categorize(module)
+            names.append(f'{module}:{frame.f_code.co_name}')
+            frame = frame.f_back
+
+        names.reverse()
+        self.stacks[';'.join(names)] += 1
+        self.categories[category or 'framework'] += 1
+        self.samples += 1
+
+class Profiler:
+    """Opt-in sampling of one request, or of a whole worker for a few seconds.
+
+    Nothing runs unless a profile is requested; otherwise each request costs
+    one header lookup and one attribute check. A worker profile samples only
+    threads handling requests that started while it runs, leaving out idle
+    pool threads and background threads. At most PROFILE_MAX_CONCURRENT
+    profiles run per worker.
+    """
+    def __init__(self):
+        self.directory = None
+        self.interval = 0.005
+        self.max_seconds = 60
+        # Threads handling a request while a worker profile runs, else None
+        self.request_threads = None
+        self._slots = threading.BoundedSemaphore(2)
+
+    def configure(self, app):
+        self.directory = app.config.get('PROFILE_DIR') or os.path.join(tempfile.gettempdir(), 'super_delivery_profiles')
+        self.interval = app.config.get('PROFILE_INTERVAL_MS', 5) / 1000
+        self.max_seconds = app.config.get('PROFILE_MAX_SECONDS', self.max_seconds)
+        self._slots = threading.BoundedSemaphore(app.config.get('PROFILE_MAX_CONCURRENT', 2))
+        os.makedirs(self.directory, exist_ok=True)
+
+    def start_request(self):
+        """Sample the calling thread until finish(); None if too many profiles are running"""
+        if not self._slots.acquire(blocking=False):
+            return None
+        sampler = StackSampler(self.interval, {threading.get_ident()})
+        sampler.start()
+        return sampler
+
+    def finish(self, sampler, name, details):
+        """Stop a sampler and write its collapsed stacks and summary"""
+        try:
+            sampler.stop()
+            self._write(sampler, name, details)
+        finally:
+            self._slots.release()
+
+    def start_worker(self, seconds):
+        """Sample this worker's request threads for a number of seconds in the background"""
+        if not self._slots.acquire(blocking=False):
+            return None
+        name = profile_name('worker')
+        self.request_threads = set()
+        sampler = StackSampler(self.interval, self.request_threads)
+        sampler.start()
+
+        def finish():
+            time.sleep(seconds)
+            self.request_threads = None
+            self.finish(sampler, name, {'mode': 'worker', 'seconds': seconds})
+
+        threading.Thread(target=finish, name='profiler-timer', daemon=True).start()
+        return name
+
+    def _write(self, sampler, name, details):
+        path = os.path.join(self.directory, name)
+        with open(f'{path}.collapsed', 'w') as f:
+            for stack, count in sampler.stacks.most_common():
+                f.write(f'{stack} {count}\n')
+
+        summary = dict(details)
+        summary.update({
+            'pid': os.getpid(),
+            'duration_ms': round(sampler.elapsed * 1000, 2),
+            'interval_ms': self.interval * 1000,
+            'samples': sampler.samples,
+            'categories': {
+                category: {'samples': count, 'share': round(count / sampler.samples, 4)}
+                for category, count in sampler.categories.most_common()
+            }
+        })
+        with open(f'{path}.json', 'w') as f:
+            json.dump(summary, f, indent=2)
+
+        shares = ', '.join(f"{category} {value['share']:.0%}" for category, value in summary['categories'].items())
+        log_info(f"Wrote profile {name} ({sampler.samples} samples: {shares or 'no samples'})")
+
+profiler = Profiler()
+
+def init_profiler(app):
+    """Profile requests that carry the X-Profile header and an admin token.
+
+    Must run after the auth blueprint is registered, so the token has been
+    verified by the time the header is checked.
+    """
+    profiler.configure(app)
+
+    @app.before_request
+    def start_request_profile():
+        request_threads = profiler.request_threads
+        if request_threads is not None:
+            _track_request_thread(request_threads)
+        if PROFILE_HEADER in request.headers:
+            _profile_request()
+
+def _track_request_thread(request_threads):
+    """Include this request's thread in the running worker profile until the response closes"""
+    thread_id = threading.get_ident()
+    request_threads.add(thread_id)
+
+    @after_this_request
+    def untrack(response):
+        response.call_on_close(lambda: request_threads.discard(thread_id))
+        return response
+
+def _profile_request():
+    payload = g.get('auth_payload')
+    if not payload or payload.get('user_type') != 'admin':
+        log_warning(f"Ignored {PROFILE_HEADER} header on {request.path} without an admin token")
+        return
+
+    sampler = profiler.start_request()
+    name = profile_name(request.endpoint or 'none') if sampler else 'busy'
+    details = {
+        'mode': 'request',
+        'endpoint': request.endpoint,
+        'method': request.method,
+        'path': request.path
+    }
+
+    @after_this_request
+    def finish(response):
+        response.headers[f'{PROFILE_HEADER}-Id'] = name
+        if sampler is not None:
+            # Closing happens after the body is sent, so streamed bodies are profiled too
+            response.call_on_close(lambda: profiler.finish(sampler, name, details))
+        return response
+
+def profile_name(label):
+    """Unique file name stem for a profile"""
+    stamp = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+    return f"{stamp}-{os.getpid()}-{_UNSAFE_NAME.sub('_', label)}"
+
+def _categorize(module):
+    for category, prefixes in CATEGORY_PREFIXES:
+        for prefix in prefixes:
+            if module == prefix or module.startswith(prefix + '.'):
+                return category
+    return None
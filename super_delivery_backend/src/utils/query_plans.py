@@ -0,0 +1,127 @@
+from datetime import datetime
+from flask.cli import with_appcontext
+from sqlalchemy import select, tuple_
+from src.models.user import db
+from src.models.menu_item import MenuItem
+from src.models.order import Order, OrderStatus
+from src.models.order_event import OrderEvent
+from src.models.order_item import OrderItem
+from src.models.review import Review
+from src.models.cart import Cart, CartItem
+from src.models.restaurant import Restaurant
+from src.routes.order_tracking import CUSTOMER_ACTIVE_STATUSES, DRIVER_ACTIVE_STATUSES, KITCHEN_STATUSES
+from src.routes.restaurant import RESTAURANT_RATING
+import click
+import re
+import sys
+
+# Tables that grow with traffic; a full scan of one of them fails the check
+LARGE_TABLES = ('order', 'order_item', 'order_event', 'restaurant', 'menu_item', 'review', 'carts', 'cart_items')
+
+_SQLITE_FULL_SCAN = re.compile(r'^SCAN (?:TABLE )?"?(\w+)"?(?: AS \w+)?$')
+_POSTGRES_FULL_SCAN = re.compile(r'Seq Scan on "?(\w+)"?')
+
+def hot_queries():
+    """(name, statement) for every query behind a frequently polled endpoint, as the routes build them"""
+    since = datetime(2024, 1, 1)
+    return [
+        ('order.get_orders', select(Order).order_by(Order.created_at.desc(), Order.id.desc()).limit(50)),
+        ('order.get_orders customer', select(Order).where(Order.customer_id == 2)
+            .order_by(Order.created_at.desc(), Order.id.desc())),
+        ('order.get_orders restaurant', select(Order).where(
+            Order.restaurant_id == 1, Order.created_at <= since, tuple_(Order.created_at, Order.id) < tuple_(since, 100)
+        ).order_by(Order.created_at.desc(), Order.id.desc()).limit(51)),
+        ('order.get_orders restaurant+status', select(Order).where(
+            Order.restaurant_id == 1, Order.status == OrderStatus.PENDING
+        ).order_by(Order.created_at.desc(), Order.id.desc())),
+        ('order.get_orders driver', select(Order).where(Order.driver_id == 3)
+            .order_by(Order.created_at.desc(), Order.id.desc())),
+        ('order.get_orders status', select(Order).where(Order.status == OrderStatus.DELIVERED)
+            .order_by(Order.created_at.desc(), Order.id.desc()).limit(50)),
+        ('order.get_available_orders, order.claim_order', select(Order).where(
+            Order.status == OrderStatus.READY_FOR_PICKUP, Order.driver_id.is_(None)
+        ).order_by(Order.created_at.asc(), Order.id.asc())),
+        ('order_tracking.get_restaurant_pending_orders', select(Order).where(
+            Order.restaurant_id == 1, Order.status.in_(KITCHEN_STATUSES)
+        ).order_by(Order.created_at.asc())),
+        ('order_tracking.get_restaurant_pending_orders since', select(Order).where(
+            Order.restaurant_id == 1, Order.updated_at > since
+        ).order_by(Order.created_at.asc())),
+        ('order_tracking.get_customer_active_orders', select(Order).where(
+            Order.customer_id == 2, Order.status.in_(CUSTOMER_ACTIVE_STATUSES)
+        ).order_by(Order.created_at.desc())),
+        ('order_tracking.get_driver_assigned_orders', select(Order).where(
+            Order.driver_id == 3, Order.status.in_(DRIVER_ACTIVE_STATUSES)
+        ).order_by(Order.created_at.asc())),
+        ('order_tracking.get_order_events', select(OrderEvent).where(OrderEvent.order_id == 1).order_by(OrderEvent.seq)),
+        ('payment.stripe_webhook', select(Order).where(Order.payment_transaction_id == 'pi_check')),
+        ('order_tracking.get_restaurant_pending_orders items', select(OrderItem).where(OrderItem.order_id.in_([1, 2, 3]))),
+        ('restaurant.get_restaurants cursor', select(Restaurant.id, Restaurant.name, Restaurant.rating).where(
+            Restaurant.is_active == True, RESTAURANT_RATING <= 4.5,
+            tuple_(RESTAURANT_RATING, Restaurant.id) < tuple_(4.5, 100)
+        ).order_by(RESTAURANT_RATING.desc(), Restaurant.id.desc()).limit(21)),
+        ('restaurant.get_restaurant_menu', select(MenuItem).where(MenuItem.restaurant_id == 1, MenuItem.is_available.is_(True))),
+        ('order.add_review existing', select(Review).where(Review.order_id == 1)),
+        ('Restaurant.reviews', select(Review).where(Review.restaurant_id == 1)),
+        ('cart.get_cart', select(Cart).where(Cart.user_id == 2)),
+        ('cart.add_to_cart', select(Cart).where(Cart.user_id == 2, Cart.restaurant_id == 1)),
+        ('cart.add_to_cart existing item', select(CartItem).where(CartItem.cart_id == 1, CartItem.menu_item_id == 1))
+    ]
+
+def explain(connection, statement):
+    """The plan for a statement as lines of text"""
+    dialect = connection.dialect
+    sql = str(statement.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+    if dialect.name == 'sqlite':
+        return [row[-1] for row in connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + sql)]
+    if dialect.name == 'postgresql':
+        # Small tables are scanned whatever their indexes; this asks whether an index could be used at all
+        connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+        return [row[0] for row in connection.exec_driver_sql('EXPLAIN ' + sql)]
+    raise click.ClickException(f"Query plan checks are not supported on {dialect.name}")
+
+def full_scans(connection, plan):
+    """Large tables the plan reads in full"""
+    pattern = _SQLITE_FULL_SCAN if connection.dialect.name == 'sqlite' else _POSTGRES_FULL_SCAN
+    tables = []
+    for line in plan:
+        match = pattern.search(line.strip())
+        if match and match.group(1) in LARGE_TABLES:
+            tables.append(match.group(1))
+    return tables
+
+def check_query_plans(engine=None):
+    """(name, plan, fully scanned large tables) for every hot query"""
+    engine = engine or db.engine
+    results = []
+    for name, statement in hot_queries():
+        with engine.connect() as connection:
+            transaction = connection.begin()
+            try:
+                plan = explain(connection, statement)
+                results.append((name, plan, full_scans(connection, plan)))
+            finally:
+                # Also discards any planner settings
+                transaction.rollback()
+    return results
+
+@click.command('check-query-plans')
+@click.option('--verbose', is_flag=True, help='Print every plan, not just failing ones')
+@with_appcontext
+def check_query_plans_command(verbose):
+    """EXPLAIN the hot queries and fail if any reads a large table in full"""
+    failures = 0
+    for name, plan, scans in check_query_plans():
+        if scans:
+            failures += 1
+            click.echo(f"FAIL {name}: full scan of {', '.join(scans)}")
+        elif verbose:
+            click.echo(f"ok   {name}")
+        if scans or verbose:
+            for line in plan:
+                click.echo(f"       {line}")
+
+    if failures:
+        click.echo(f"{failures} hot queries read a large table in full")
+        sys.exit(1)
+    click.echo("Every hot query uses an index")
@@ -0,0 +1,130 @@
+from flask.cli import with_appcontext
+from sqlalchemy import case, func, insert, update
+from sqlalchemy.dialects import postgresql, sqlite
+from src.models.user import db
+from src.models.restaurant import Restaurant
+from src.models.review import Review
+from src.models.rating_aggregate import RatingAggregate
+from src.utils.response_cache import invalidate_restaurant_responses
+from src.utils.cache import invalidate_objects
+import click
+
+RATING_DIMENSIONS = ('rating', 'food_rating', 'delivery_rating')
+
+# Dialects with INSERT ... ON CONFLICT DO UPDATE
+_UPSERT_DIALECTS = {'postgresql': postgresql, 'sqlite': sqlite}
+
+def record_review_ratings(review):
+    """Fold a new review's scores into its restaurant's and driver's aggregates.
+
+    Runs inside the caller's transaction, so the aggregates commit or roll back
+    together with the review itself.
+    """
+    subjects = [('restaurant', review.restaurant_id)]
+    if review.driver_id:
+        subjects.append(('driver', review.driver_id))
+
+    for subject_type, subject_id in subjects:
+        for dimension in RATING_DIMENSIONS:
+            score = getattr(review, dimension)
+            if score is not None:
+                _increment(subject_type, subject_id, dimension, score)
+
+    restaurant_rating = db.session.get(
+        RatingAggregate, ('restaurant', review.restaurant_id, 'rating'), populate_existing=True
+    )
+    restaurant = db.session.get(Restaurant, review.restaurant_id)
+    if restaurant and restaurant_rating:
+        restaurant.rating = restaurant_rating.average
+
+def get_rating_aggregates(subject_type, subject_id):
+    """Get all rating aggregates of a restaurant or driver keyed by dimension"""
+    aggregates = RatingAggregate.query.filter_by(subject_type=subject_type, subject_id=subject_id).all()
+    return {aggregate.dimension: aggregate for aggregate in aggregates}
+
+def get_driver_rating(driver_id):
+    """Average delivery rating of a driver, or None before their first review"""
+    aggregate = db.session.get(RatingAggregate, ('driver', driver_id, 'delivery_rating'))
+    return aggregate.average if aggregate else None
+
+def _increment(subject_type, subject_id, dimension, score):
+    """Atomically add one score to an aggregate row, creating it if needed"""
+    table = RatingAggregate.__table__
+    star_column = f'stars_{score}'
+    increments = {
+        'count': table.c.count + 1,
+        'total': table.c.total + score,
+        star_column: table.c[star_column] + 1
+    }
+    key = {'subject_type': subject_type, 'subject_id': subject_id, 'dimension': dimension}
+
+    dialect = _UPSERT_DIALECTS.get(db.session.get_bind().dialect.name)
+    if dialect:
+        db.session.execute(
+            dialect.insert(table)
+            .values(**key, count=1, total=score, **{star_column: 1})
+            .on_conflict_do_update(index_elements=list(key), set_=increments)
+        )
+        return
+
+    result = db.session.execute(
+        update(table)
+        .where(*[table.c[column] == value for column, value in key.items()])
+        .values(**increments)
+    )
+    if result.rowcount == 0:
+        db.session.execute(insert(table).values(**key, count=1, total=score, **{star_column: 1}))
+
+def backfill_rating_aggregates():
+    """Rebuild every rating aggregate and restaurant rating from the review table"""
+    RatingAggregate.query.delete()
+
+    rows = []
+    for subject_type, subject_column in (('restaurant', Review.restaurant_id), ('driver', Review.driver_id)):
+        for dimension in RATING_DIMENSIONS:
+            score = getattr(Review, dimension)
+            totals = db.session.query(
+                subject_column,
+                func.count(score),
+                func.sum(score),
+                *[func.sum(case((score == star, 1), else_=0)) for star in range(1, 6)]
+            ).filter(
+                subject_column.isnot(None),
+                score.isnot(None)
+            ).group_by(subject_column).all()
+
+            for subject_id, count, total, *stars in totals:
+                row = {
+                    'subject_type': subject_type,
+                    'subject_id': subject_id,
+                    'dimension': dimension,
+                    'count': count,
+                    'total': total
+                }
+                row.update({f'stars_{star}': stars[star - 1] for star in range(1, 6)})
+                rows.append(row)
+
+    if rows:
+        db.session.execute(insert(RatingAggregate), rows)
+
+    restaurant_ratings = [
+        {'id': row['subject_id'], 'rating': round(row['total'] / row['count'], 1)}
+        for row in rows
+        if row['subject_type'] == 'restaurant' and row['dimension'] == 'rating'
+    ]
+    if restaurant_ratings:
+        db.session.execute(update(Restaurant), restaurant_ratings)
+
+    db.session.commit()
+    # Bulk updates bypass the session's change tracking
+    restaurant_ids = [rating['id'] for rating in restaurant_ratings]
+    invalidate_restaurant_responses(restaurant_ids)
+    invalidate_objects(Restaurant, restaurant_ids)
+    return len(rows)
+
+@click.command('backfill-ratings')
+@with_appcontext
+def backfill_ratings_command():
+    """Recompute rating aggregates from existing reviews"""
+    count = backfill_rating_aggregates()
+    click.echo(f"Rebuilt {count} rating aggregates")
@@ -0,0 +1,150 @@
+from collections import OrderedDict
+from flask import current_app, jsonify, request
+from sqlalchemy import event, inspect
+from src.models.user import db
+from src.models.restaurant import Restaurant
+from src.models.menu_item import MenuItem
+from src.utils.events import broker
+import hashlib
+import threading
+import time
+
+INVALIDATION_CHANNEL = 'cache:restaurants'
+
+# Session.info key for restaurants whose cached responses a transaction will invalidate
+_PENDING_KEY = 'response_cache_restaurants'
+
+class CachedResponse:
+    """A serialized JSON body with its strong ETag"""
+    __slots__ = ('body', 'etag', 'generation', 'expires_at')
+
+    def __init__(self, body, etag, generation, expires_at):
+        self.body = body
+        self.etag = etag
+        self.generation = generation
+        self.expires_at = expires_at
+
+class RestaurantResponseCache:
+    """Per-worker LRU of rendered restaurant responses.
+
+    Every restaurant has a generation number that is bumped whenever its data
+    changes. Entries remember the generation they were rendered at, so a bump
+    invalidates all of a restaurant's cached views at once, and a response
+    rendered while a write was committing is never stored as current.
+    """
+    def __init__(self, max_entries=1000, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def generation(self, restaurant_id):
+        with self._lock:
+            return self._generations.get(restaurant_id, 0)
+
+    def get(self, key):
+        restaurant_id = key[0]
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.generation != self._generations.get(restaurant_id, 0) or entry.expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, body, generation):
+        """Store a rendered body unless the restaurant changed since generation was read"""
+        entry = CachedResponse(body, _etag(body), generation, time.monotonic() + self.ttl)
+        with self._lock:
+            if generation == self._generations.get(key[0], 0):
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, restaurant_ids):
+        with self._lock:
+            for restaurant_id in restaurant_ids:
+                self._generations[restaurant_id] = self._generations.get(restaurant_id, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+
+response_cache = RestaurantResponseCache()
+
+def init_response_cache(app):
+    """Configure the cache and invalidate it from every commit that touches a restaurant"""
+    response_cache.max_entries = app.config.get('RESPONSE_CACHE_MAX_ENTRIES', response_cache.max_entries)
+    response_cache.ttl = app.config.get('RESPONSE_CACHE_TTL', response_cache.ttl)
+
+    broker.add_handler(INVALIDATION_CHANNEL, _handle_invalidation)
+    for name, listener in (
+        ('after_flush', _collect_changed_restaurants),
+        ('after_commit', _invalidate_committed),
+        ('after_soft_rollback', _discard_pending)
+    ):
+        if not event.contains(db.session, name, listener):
+            event.listen(db.session, name, listener)
+
+def cached_restaurant_response(restaurant_id, view, params, render):
+    """Serve a restaurant view from the cache with ETag revalidation.
+
+    params are the normalized filters the view depends on. render() is only
+    called on a miss and must return the JSON payload; errors it raises are
+    not cached.
+    """
+    # Entries may only be stored once this worker receives invalidations from its peers
+    broker.ensure_listener()
+
+    key = (restaurant_id, view, params)
+    entry = response_cache.get(key)
+    if entry is None:
+        generation = response_cache.generation(restaurant_id)
+        body = jsonify(render()).get_data()
+        entry = response_cache.put(key, body, generation)
+
+    response = current_app.response_class(entry.body, mimetype='application/json')
+    response.set_etag(entry.etag)
+    # Clients may keep the body but must revalidate, which costs no SQL on a hit
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+def invalidate_restaurant_responses(restaurant_ids):
+    """Drop cached views of the given restaurants in every worker"""
+    restaurant_ids = sorted(set(restaurant_ids))
+    if restaurant_ids:
+        # Publishing also delivers to this worker's own handler
+        broker.publish(INVALIDATION_CHANNEL, {'restaurant_ids': restaurant_ids})
+
+def _etag(body):
+    return hashlib.sha256(body).hexdigest()
+
+def _handle_invalidation(data):
+    response_cache.invalidate(data.get('restaurant_ids', ()))
+
+def _collect_changed_restaurants(session, flush_context):
+    """Remember which restaurants this flush changed until the transaction ends"""
+    pending = session.info.setdefault(_PENDING_KEY, set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Restaurant):
+            pending.add(obj.id)
+        elif isinstance(obj, MenuItem):
+            pending.add(obj.restaurant_id)
+            # A dish moved to another restaurant leaves the old menu too
+            pending.update(inspect(obj).attrs.restaurant_id.history.deleted)
+    pending.discard(None)
+
+def _invalidate_committed(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        invalidate_restaurant_responses(pending)
+
+def _discard_pending(session, previous_transaction):
+    if previous_transaction.parent is None:
+        session.info.pop(_PENDING_KEY, None)
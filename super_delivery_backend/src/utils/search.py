@@ -0,0 +1,213 @@
+from sqlalchemy import bindparam, event, inspect, or_, text
+from src.models.user import db
+from src.models.restaurant import Restaurant
+from src.models.menu_item import MenuItem
+from src.routes.error_handler import log_info, log_warning
+import re
+
+# Engine -> search backend ('fts5' or 'tsvector'); engines without an entry use the ILIKE fallback
+_search_backends = {}
+
+MAX_SEARCH_TERMS = 8
+
+RESTAURANT_SEARCH_FIELDS = ('name', 'description', 'cuisine_type')
+MENU_ITEM_SEARCH_FIELDS = ('name', 'description', 'restaurant_id')
+
+_SQLITE_SCHEMA = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS restaurant_search USING fts5(
+        name, description, cuisine_type, dishes,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """
+]
+
+_POSTGRES_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS restaurant_search (
+        restaurant_id INTEGER PRIMARY KEY REFERENCES restaurant (id) ON DELETE CASCADE,
+        document TSVECTOR NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_restaurant_search_document ON restaurant_search USING GIN (document)"
+]
+
+_REINDEX_SQL = {
+    'fts5': """
+        INSERT INTO restaurant_search (rowid, name, description, cuisine_type, dishes)
+        SELECT r.id, r.name, COALESCE(r.description, ''), COALESCE(r.cuisine_type, ''),
+               COALESCE((SELECT group_concat(m.name || ' ' || COALESCE(m.description, ''), ' ')
+                         FROM menu_item m WHERE m.restaurant_id = r.id), '')
+        FROM restaurant r
+        WHERE r.id IN :ids
+    """,
+    'tsvector': """
+        INSERT INTO restaurant_search (restaurant_id, document)
+        SELECT r.id,
+               setweight(to_tsvector('simple', COALESCE(r.name, '')), 'A') ||
+               setweight(to_tsvector('simple', COALESCE(r.cuisine_type, '')), 'B') ||
+               setweight(to_tsvector('simple', COALESCE(r.description, '')), 'C') ||
+               setweight(to_tsvector('simple', COALESCE(string_agg(m.name || ' ' || COALESCE(m.description, ''), ' '), '')), 'D')
+        FROM restaurant r
+        LEFT JOIN menu_item m ON m.restaurant_id = r.id
+        WHERE r.id IN :ids
+        GROUP BY r.id
+    """
+}
+
+_DELETE_SQL = {
+    'fts5': "DELETE FROM restaurant_search WHERE rowid IN :ids",
+    'tsvector': "DELETE FROM restaurant_search WHERE restaurant_id IN :ids"
+}
+
+# Restaurant name weighs most, then cuisine, description and finally dish text. The unary +
+# keeps SQLite from driving the join from restaurant and re-running MATCH for every row
+_MATCH_SQL = {
+    'fts5': """
+        SELECT +rowid AS restaurant_id, -bm25(restaurant_search, 10.0, 2.0, 5.0, 1.0) AS score
+        FROM restaurant_search
+        WHERE restaurant_search MATCH :terms
+    """,
+    'tsvector': """
+        SELECT restaurant_id, ts_rank_cd(document, to_tsquery('simple', :terms)) AS score
+        FROM restaurant_search
+        WHERE document @@ to_tsquery('simple', :terms)
+    """
+}
+
+def init_search_index(app):
+    """Create the full-text index for the configured database and keep it in sync"""
+    with app.app_context():
+        engine = db.engine
+        dialect = engine.dialect.name
+        if dialect == 'sqlite':
+            backend, schema = 'fts5', _SQLITE_SCHEMA
+        elif dialect == 'postgresql':
+            backend, schema = 'tsvector', _POSTGRES_SCHEMA
+        else:
+            log_warning(f"Full-text search is not supported on {dialect}; falling back to ILIKE search")
+            return
+
+        try:
+            with engine.begin() as connection:
+                for statement in schema:
+                    connection.execute(text(statement))
+                indexed = connection.execute(text("SELECT COUNT(*) FROM restaurant_search")).scalar()
+                if not indexed:
+                    restaurant_ids = connection.execute(text("SELECT id FROM restaurant")).scalars().all()
+                    _reindex(connection, backend, set(restaurant_ids))
+        except Exception as e:
+            log_warning(f"Could not initialize full-text search index: {str(e)}")
+            return
+
+        _search_backends[engine] = backend
+
+    if not event.contains(db.session, 'after_flush', _sync_search_index):
+        event.listen(db.session, 'after_flush', _sync_search_index)
+
+    log_info(f"Full-text search index ready ({backend})")
+
+def rebuild_search_index():
+    """Rebuild the full-text index for every restaurant"""
+    backend = _search_backends.get(db.engine)
+    if not backend:
+        return 0
+    with db.engine.begin() as connection:
+        connection.execute(text("DELETE FROM restaurant_search"))
+        restaurant_ids = set(connection.execute(text("SELECT id FROM restaurant")).scalars().all())
+        _reindex(connection, backend, restaurant_ids)
+    return len(restaurant_ids)
+
+def search_terms(search):
+    """Split a raw search string into safe lowercase word tokens"""
+    return re.findall(r'\w+', search.lower())[:MAX_SEARCH_TERMS]
+
+def apply_restaurant_search(query, search):
+    """Filter and rank a Restaurant query by relevance to the search string"""
+    backend = _search_backends.get(db.engine)
+    terms = search_terms(search)
+    if not terms:
+        return query
+    if not backend:
+        return _apply_ilike_search(query, search)
+
+    if backend == 'fts5':
+        # Prefix match on every token so results update on each keystroke
+        match = ' '.join(f'"{term}"*' for term in terms)
+    else:
+        match = ' & '.join(f'{term}:*' for term in terms)
+
+    matches = (
+        text(_MATCH_SQL[backend])
+        .bindparams(terms=match)
+        .columns(restaurant_id=db.Integer, score=db.Float)
+        .subquery('search_matches')
+    )
+    return (
+        query.join(matches, matches.c.restaurant_id == Restaurant.id)
+        .order_by(matches.c.score.desc(), Restaurant.id)
+    )
+
+def _apply_ilike_search(query, search):
+    """Substring search used when no full-text index is available"""
+    search_term = f'%{search}%'
+    return query.filter(or_(
+        Restaurant.name.ilike(search_term),
+        Restaurant.description.ilike(search_term),
+        Restaurant.cuisine_type.ilike(search_term)
+    ))
+
+def _reindex(connection, backend, restaurant_ids, removed_ids=()):
+    """Replace the index rows for the given restaurants"""
+    stale_ids = set(restaurant_ids) | set(removed_ids)
+    if not stale_ids:
+        return
+    connection.execute(
+        text(_DELETE_SQL[backend]).bindparams(bindparam('ids', expanding=True)),
+        {'ids': list(stale_ids)}
+    )
+    live_ids = set(restaurant_ids) - set(removed_ids)
+    if live_ids:
+        connection.execute(
+            text(_REINDEX_SQL[backend]).bindparams(bindparam('ids', expanding=True)),
+            {'ids': list(live_ids)}
+        )
+
+def _changed(obj, fields):
+    """Check whether any of the searchable fields changed in this flush"""
+    state = inspect(obj)
+    return any(state.attrs[field].history.has_changes() for field in fields)
+
+def _sync_search_index(session, flush_context):
+    """Re-index restaurants touched by a flush, inside the same transaction"""
+    connection = session.connection()
+    backend = _search_backends.get(connection.engine)
+    if not backend:
+        return
+
+    restaurant_ids = set()
+    removed_ids = set()
+
+    for obj in session.new:
+        if isinstance(obj, Restaurant):
+            restaurant_ids.add(obj.id)
+        elif isinstance(obj, MenuItem):
+            restaurant_ids.add(obj.restaurant_id)
+
+    for obj in session.dirty:
+        if isinstance(obj, Restaurant) and _changed(obj, RESTAURANT_SEARCH_FIELDS):
+            restaurant_ids.add(obj.id)
+        elif isinstance(obj, MenuItem) and _changed(obj, MENU_ITEM_SEARCH_FIELDS):
+            restaurant_ids.add(obj.restaurant_id)
+            # A dish moved to another restaurant must leave the old document too
+            restaurant_ids.update(inspect(obj).attrs.restaurant_id.history.deleted)
+
+    for obj in session.deleted:
+        if isinstance(obj, Restaurant):
+            removed_ids.add(obj.id)
+        elif isinstance(obj, MenuItem):
+            restaurant_ids.add(obj.restaurant_id)
+
+    restaurant_ids.discard(None)
+    _reindex(connection, backend, restaurant_ids, removed_ids)
@@ -0,0 +1,162 @@
+from datetime import date, datetime
+from enum import Enum
+from flask.json.provider import DefaultJSONProvider
+from operator import attrgetter
+from sqlalchemy import inspect
+from sqlalchemy.orm import load_only
+from src.routes.error_handler import APIError
+import threading
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# (model class, field subset) -> compiled serializer
+_serializers = {}
+_serializers_lock = threading.Lock()
+
+# Model class -> names of its to_dict() fields
+_fields = {}
+
+MAX_COMPILED_SERIALIZERS = 256
+
+class JSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes with orjson when it is installed.
+
+    Both backends encode datetimes as ISO 8601 strings and enums by value, so
+    serialize() results and to_dict() results produce the same JSON.
+    """
+    @staticmethod
+    def default(o):
+        if isinstance(o, (datetime, date)):
+            return o.isoformat()
+        if isinstance(o, Enum):
+            return o.value
+        return DefaultJSONProvider.default(o)
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None:
+            encoded = self._dumps_bytes(obj, dict(kwargs))
+            if encoded is not None:
+                return encoded.decode()
+        kwargs.setdefault('default', self.default)
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        options = {}
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            options['indent'] = 2
+        encoded = self._dumps_bytes(obj, options)
+        if encoded is None:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(encoded + b'\n', mimetype=self.mimetype)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def _dumps_bytes(self, obj, kwargs):
+        """Encode with orjson, or return None when only the stdlib can honour the request"""
+        indent = kwargs.pop('indent', None)
+        kwargs.pop('default', None)
+        kwargs.pop('separators', None)
+        kwargs.pop('sort_keys', None)
+        if kwargs or indent not in (None, 2):
+            return None
+
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, default=self.default, option=option)
+        except TypeError:
+            # Values orjson rejects, such as integers wider than 64 bits
+            return None
+
+def init_json(app):
+    """Install the JSON provider on the app"""
+    app.json = JSONProvider(app)
+
+def serialized_fields(model):
+    """Names of the fields model.to_dict() returns, in order"""
+    fields = _fields.get(model)
+    if fields is None:
+        fields = tuple(model().to_dict())
+        columns = {attr.key for attr in inspect(model).column_attrs}
+        unknown = [field for field in fields if field not in columns]
+        if unknown:
+            raise ValueError(f"{model.__name__}.to_dict() has computed fields: {', '.join(unknown)}")
+        _fields[model] = fields
+    return fields
+
+def compile_serializer(model, fields=None):
+    """Build a serializer that reads a model's to_dict() fields straight off the instance.
+
+    The fields are discovered once from to_dict() on a blank instance and must
+    all be column attributes. The serializer leaves datetimes and enums as-is for
+    the JSON provider to encode, skipping to_dict()'s per-field conversions.
+    """
+    fields = fields or serialized_fields(model)
+    getter = attrgetter(*fields)
+    if len(fields) == 1:
+        return lambda obj: {fields[0]: getter(obj)}
+    return lambda obj: dict(zip(fields, getter(obj)))
+
+def serialize(obj, fields=None):
+    """JSON-ready dict of a model instance, equivalent to obj.to_dict() once encoded.
+
+    fields limits the output to a subset parsed by parse_fields().
+    """
+    key = (type(obj), fields)
+    serializer = _serializers.get(key)
+    if serializer is None:
+        serializer = compile_serializer(type(obj), fields)
+        with _serializers_lock:
+            # Every field subset is valid, so only keep a bounded number of them
+            if len(_serializers) < MAX_COMPILED_SERIALIZERS:
+                _serializers[key] = serializer
+    return serializer(obj)
+
+def parse_fields(model, raw):
+    """Parse a comma-separated ?fields= value into field names, or None for every field"""
+    if raw is None:
+        return None
+    requested = tuple(dict.fromkeys(field.strip() for field in raw.split(',') if field.strip()))
+    if not requested:
+        raise APIError("fields must name at least one field", 400)
+
+    available = serialized_fields(model)
+    unknown = [field for field in requested if field not in available]
+    if unknown:
+        raise APIError(f"Unknown fields: {', '.join(unknown)}", 400, {'available_fields': list(available)})
+    return requested
+
+def apply_fieldset(query, model, fields, required=()):
+    """Load only the requested columns, plus any the caller reads itself such as sort keys"""
+    if fields is None:
+        return query
+    columns = dict.fromkeys(fields + tuple(required))
+    return query.options(load_only(*[getattr(model, name) for name in columns]))
+
+def select_fields(query, model, fields=None, required=()):
+    """Project a query onto serialized columns so it returns plain rows, not ORM instances.
+
+    Returns the projected query and the output field names to pass to
+    serialize_row(). Columns in required are selected after the output fields
+    for the caller's own use, such as keyset sort keys.
+    """
+    fields = fields or serialized_fields(model)
+    extra = tuple(name for name in required if name not in fields)
+    return query.with_entities(*[getattr(model, name) for name in fields + extra]), fields
+
+def serialize_row(row, fields):
+    """JSON-ready dict of a row from select_fields(), equivalent to to_dict() once encoded"""
+    return dict(zip(fields, row))
@@ -0,0 +1,319 @@
+from collections import Counter
+from contextlib import ContextDecorator
+from contextvars import ContextVar
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from src.routes.error_handler import log_warning
+import re
+import threading
+import time
+
+# Identical SELECTs run this many times in one request are reported as a likely N+1
+DEFAULT_N_PLUS_ONE_THRESHOLD = 10
+
+# Slow statements are reported at most once per fingerprint in this many seconds
+DEFAULT_SLOW_QUERY_WINDOW = 300
+
+# Fingerprints remembered for deduplication before expired windows are pruned
+_MAX_TRACKED_SLOW_QUERIES = 1000
+
+_WHITESPACE = re.compile(r'\s+')
+_PLACEHOLDER_LIST = re.compile(r'\bIN\s*\((?:\s*(?:\?|%\(\w+\)s|%s|:\w+)\s*,)*\s*(?:\?|%\(\w+\)s|%s|:\w+)\s*\)', re.IGNORECASE)
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?\b')
+
+# Statistics of the request being handled; a context variable is far cheaper
+# to read on every statement than flask.g
+_request_stats = ContextVar('sql_request_stats', default=None)
+
+# Budgets opened by query_budget() on this thread
+_budgets = threading.local()
+
+class QueryStats:
+    """Statements executed in one unit of work, with their count and database time"""
+    __slots__ = ('count', 'seconds', 'statements')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        # Raw statement text -> executions; SQLAlchemy already leaves values out of it
+        self.statements = Counter()
+
+    def record(self, statement, seconds):
+        self.count += 1
+        self.seconds += seconds
+        self.statements[statement] += 1
+
+    def repeated(self, threshold):
+        """(fingerprint, executions) of SELECTs run at least threshold times, most frequent first"""
+        # Fingerprinting only the distinct statements keeps the per-query cost at a dict update
+        fingerprints = Counter()
+        for statement, count in self.statements.items():
+            if statement.lstrip()[:6].upper() == 'SELECT':
+                fingerprints[fingerprint(statement)] += count
+        return [(statement, count) for statement, count in fingerprints.most_common() if count >= threshold]
+
+class SlowQueryLog:
+    """Logs statements slower than a threshold, with the plan the database chose.
+
+    Each statement is reported with its fingerprint, the types of its bound
+    parameters (never their values), the endpoint that ran it and the
+    output of EXPLAIN. A fingerprint is reported once per window; further
+    slow executions are counted and included in the next report. The plan is
+    captured on a fresh cursor of the same connection, so no pool connection
+    is taken and the statement sees the same transaction. ANALYZE runs the
+    statement again and is therefore only used for SELECTs, inside a
+    savepoint that is rolled back.
+    """
+    def __init__(self):
+        # Seconds; None disables the log
+        self.threshold = None
+        self.window = DEFAULT_SLOW_QUERY_WINDOW
+        self.explain = True
+        self.analyze = False
+        self.reported = 0
+        self.suppressed = 0
+        # fingerprint -> [window start, slow executions not yet reported, slowest of them in seconds]
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def configure(self, app):
+        threshold_ms = app.config.get('SQL_SLOW_QUERY_MS', 0)
+        self.threshold = threshold_ms / 1000 if threshold_ms else None
+        self.window = app.config.get('SQL_SLOW_QUERY_WINDOW', self.window)
+        self.explain = app.config.get('SQL_SLOW_QUERY_EXPLAIN', self.explain)
+        self.analyze = app.config.get('SQL_SLOW_QUERY_EXPLAIN_ANALYZE', self.analyze)
+        with self._lock:
+            self._windows.clear()
+
+    def record(self, conn, cursor, statement, parameters, executemany, seconds):
+        normalized = fingerprint(statement)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(normalized)
+            if window is not None and now - window[0] < self.window:
+                window[1] += 1
+                window[2] = max(window[2], seconds)
+                self.suppressed += 1
+                return
+            if len(self._windows) >= _MAX_TRACKED_SLOW_QUERIES:
+                self._prune(now)
+            self._windows[normalized] = [now, 0, 0.0]
+            self.reported += 1
+
+        endpoint = request.endpoint if has_request_context() else None
+        message = (
+            f"Slow query ({seconds * 1000:.1f} ms) in {endpoint or 'no request'}: {normalized}"
+            f"\n  parameters: {parameter_shapes(parameters, executemany)}"
+        )
+        if window is not None and window[1]:
+            message += f"\n  {window[1]} more slow executions in the previous window, slowest {window[2] * 1000:.1f} ms"
+        if self.explain:
+            message += '\n  plan:\n' + self._explain(conn, cursor, statement, parameters, executemany)
+        log_warning(message)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'threshold_ms': self.threshold * 1000 if self.threshold else 0,
+                'window_seconds': self.window,
+                'reported': self.reported,
+                'suppressed': self.suppressed,
+                'tracked': len(self._windows)
+            }
+
+    def _prune(self, now):
+        for normalized in [key for key, window in self._windows.items() if now - window[0] >= self.window]:
+            del self._windows[normalized]
+        # Every window is still open: forget the oldest rather than grow without bound
+        while len(self._windows) >= _MAX_TRACKED_SLOW_QUERIES:
+            del self._windows[next(iter(self._windows))]
+
+    def _explain(self, conn, cursor, statement, parameters, executemany):
+        dialect = conn.dialect.name
+        verb = statement.lstrip()[:6].upper()
+        if verb not in ('SELECT', 'UPDATE', 'DELETE', 'INSERT'):
+            return '    (not explained)'
+        if executemany:
+            parameters = parameters[0] if parameters else ()
+
+        analyze = self.analyze and verb == 'SELECT'
+        if dialect == 'sqlite':
+            prefix = 'EXPLAIN QUERY PLAN '
+        elif dialect == 'postgresql':
+            prefix = 'EXPLAIN (ANALYZE, BUFFERS) ' if analyze else 'EXPLAIN '
+        elif dialect in ('mysql', 'mariadb'):
+            prefix = 'EXPLAIN ANALYZE ' if analyze else 'EXPLAIN '
+        else:
+            return f'    (EXPLAIN is not supported for {dialect})'
+
+        # A raw cursor bypasses the engine events, so the EXPLAIN is neither timed nor counted
+        explain_cursor = cursor.connection.cursor()
+        savepoint = dialect != 'sqlite'
+        try:
+            if savepoint:
+                # A failed EXPLAIN must not abort the caller's transaction
+                explain_cursor.execute('SAVEPOINT slow_query_explain')
+            try:
+                explain_cursor.execute(prefix + statement, parameters)
+                rows = explain_cursor.fetchall()
+            finally:
+                if savepoint:
+                    explain_cursor.execute('ROLLBACK TO SAVEPOINT slow_query_explain')
+                    explain_cursor.execute('RELEASE SAVEPOINT slow_query_explain')
+        except Exception as e:
+            return f'    (EXPLAIN failed: {str(e)})'
+        finally:
+            explain_cursor.close()
+
+        if dialect == 'sqlite':
+            # (id, parent, notused, detail) rows form a tree through parent
+            depths = {0: 0}
+            lines = []
+            for row in rows:
+                depth = depths.get(row[1], 0) + 1
+                depths[row[0]] = depth
+                lines.append('  ' * depth + '  ' + str(row[-1]))
+            return '\n'.join(lines)
+        return '\n'.join('    ' + ' | '.join(str(column) for column in row) for row in rows)
+
+slow_query_log = SlowQueryLog()
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised by query_budget() when a block runs more queries than allowed"""
+
+class query_budget(ContextDecorator):
+    """Fail when the enclosed block runs more than max_queries statements.
+
+    Meant for tests, which drive requests through the test client on the
+    same thread:
+
+        with query_budget(3):
+            client.get('/api/orders/available')
+
+    Streamed bodies run their queries as they are read, so read them inside
+    the block. The failure message lists the statements that ran, most
+    frequent first.
+    """
+    def __init__(self, max_queries):
+        self.max_queries = max_queries
+        self.stats = None
+
+    def __enter__(self):
+        self.stats = QueryStats()
+        _active_budgets().append(self.stats)
+        return self.stats
+
+    def __exit__(self, exc_type, exc, tb):
+        _active_budgets().remove(self.stats)
+        if exc_type is None and self.stats.count > self.max_queries:
+            statements = '\n'.join(
+                f"  {count} x {fingerprint(statement)}" for statement, count in self.stats.statements.most_common()
+            )
+            raise QueryBudgetExceeded(
+                f"Ran {self.stats.count} queries, budget is {self.max_queries}:\n{statements}"
+            )
+        return False
+
+def init_sql_instrumentation(app):
+    """Count and time every statement, per request and inside query_budget() blocks, and log slow ones"""
+    for name, listener in (
+        ('before_cursor_execute', _before_cursor_execute),
+        ('after_cursor_execute', _after_cursor_execute),
+        ('handle_error', _handle_error)
+    ):
+        if not event.contains(Engine, name, listener):
+            event.listen(Engine, name, listener)
+
+    slow_query_log.configure(app)
+    threshold = app.config.get('SQL_N_PLUS_ONE_THRESHOLD', DEFAULT_N_PLUS_ONE_THRESHOLD)
+    server_timing = app.config.get('SQL_SERVER_TIMING', True)
+
+    @app.before_request
+    def start_query_stats():
+        g.request_started = time.perf_counter()
+        g.sql_stats = QueryStats()
+        _request_stats.set(g.sql_stats)
+
+    @app.after_request
+    def report_query_stats(response):
+        stats = g.get('sql_stats')
+        if stats is None:
+            return response
+
+        if threshold:
+            for statement, count in stats.repeated(threshold):
+                log_warning(f"Possible N+1 in {request.endpoint}: {count} executions of {statement}")
+
+        # Queries a streamed body runs after this point are not included
+        if server_timing:
+            elapsed = time.perf_counter() - g.request_started
+            response.headers.add(
+                'Server-Timing',
+                f'db;dur={stats.seconds * 1000:.2f};desc="{stats.count} queries", app;dur={elapsed * 1000:.2f}'
+            )
+        return response
+
+    @app.teardown_request
+    def clear_query_stats(exc):
+        # Runs once a streamed body is finished, so its queries still count
+        _request_stats.set(None)
+
+def current_query_stats():
+    """Statistics of the current request, or None outside one"""
+    return _request_stats.get()
+
+def fingerprint(statement):
+    """Normalize SQL so executions that differ only in values or IN-list length match"""
+    statement = _WHITESPACE.sub(' ', statement).strip()
+    statement = _STRING_LITERAL.sub('?', statement)
+    statement = _NUMBER_LITERAL.sub('?', statement)
+    return _PLACEHOLDER_LIST.sub('IN (...)', statement)
+
+def parameter_shapes(parameters, executemany=False):
+    """Describe bound parameters by type, and length for strings, without their values"""
+    if executemany:
+        return f"{len(parameters)} x {parameter_shapes(parameters[0]) if parameters else '()'}"
+    if isinstance(parameters, dict):
+        return '{' + ', '.join(f'{key}: {_shape(value)}' for key, value in parameters.items()) + '}'
+    if isinstance(parameters, (list, tuple)):
+        return '(' + ', '.join(_shape(value) for value in parameters) + ')'
+    return _shape(parameters)
+
+def _shape(value):
+    if value is None:
+        return 'None'
+    if isinstance(value, (str, bytes)):
+        return f'{type(value).__name__}[{len(value)}]'
+    return type(value).__name__
+
+def _active_budgets():
+    budgets = getattr(_budgets, 'stack', None)
+    if budgets is None:
+        budgets = _budgets.stack = []
+    return budgets
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['query_started'].pop()
+    elapsed = time.perf_counter() - started
+
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+    for budget in getattr(_budgets, 'stack', ()):
+        budget.record(statement, elapsed)
+
+    threshold = slow_query_log.threshold
+    if threshold is not None and elapsed >= threshold:
+        slow_query_log.record(conn, cursor, statement, parameters, executemany, elapsed)
+
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute
+    if context.connection is not None:
+        started = context.connection.info.get('query_started')
+        if started:
+            started.pop()
@@ -0,0 +1,177 @@
+from datetime import datetime, timezone
+from flask import abort, current_app, request
+from werkzeug.http import is_resource_modified
+from werkzeug.wsgi import wrap_file
+from src.routes.error_handler import log_info, log_warning
+from src.utils.compression import COMPRESSIBLE_MIMETYPES, PRECOMPRESSED_SUFFIXES, negotiate_encoding
+import hashlib
+import mimetypes
+import os
+import re
+
+INDEX_FILE = 'index.html'
+
+# Vite names build assets assets/<name>-<8 character content hash>.<ext>
+_HASHED_ASSET = re.compile(r'^assets/.+-[A-Za-z0-9_-]{8}\.[A-Za-z0-9]+$')
+
+# Hashed names change whenever their content does, so browsers may keep them forever
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+class StaticFile:
+    """One file in the static folder, with the headers needed to serve it"""
+    __slots__ = ('filename', 'mimetype', 'size', 'mtime', 'etag', 'cache_control', 'variants')
+
+    def __init__(self, filename, mimetype, size, mtime, etag, cache_control):
+        self.filename = filename
+        self.mimetype = mimetype
+        self.size = size
+        self.mtime = mtime
+        self.etag = etag
+        self.cache_control = cache_control
+        # Content-Encoding -> StaticFile of the precompressed copy
+        self.variants = {}
+
+class StaticManifest:
+    """In-memory index of the static folder built once at startup.
+
+    Requests are resolved against the index instead of probing the disk, and
+    each file's ETag is a hash of its content, so revalidations are answered
+    without opening the file. In debug mode the folder is checked on every
+    request so a rebuilt frontend shows up without a restart; the index is only
+    rebuilt when a file's size or mtime changes, and only those files are rehashed.
+    """
+    def __init__(self):
+        self.directory = None
+        self.max_age = 3600
+        self.auto_reload = False
+        self.files = {}
+        # Absolute filename -> ((size, mtime_ns), content hash) as of the last scan
+        self._digests = {}
+
+    def configure(self, app):
+        self.directory = app.static_folder
+        self.max_age = app.config.get('STATIC_MAX_AGE', self.max_age)
+        self.auto_reload = app.debug
+        self._digests = {}
+        self.scan()
+
+    def scan(self):
+        """Bring the index up to date with the files currently in the static folder"""
+        found = {}
+        if self.directory and os.path.isdir(self.directory):
+            for root, _, names in os.walk(self.directory):
+                for name in names:
+                    filename = os.path.join(root, name)
+                    try:
+                        found[filename] = os.stat(filename)
+                    except FileNotFoundError:
+                        # Removed while a frontend build was rewriting the folder
+                        continue
+
+        signatures = {filename: (stat.st_size, stat.st_mtime_ns) for filename, stat in found.items()}
+        if signatures == {filename: signature for filename, (signature, _) in self._digests.items()}:
+            return len(self.files)
+
+        files = {}
+        digests = {}
+        for filename, stat in found.items():
+            cached = self._digests.get(filename)
+            if cached is not None and cached[0] == signatures[filename]:
+                etag = cached[1]
+            else:
+                try:
+                    etag = _content_hash(filename)
+                except FileNotFoundError:
+                    continue
+            digests[filename] = (signatures[filename], etag)
+            path = os.path.relpath(filename, self.directory).replace(os.sep, '/')
+            files[path] = self._describe(path, filename, stat, etag)
+
+        # Attach .br/.gz copies to the file they were built from
+        for encoding, suffix in PRECOMPRESSED_SUFFIXES:
+            for path in [path for path in files if path.endswith(suffix)]:
+                original = files.get(path[:-len(suffix)])
+                if original is not None and original.mimetype in COMPRESSIBLE_MIMETYPES:
+                    variant = files.pop(path)
+                    variant.mimetype = original.mimetype
+                    variant.cache_control = original.cache_control
+                    original.variants[encoding] = variant
+
+        self.files = files
+        self._digests = digests
+        return len(files)
+
+    def lookup(self, path):
+        """The file for a request path, or index.html so client-side routes reach the app"""
+        if self.auto_reload:
+            self.scan()
+        return self.files.get(path) or self.files.get(INDEX_FILE)
+
+    def _describe(self, path, filename, stat, etag):
+        if _HASHED_ASSET.match(path):
+            cache_control = IMMUTABLE_CACHE_CONTROL
+        elif path == INDEX_FILE:
+            # The entry point names the current hashed assets, so always revalidate it
+            cache_control = 'no-cache'
+        else:
+            cache_control = f'public, max-age={self.max_age}'
+
+        return StaticFile(
+            filename=filename,
+            mimetype=mimetypes.guess_type(path)[0] or 'application/octet-stream',
+            size=stat.st_size,
+            mtime=datetime.fromtimestamp(int(stat.st_mtime), timezone.utc),
+            etag=etag,
+            cache_control=cache_control
+        )
+
+def _content_hash(filename):
+    """ETag for a file: the start of the SHA-256 of its content"""
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(64 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()[:32]
+
+static_manifest = StaticManifest()
+
+def init_static_manifest(app):
+    """Index the static folder for serve_static()"""
+    static_manifest.configure(app)
+    log_info(f"Indexed {len(static_manifest.files)} static files")
+
+def serve_static(path):
+    """Serve a static file, or its precompressed copy, from the manifest"""
+    entry = static_manifest.lookup(path)
+    if entry is None:
+        return None
+
+    selected = entry
+    if entry.variants:
+        encoding = negotiate_encoding([encoding for encoding, _ in PRECOMPRESSED_SUFFIXES if encoding in entry.variants])
+        if encoding is not None:
+            selected = entry.variants[encoding]
+
+    response = current_app.response_class(mimetype=selected.mimetype, direct_passthrough=True)
+    response.set_etag(selected.etag)
+    response.last_modified = selected.mtime
+    response.headers['Cache-Control'] = selected.cache_control
+    if selected is not entry:
+        response.headers['Content-Encoding'] = encoding
+    if entry.variants:
+        response.vary.add('Accept-Encoding')
+
+    if not is_resource_modified(request.environ, etag=selected.etag, last_modified=selected.mtime):
+        response.status_code = 304
+        return response
+
+    try:
+        f = open(selected.filename, 'rb')
+    except OSError as e:
+        log_warning(f"Static file {selected.filename} is in the manifest but could not be opened: {str(e)}")
+        static_manifest.scan()
+        abort(404)
+
+    response.response = wrap_file(request.environ, f)
+    response.content_length = selected.size
+    return response.make_conditional(request, accept_ranges=True, complete_length=selected.size)
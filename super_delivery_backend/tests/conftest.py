@@ -0,0 +1,92 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import datetime, timedelta
+from config import TestingConfig
+from src.main import create_app
+from src.models.user import User, UserType, db
+from src.models.restaurant import Restaurant
+from src.models.menu_item import MenuItem
+from src.models.order import Order, OrderStatus
+from src.models.order_item import OrderItem
+import itertools
+import pytest
+
+_order_numbers = itertools.count(1)
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    # A file database, so threads in a test share it like workers share a real one
+    monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'test.db'}")
+    monkeypatch.setattr(TestingConfig, 'LOG_FILE', '')
+    monkeypatch.setattr(TestingConfig, 'EVENT_BROKER_DIR', str(tmp_path / 'events'))
+    monkeypatch.setattr(TestingConfig, 'PROFILE_DIR', str(tmp_path / 'profiles'))
+    monkeypatch.setattr(TestingConfig, 'METRICS_DIR', str(tmp_path / 'metrics'))
+    app = create_app('testing')
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def restaurant(app):
+    """A restaurant with its owner, a customer, a driver and three menu items"""
+    owner = _make_user('owner', UserType.RESTAURANT_OWNER)
+    customer = _make_user('customer', UserType.CUSTOMER)
+    driver = _make_user('driver', UserType.DRIVER)
+    db.session.add_all([owner, customer, driver])
+    db.session.flush()
+
+    restaurant = Restaurant(name='Test Kitchen', address='1 Main St', cuisine_type='Pizza', owner_id=owner.id)
+    db.session.add(restaurant)
+    db.session.flush()
+    db.session.add_all([
+        MenuItem(name=f'Dish {number}', price=10.0 + number, restaurant_id=restaurant.id)
+        for number in range(3)
+    ])
+    db.session.commit()
+    restaurant.test_customer = customer
+    restaurant.test_driver = driver
+    return restaurant
+
+@pytest.fixture
+def make_order(app):
+    """Create an order for a restaurant's test customer, with one line per menu item"""
+    def make(restaurant, status=OrderStatus.PENDING, created_at=None, **fields):
+        created_at = created_at or datetime.utcnow() - timedelta(minutes=5)
+        order = Order(
+            order_number=f'T{next(_order_numbers):08d}',
+            status=status,
+            customer_id=restaurant.test_customer.id,
+            restaurant_id=restaurant.id,
+            delivery_address='2 Side St',
+            subtotal=20.0,
+            total_amount=25.0,
+            created_at=created_at,
+            updated_at=created_at,
+            **fields
+        )
+        order.order_items = [
+            OrderItem(menu_item_id=item.id, quantity=1, unit_price=item.price, total_price=item.price)
+            for item in restaurant.menu_items
+        ]
+        db.session.add(order)
+        db.session.commit()
+        return order
+    return make
+
+def _make_user(name, user_type):
+    return User(
+        username=f'{name}{next(_order_numbers)}',
+        email=f'{name}{next(_order_numbers)}@example.com',
+        password_hash='unused',
+        first_name=name.title(),
+        last_name='Test',
+        user_type=user_type
+    )
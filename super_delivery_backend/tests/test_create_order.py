@@ -0,0 +1,39 @@
+import pytest
+
+def _order(restaurant, **fields):
+    return {
+        'customer_id': restaurant.test_customer.id,
+        'restaurant_id': restaurant.id,
+        'delivery_address': '2 Side St',
+        'items': [{'menu_item_id': item.id, 'quantity': 2} for item in restaurant.menu_items],
+        **fields
+    }
+
+def test_prices_and_tax_are_computed_on_the_server(client, restaurant):
+    # Menu prices are 10, 11 and 12, two of each
+    response = client.post('/api/orders', json=_order(
+        restaurant, tax_amount=0, tip_amount=5, items=[
+            {'menu_item_id': item.id, 'quantity': 2, 'unit_price': 0.01} for item in restaurant.menu_items
+        ]
+    ))
+
+    assert response.status_code == 201
+    order = response.get_json()
+    assert order['subtotal'] == 66.0
+    assert order['tax_amount'] == 5.28
+    assert order['total_amount'] == round(66.0 + order['delivery_fee'] + 5.28 + 5, 2)
+
+@pytest.mark.parametrize('field', ['tip_amount', 'discount_amount'])
+@pytest.mark.parametrize('value', [-1, 'nan', 'inf', '-inf', 'lots', True])
+def test_tip_and_discount_must_be_non_negative_and_finite(client, restaurant, field, value):
+    response = client.post('/api/orders', json=_order(restaurant, **{field: value}))
+    assert response.status_code == 400
+
+def test_discount_is_capped_at_the_subtotal(client, restaurant):
+    response = client.post('/api/orders', json=_order(restaurant, discount_amount=1000))
+
+    assert response.status_code == 201
+    order = response.get_json()
+    assert order['discount_amount'] == order['subtotal']
+    assert order['total_amount'] == round(order['delivery_fee'] + order['tax_amount'], 2)
+    assert order['total_amount'] >= 0
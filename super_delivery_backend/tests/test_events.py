@@ -0,0 +1,29 @@
+from flask import Flask
+from src.utils.events import EventBroker, init_event_broker
+import os
+import pytest
+
+def test_broker_directory_is_created_private(tmp_path):
+    directory = tmp_path / 'events'
+    EventBroker().configure(str(directory))
+    assert os.stat(directory).st_mode & 0o777 == 0o700
+
+def test_broker_refuses_a_directory_others_can_use(tmp_path):
+    directory = tmp_path / 'events'
+    directory.mkdir()
+    os.chmod(directory, 0o777)
+    with pytest.raises(PermissionError):
+        EventBroker().configure(str(directory))
+
+def test_broker_refuses_a_link(tmp_path):
+    target = tmp_path / 'elsewhere'
+    target.mkdir(mode=0o700)
+    os.symlink(target, tmp_path / 'events')
+    with pytest.raises(PermissionError):
+        EventBroker().configure(str(tmp_path / 'events'))
+
+def test_production_requires_a_broker_directory():
+    app = Flask(__name__)
+    app.config['EVENT_BROKER_DIR'] = None
+    with pytest.raises(RuntimeError):
+        init_event_broker(app)
@@ -0,0 +1,23 @@
+from flask import Flask
+from src.utils.hashing import PasswordHasher
+import pytest
+
+def _configured(**settings):
+    app = Flask(__name__)
+    app.config.update(settings)
+    hasher = PasswordHasher()
+    hasher.configure(app)
+    return hasher
+
+@pytest.mark.parametrize('web_workers, processes, pending, expected', [
+    (1, 8, 32, (8, 32)),
+    (4, 8, 32, (2, 8)),
+    # gunicorn's default of 2N+1 workers on N cores: one process each, not N each
+    (17, 8, 32, (1, 1)),
+    (3, 0, 32, (0, 10))
+])
+def test_pool_and_pending_cap_are_split_between_web_workers(web_workers, processes, pending, expected):
+    hasher = _configured(
+        WEB_CONCURRENCY=web_workers, PASSWORD_HASH_WORKERS=processes, PASSWORD_HASH_MAX_PENDING=pending
+    )
+    assert (hasher.workers, hasher.max_pending) == expected
@@ -0,0 +1,39 @@
+from flask import Flask
+from src.utils.metrics import init_metrics, metrics
+import os
+import pytest
+
+def _app(directory, testing=True):
+    app = Flask(__name__)
+    app.config['METRICS_DIR'] = directory
+    app.testing = testing
+    return app
+
+def test_unset_directory_is_private_to_the_process(app):
+    first = _app(None)
+    init_metrics(first)
+    directory = metrics.directory
+    init_metrics(_app(None))
+
+    assert metrics.directory != directory
+    assert os.stat(metrics.directory).st_mode & 0o777 == 0o700
+
+def test_production_requires_a_directory(app):
+    with pytest.raises(RuntimeError):
+        init_metrics(_app(None, testing=False))
+
+def test_snapshots_are_cleared_unless_a_running_master_owns_the_directory(app, tmp_path):
+    directory = tmp_path / 'deployment'
+    directory.mkdir()
+    (directory / 'metrics_424242.json').write_text('{}')
+    (directory / 'metrics_archive.json').write_text('{}')
+
+    # Started by a gunicorn master: it already cleared the directory for its workers
+    (directory / 'master.pid').write_text(str(os.getppid()))
+    init_metrics(_app(str(directory)))
+    assert (directory / 'metrics_archive.json').exists()
+
+    # Left behind by a master that is gone; the pid is above the kernel's limit
+    (directory / 'master.pid').write_text('4194305')
+    init_metrics(_app(str(directory)))
+    assert sorted(os.listdir(directory)) == ['master.pid']
@@ -0,0 +1,73 @@
+from src.models.user import User, UserType, db
+from flask import Flask
+from src.utils.cache import FileStore, _create_shared_store, _shared_key, _snapshot, cached_get, object_cache
+import os
+import pytest
+
+@pytest.fixture
+def shared_store(tmp_path, monkeypatch):
+    store = FileStore(str(tmp_path / 'cache.db'))
+    monkeypatch.setattr(object_cache, 'shared', store)
+    object_cache.local.clear()
+    yield store
+    object_cache.local.clear()
+
+def test_rows_round_trip_through_the_shared_store_as_json(restaurant, shared_store):
+    driver_id = restaurant.test_driver.id
+    db.session.expunge_all()
+    cached_get(User, driver_id)
+
+    raw = shared_store.get(_shared_key(f'user:{driver_id}', 0))
+    assert raw.startswith('{')
+
+    # Another worker: nothing in its LRU or session, so the row comes from the shared store
+    object_cache.local.clear()
+    db.session.expunge_all()
+    hits = object_cache.stats()['shared_hits']
+    user = cached_get(User, driver_id)
+
+    assert object_cache.stats()['shared_hits'] == hits + 1
+    assert user.user_type is UserType.DRIVER
+    assert user.created_at == db.session.query(User.created_at).filter(User.id == driver_id).scalar()
+
+def test_fill_that_raced_a_commit_is_not_served(restaurant, shared_store):
+    driver = restaurant.test_driver
+    driver_id = driver.id
+    tag = f'user:{driver_id}'
+
+    # A worker reads the shared generation and loads the row...
+    generation, _ = object_cache._shared_get(tag)
+    stale = _snapshot(driver)
+    # ...another commits a change before the first stores what it loaded
+    driver.first_name = 'Renamed'
+    db.session.commit()
+    object_cache._shared_set(tag, generation, stale)
+
+    object_cache.local.clear()
+    db.session.expunge_all()
+    assert cached_get(User, driver_id).first_name == 'Renamed'
+
+def test_file_store_is_private_to_its_owner(tmp_path):
+    path = tmp_path / 'cache.db'
+    FileStore(str(path))
+    assert os.stat(path).st_mode & 0o777 == 0o600
+
+    os.chmod(path, 0o666)
+    with pytest.raises(PermissionError):
+        FileStore(str(path))
+
+def _app(testing, **settings):
+    app = Flask(__name__)
+    app.config.update(settings)
+    app.testing = testing
+    return app
+
+def test_production_requires_a_shared_store():
+    with pytest.raises(RuntimeError):
+        _create_shared_store(_app(False, CACHE_SHARED_BACKEND='file', CACHE_STORE_PATH=None))
+    assert _create_shared_store(_app(False, CACHE_SHARED_BACKEND='none')) is None
+    assert _create_shared_store(_app(True, CACHE_SHARED_BACKEND='file', CACHE_STORE_PATH=None)) is None
+
+def test_production_opens_the_configured_file_store(tmp_path):
+    store = _create_shared_store(_app(False, CACHE_SHARED_BACKEND='file', CACHE_STORE_PATH=str(tmp_path / 'cache.db')))
+    assert isinstance(store, FileStore)
@@ -0,0 +1,41 @@
+from src.models.order import OrderStatus
+from src.routes import order as order_routes
+import threading
+
+DRIVERS = 8
+
+def test_concurrent_claims_take_every_ready_order_exactly_once(app, restaurant, make_order, monkeypatch):
+    # Fewer candidates than drivers, so most claim rounds find every candidate already taken
+    monkeypatch.setattr(order_routes, 'CLAIM_CANDIDATES', 2)
+    ready_ids = [make_order(restaurant, status=OrderStatus.READY_FOR_PICKUP).id for _ in range(40)]
+    make_order(restaurant, status=OrderStatus.PREPARING)
+    driver_id = restaurant.test_driver.id
+
+    start = threading.Barrier(DRIVERS)
+    claimed = []
+    errors = []
+    # Orders still available after a driver was told there were none; claims only ever remove orders
+    left_after_not_found = []
+
+    def drive():
+        client = app.test_client()
+        start.wait()
+        while True:
+            response = client.post('/api/orders/claim', json={'driver_id': driver_id})
+            if response.status_code == 404:
+                left_after_not_found.append(len(client.get('/api/orders/available').get_json()))
+                return
+            if response.status_code != 200:
+                errors.append(response.status_code)
+                return
+            claimed.append(response.get_json()['id'])
+
+    threads = [threading.Thread(target=drive) for _ in range(DRIVERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert left_after_not_found == [0] * DRIVERS
+    assert sorted(claimed) == sorted(ready_ids)
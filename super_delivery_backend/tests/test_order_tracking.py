@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+from src.models.order import OrderStatus
+from src.utils.sql_instrumentation import query_budget
+
+# Orders, then their items with menu items; customers come joined to the orders
+PENDING_ORDERS_QUERIES = 2
+
+def test_pending_orders_query_count_does_not_grow_with_orders(client, restaurant, make_order):
+    for _ in range(10):
+        make_order(restaurant)
+    make_order(restaurant, status=OrderStatus.DELIVERED)
+
+    url = f'/api/orders/restaurant/{restaurant.id}/pending'
+    with query_budget(PENDING_ORDERS_QUERIES):
+        response = client.get(url)
+
+    assert response.status_code == 200
+    orders = response.get_json()['pending_orders']
+    assert len(orders) == 10
+    assert all(len(order['items']) == 3 for order in orders)
+    assert orders[0]['customer_name'] == 'Customer Test'
+
+def test_pending_orders_delta_query_count_does_not_grow_with_orders(client, restaurant, make_order):
+    since = datetime.utcnow() - timedelta(hours=1)
+    make_order(restaurant, created_at=since - timedelta(hours=1))
+    for _ in range(10):
+        make_order(restaurant)
+    # Delta mode also returns orders that left the kitchen queue
+    make_order(restaurant, status=OrderStatus.DELIVERED)
+
+    url = f'/api/orders/restaurant/{restaurant.id}/pending?since={since.isoformat()}'
+    with query_budget(PENDING_ORDERS_QUERIES):
+        response = client.get(url)
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert len(body['pending_orders']) == 11
+    assert body['next_since'] > since.isoformat()
+
+def test_pending_orders_delta_rejects_bad_timestamp(client, restaurant):
+    response = client.get(f'/api/orders/restaurant/{restaurant.id}/pending?since=yesterday')
+    assert response.status_code == 400
+
+def test_order_stream_opens_with_a_snapshot(client, restaurant, make_order):
+    order = make_order(restaurant, status=OrderStatus.PREPARING)
+
+    response = client.get(f'/api/orders/{order.id}/stream', buffered=False)
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    assert next(response.response).startswith(b'event: snapshot\n')
+    response.close()
+
+def test_order_stream_for_finished_order_has_no_content(client, restaurant, make_order):
+    for status in (OrderStatus.DELIVERED, OrderStatus.CANCELLED):
+        order = make_order(restaurant, status=status)
+        response = client.get(f'/api/orders/{order.id}/stream')
+        assert response.status_code == 204
+        assert response.data == b''
+
+def test_tracking_timestamps_are_iso_8601(client, restaurant, make_order):
+    estimated = datetime(2024, 1, 1, 12, 40)
+    order = make_order(restaurant, status=OrderStatus.PREPARING, estimated_delivery_time=estimated)
+    order_id, customer_id = order.id, restaurant.test_customer.id
+
+    tracking = client.get(f'/api/orders/{order_id}/tracking').get_json()['tracking']
+    active = client.get(f'/api/orders/customer/{customer_id}/active').get_json()['active_orders']
+
+    assert tracking['estimated_delivery_time'] == '2024-01-01T12:40:00'
+    assert active[0]['estimated_delivery_time'] == '2024-01-01T12:40:00'
@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+from src.models.user import db
+from src.models.restaurant import Restaurant
+from src.utils.pagination import MAX_PER_PAGE
+import itertools
+import json
+
+def _page_through(client, url, key):
+    """Follow next_cursor from the first page to the last, returning every row"""
+    rows, cursor = [], ''
+    while cursor is not None:
+        response = client.get(f'{url}&cursor={cursor}')
+        assert response.status_code == 200, response.get_json()
+        body = response.get_json()
+        rows.extend(body[key])
+        cursor = body['pagination']['next_cursor']
+    return rows
+
+def test_restaurant_cursor_pages_with_sparse_fieldset(client, restaurant):
+    # Ties on rating make the id part of the sort key matter
+    db.session.add_all([
+        Restaurant(name=f'Place {number}', address='3 High St', rating=float(number % 2), owner_id=restaurant.owner_id)
+        for number in range(5)
+    ])
+    db.session.commit()
+
+    rows = _page_through(client, '/api/restaurants?per_page=2&fields=name', 'restaurants')
+
+    assert sorted(row['name'] for row in rows) == sorted(['Test Kitchen'] + [f'Place {number}' for number in range(5)])
+    assert all(list(row) == ['name'] for row in rows)
+
+def test_order_cursor_pages_with_sparse_fieldset(client, restaurant, make_order):
+    created_at = datetime.utcnow() - timedelta(hours=1)
+    # Orders sharing a timestamp are told apart by id
+    orders = [make_order(restaurant, created_at=created_at) for _ in range(3)]
+    orders += [make_order(restaurant, created_at=created_at + timedelta(minutes=number)) for number in range(2)]
+    order_numbers = sorted(order.order_number for order in orders)
+
+    rows = _page_through(client, '/api/orders?per_page=2&fields=order_number', 'orders')
+
+    assert sorted(row['order_number'] for row in rows) == order_numbers
+    assert all(list(row) == ['order_number'] for row in rows)
+
+def test_cursor_pages_report_the_page_size_used(client, restaurant, make_order):
+    make_order(restaurant)
+    for url, key in (('/api/restaurants', 'restaurants'), ('/api/orders', 'orders')):
+        response = client.get(f'{url}?cursor=&per_page=1000')
+        assert response.get_json()['pagination']['per_page'] == MAX_PER_PAGE
+        response = client.get(f'{url}?cursor=&per_page=0')
+        assert response.get_json()['pagination']['per_page'] == 1
+
+def test_restaurant_search_rejects_cursor(client, restaurant):
+    response = client.get('/api/restaurants?search=pizza&cursor=')
+    assert response.status_code == 400
+    assert client.get('/api/restaurants?search=pizza').status_code == 200
+
+def test_order_list_returns_the_newest_page_and_links_the_next(client, restaurant, make_order):
+    created_at = datetime.utcnow() - timedelta(hours=1)
+    orders = [make_order(restaurant, created_at=created_at + timedelta(minutes=number)) for number in range(3)]
+
+    response = client.get('/api/orders?per_page=2&fields=order_number')
+
+    assert response.status_code == 200
+    assert response.get_json() == [{'order_number': order.order_number} for order in orders[:0:-1]]
+    next_url = response.headers['Link'].split('>', 1)[0].lstrip('<')
+    body = client.get(next_url).get_json()
+    assert body['orders'] == [{'order_number': orders[0].order_number}]
+    assert body['pagination']['has_next'] is False
+
+    assert 'Link' not in client.get('/api/orders').headers
+
+def test_order_list_failure_is_an_error_response(client, restaurant, make_order, monkeypatch):
+    make_order(restaurant)
+    make_order(restaurant)
+    monkeypatch.setattr('src.routes.order.serialize_row', _fail_after_first_row())
+
+    response = client.get('/api/orders')
+
+    assert response.status_code == 500
+    assert 'error' in response.get_json()
+
+def test_order_stream_failure_ends_with_an_error_line(client, restaurant, make_order, monkeypatch):
+    make_order(restaurant)
+    make_order(restaurant)
+    monkeypatch.setattr('src.routes.order.serialize_row', _fail_after_first_row())
+
+    lines = client.get('/api/orders?format=ndjson').get_data(as_text=True).splitlines()
+
+    assert len(lines) == 2
+    assert json.loads(lines[-1]) == {'error': 'Failed to stream orders'}
+
+def _fail_after_first_row():
+    rows = itertools.count()
+    def serialize_row(row, fields):
+        if next(rows):
+            raise RuntimeError('serialization failed')
+        return {'id': row.id}
+    return serialize_row
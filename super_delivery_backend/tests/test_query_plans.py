@@ -0,0 +1,39 @@
+from src.models.user import db
+from src.models.restaurant import Restaurant
+from src.utils.search import apply_restaurant_search
+from src.utils.migrations import applied_versions, load_migrations
+from src.utils.query_plans import explain, full_scans, hot_queries
+import pytest
+
+HOT_QUERIES = hot_queries()
+
+def test_testing_database_is_fully_migrated(app):
+    with db.engine.begin() as connection:
+        assert applied_versions(connection) == {migration.version for migration in load_migrations()}
+
+@pytest.mark.parametrize('statement', [statement for _, statement in HOT_QUERIES], ids=[name for name, _ in HOT_QUERIES])
+def test_hot_query_reads_no_large_table_in_full(app, statement):
+    with db.engine.connect() as connection:
+        plan = explain(connection, statement)
+        assert full_scans(connection, plan) == [], '\n'.join(plan)
+
+@pytest.mark.parametrize('name', ['order.get_orders', 'order.get_orders customer', 'order.get_orders restaurant'])
+def test_order_listing_pages_read_in_index_order(app, name):
+    with db.engine.connect() as connection:
+        plan = explain(connection, dict(HOT_QUERIES)[name])
+        assert not any('TEMP B-TREE' in line for line in plan), '\n'.join(plan)
+
+def test_restaurant_cursor_page_seeks_the_rating_index(app):
+    statement = dict(HOT_QUERIES)['restaurant.get_restaurants cursor']
+    with db.engine.connect() as connection:
+        plan = explain(connection, statement)
+        assert any('ix_restaurant_is_active_rating_id (is_active=? AND <expr><?)' in line for line in plan), '\n'.join(plan)
+        assert not any('TEMP B-TREE' in line for line in plan), '\n'.join(plan)
+
+def test_search_runs_the_full_text_match_once(app):
+    query = apply_restaurant_search(Restaurant.query.filter(Restaurant.is_active == True), 'pizza')
+    for statement in (query.limit(20).statement, query.order_by(None).statement.with_only_columns(db.func.count())):
+        with db.engine.connect() as connection:
+            plan = explain(connection, statement)
+            # The match drives the join rather than running once per restaurant row
+            assert plan[0].startswith('SCAN restaurant_search VIRTUAL TABLE'), '\n'.join(plan)
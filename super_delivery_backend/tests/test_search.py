@@ -0,0 +1,100 @@
+from sqlalchemy import text
+from src.models.user import db
+from src.models.restaurant import Restaurant
+from src.models.menu_item import MenuItem
+from src.utils.search import apply_restaurant_search, rebuild_search_index
+import pytest
+
+def _search(search):
+    return [restaurant.id for restaurant in apply_restaurant_search(Restaurant.query, search).all()]
+
+def _indexed_ids():
+    return set(db.session.execute(text("SELECT rowid FROM restaurant_search")).scalars())
+
+def _add_restaurant(owner_id, name, **fields):
+    restaurant = Restaurant(name=name, address='3 Search St', owner_id=owner_id, **fields)
+    db.session.add(restaurant)
+    db.session.commit()
+    return restaurant
+
+def test_new_restaurants_and_dishes_are_indexed(restaurant):
+    assert _search('test kitchen') == [restaurant.id]
+    assert _search('pizza') == [restaurant.id]
+    assert _search('dish') == [restaurant.id]
+
+    other = _add_restaurant(restaurant.owner_id, 'Noodle Bar')
+    db.session.add(MenuItem(name='Laksa', price=9.0, restaurant_id=other.id))
+    db.session.commit()
+
+    assert _search('laksa') == [other.id]
+    # Every token is matched as a prefix
+    assert _search('nood') == [other.id]
+
+def test_updates_replace_the_indexed_text(restaurant):
+    restaurant.name = 'Curry House'
+    db.session.commit()
+
+    assert _search('kitchen') == []
+    assert _search('curry') == [restaurant.id]
+
+    other = _add_restaurant(restaurant.owner_id, 'Noodle Bar')
+    dish = restaurant.menu_items[0]
+    dish.restaurant_id = other.id
+    db.session.commit()
+
+    # A dish moved to another restaurant leaves the old document
+    assert _search('dish 0') == [other.id]
+    assert _search('dish 1') == [restaurant.id]
+
+def test_deletes_remove_index_rows(restaurant):
+    other = _add_restaurant(restaurant.owner_id, 'Noodle Bar')
+    db.session.add(MenuItem(name='Laksa', price=9.0, restaurant_id=other.id))
+    db.session.commit()
+
+    db.session.delete(other.menu_items[0])
+    db.session.commit()
+    assert _search('laksa') == []
+    assert _search('noodle') == [other.id]
+
+    other_id = other.id
+    db.session.delete(other)
+    db.session.commit()
+    assert _indexed_ids() == {restaurant.id}
+    assert other_id not in _search('noodle')
+
+def test_rolled_back_changes_leave_the_index_alone(restaurant):
+    restaurant.name = 'Curry House'
+    db.session.flush()
+    assert _search('curry') == [restaurant.id]
+    db.session.rollback()
+
+    assert _search('curry') == []
+    assert _search('kitchen') == [restaurant.id]
+
+def test_name_outranks_cuisine_description_and_dishes(restaurant):
+    owner_id = restaurant.owner_id
+    by_dish = _add_restaurant(owner_id, 'Corner Cafe')
+    db.session.add(MenuItem(name='Ramen Bowl', price=12.0, restaurant_id=by_dish.id))
+    by_description = _add_restaurant(owner_id, 'Harbour Grill', description='Late night ramen and grill')
+    by_cuisine = _add_restaurant(owner_id, 'Tokyo Street', cuisine_type='Ramen')
+    by_name = _add_restaurant(owner_id, 'Ramen Republic')
+    db.session.commit()
+
+    assert _search('ramen') == [by_name.id, by_cuisine.id, by_description.id, by_dish.id]
+
+def test_search_endpoint_returns_ranked_matches(client, restaurant):
+    by_name = _add_restaurant(restaurant.owner_id, 'Pizza Palace')
+
+    response = client.get('/api/restaurants?search=pizza')
+
+    assert response.status_code == 200
+    assert [item['id'] for item in response.get_json()['restaurants']] == [by_name.id, restaurant.id]
+
+@pytest.mark.parametrize('search', ['pizza"', '(pizza)', 'pizza*', 'pizza:', '-pizza', '^pizza', '{pizza}'])
+def test_query_syntax_in_search_text_is_treated_as_words(restaurant, search):
+    assert _search(search) == [restaurant.id]
+
+def test_rebuild_matches_the_incremental_index(restaurant):
+    before = _search('dish')
+    assert rebuild_search_index() == 1
+    assert _search('dish') == before
@@ -0,0 +1,57 @@
+from datetime import datetime
+from src.models.user import User, db
+from src.models.restaurant import Restaurant
+from src.models.menu_item import MenuItem
+from src.models.order import Order, OrderStatus
+from src.utils import serialization
+from src.utils.serialization import select_fields, serialize, serialize_row
+import pytest
+
+@pytest.fixture(params=['orjson', 'stdlib'])
+def encoder(request, monkeypatch):
+    if request.param == 'orjson':
+        if serialization.orjson is None:
+            pytest.skip('orjson is not installed')
+    else:
+        monkeypatch.setattr(serialization, 'orjson', None)
+    return request.param
+
+def _encoded(app, payload):
+    return app.json.loads(app.json.dumps(payload))
+
+@pytest.mark.parametrize('model, fields', [
+    (Order, None),
+    (Order, ('status', 'created_at', 'total_amount')),
+    (Restaurant, None),
+    (Restaurant, ('name', 'rating')),
+    (MenuItem, None),
+    (User, None),
+    (User, ('user_type', 'last_login')),
+])
+def test_row_path_encodes_like_to_dict(app, restaurant, make_order, encoder, model, fields):
+    make_order(restaurant, status=OrderStatus.PREPARING, confirmed_at=datetime(2024, 5, 1, 12, 30, 15, 250000))
+    restaurant.rating = 4.25
+    restaurant.test_customer.last_login = datetime(2024, 5, 1, 9, 0)
+    db.session.commit()
+
+    query, output_fields = select_fields(model.query.order_by(model.id), model, fields)
+    rows = query.all()
+    instances = model.query.order_by(model.id).all()
+    assert len(rows) == len(instances) > 0
+
+    for row, instance in zip(rows, instances):
+        expected = instance.to_dict()
+        if fields:
+            expected = {field: expected[field] for field in fields}
+        assert list(serialize_row(row, output_fields)) == list(expected)
+        assert _encoded(app, serialize_row(row, output_fields)) == _encoded(app, expected)
+        assert _encoded(app, serialize(instance, fields)) == _encoded(app, expected)
+
+def test_required_columns_are_selected_but_not_serialized(app, restaurant, make_order):
+    make_order(restaurant)
+    query, fields = select_fields(Order.query, Order, ('order_number',), required=('created_at', 'id'))
+    row = query.one()
+
+    assert fields == ('order_number',)
+    assert serialize_row(row, fields) == {'order_number': row.order_number}
+    assert row.created_at is not None and row.id is not None
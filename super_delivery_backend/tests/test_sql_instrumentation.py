@@ -0,0 +1,43 @@
+from sqlalchemy import text
+from src.models.user import db
+from src.utils.sql_instrumentation import QueryBudgetExceeded, fingerprint, query_budget
+import pytest
+
+def test_query_budget_counts_statements_within_budget(app):
+    with query_budget(2) as stats:
+        db.session.execute(text('SELECT 1')).all()
+        db.session.execute(text('SELECT 2')).all()
+    assert stats.count == 2
+
+def test_query_budget_fails_with_the_statements_that_ran(app):
+    with pytest.raises(QueryBudgetExceeded) as failure:
+        with query_budget(1):
+            for value in range(3):
+                db.session.execute(text('SELECT :value'), {'value': value}).all()
+    assert 'Ran 3 queries, budget is 1' in str(failure.value)
+    assert '3 x SELECT ?' in str(failure.value)
+
+def test_query_budget_does_not_mask_errors_from_the_block(app):
+    with pytest.raises(ZeroDivisionError):
+        with query_budget(0):
+            db.session.execute(text('SELECT 1')).all()
+            1 / 0
+
+def test_nested_query_budgets_each_count_their_own_block(app):
+    with query_budget(3) as outer:
+        db.session.execute(text('SELECT 1')).all()
+        with query_budget(1) as inner:
+            db.session.execute(text('SELECT 2')).all()
+    assert (outer.count, inner.count) == (2, 1)
+
+def test_query_budget_as_decorator(app):
+    @query_budget(0)
+    def runs_a_query():
+        db.session.execute(text('SELECT 1')).all()
+
+    with pytest.raises(QueryBudgetExceeded):
+        runs_a_query()
+
+def test_fingerprint_collapses_values_and_in_lists():
+    assert fingerprint("SELECT * FROM t WHERE a = 5 AND b = 'x'") == 'SELECT * FROM t WHERE a = ? AND b = ?'
+    assert fingerprint('SELECT * FROM t WHERE id IN (?, ?, ?)') == fingerprint('SELECT * FROM t WHERE id IN (?)')
@@ -0,0 +1,73 @@
+from flask import Flask
+from src.utils import static_files
+from src.utils.static_files import StaticManifest
+import os
+import pytest
+
+@pytest.fixture
+def folder(tmp_path):
+    (tmp_path / 'assets').mkdir()
+    (tmp_path / 'index.html').write_text('<html></html>')
+    (tmp_path / 'assets' / 'app-abcd1234.js').write_text('console.log(1)')
+    (tmp_path / 'assets' / 'app-abcd1234.js.gz').write_bytes(b'gzipped')
+    return tmp_path
+
+@pytest.fixture
+def hashed(monkeypatch):
+    """Filenames whose content is hashed, in order"""
+    calls = []
+    content_hash = static_files._content_hash
+    def counting_hash(filename):
+        calls.append(os.path.basename(filename))
+        return content_hash(filename)
+    monkeypatch.setattr(static_files, '_content_hash', counting_hash)
+    return calls
+
+def _manifest(folder, debug=True):
+    app = Flask(__name__, static_folder=str(folder))
+    app.debug = debug
+    manifest = StaticManifest()
+    manifest.configure(app)
+    return manifest
+
+def test_unchanged_folder_is_not_rehashed(folder, hashed):
+    manifest = _manifest(folder)
+    assert sorted(hashed) == ['app-abcd1234.js', 'app-abcd1234.js.gz', 'index.html']
+    files = manifest.files
+
+    for _ in range(3):
+        manifest.lookup('index.html')
+
+    assert len(hashed) == 3
+    assert manifest.files is files
+    assert manifest.lookup('assets/app-abcd1234.js').variants['gzip'].filename.endswith('.gz')
+
+def test_only_changed_files_are_rehashed(folder, hashed):
+    manifest = _manifest(folder)
+    etag = manifest.lookup('index.html').etag
+    script_etag = manifest.lookup('assets/app-abcd1234.js').etag
+    hashed.clear()
+
+    (folder / 'index.html').write_text('<html>rebuilt</html>')
+    (folder / 'robots.txt').write_text('User-agent: *')
+
+    assert manifest.lookup('index.html').etag != etag
+    assert manifest.lookup('robots.txt').mimetype == 'text/plain'
+    assert sorted(hashed) == ['index.html', 'robots.txt']
+    assert manifest.lookup('assets/app-abcd1234.js').etag == script_etag
+
+def test_removed_files_leave_the_index(folder, hashed):
+    manifest = _manifest(folder)
+    (folder / 'assets' / 'app-abcd1234.js.gz').unlink()
+
+    assert manifest.lookup('assets/app-abcd1234.js').variants == {}
+    # Unknown paths fall back to the app's entry point
+    assert manifest.lookup('assets/app-abcd1234.js.gz').filename.endswith('index.html')
+
+def test_production_index_is_built_once(folder, hashed):
+    manifest = _manifest(folder, debug=False)
+    (folder / 'index.html').write_text('<html>rebuilt</html>')
+
+    manifest.lookup('index.html')
+
+    assert len(hashed) == 3
@@ -9,7 +9,6 @@ import { useToast } from '@/hooks/useToast.js';
 const ActiveOrders = ({ customerId, isOpen, onClose }) => {
   const [activeOrders, setActiveOrders] = useState([]);
   const [selectedOrderId, setSelectedOrderId] = useState(null);
-  const [refreshInterval, setRefreshInterval] = useState(null);
   const { get, loading, error } = useApi();
   const { toast } = useToast();
 
@@ -17,15 +16,14 @@ const ActiveOrders = ({ customerId, isOpen, onClose }) => {
     if (isOpen && customerId) {
       fetchActiveOrders();
       
-      // Set up auto-refresh every 60 seconds
-      const interval = setInterval(() => {
+      // One stream per customer; reload the list whenever any of their orders changes
+      const events = new EventSource(`/api/orders/customer/${customerId}/stream`);
+      events.addEventListener('status', () => {
         fetchActiveOrders();
-      }, 60000);
-      
-      setRefreshInterval(interval);
+      });
       
       return () => {
-        if (interval) clearInterval(interval);
+        events.close();
       };
     }
   }, [isOpen, customerId]);
@@ -179,7 +177,11 @@ const ActiveOrders = ({ customerId, isOpen, onClose }) => {
                           
                           <div>
                             <p className="text-sm text-gray-600">Estimated Delivery</p>
-                            <p className="font-medium">{order.estimated_delivery_time} min</p>
+                            <p className="font-medium">
+                              {order.estimated_delivery_time
+                                ? new Date(order.estimated_delivery_time).toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' })
+                                : 'Pending'}
+                            </p>
                           </div>
                         </div>
                         
@@ -7,24 +7,32 @@ import { useToast } from '@/hooks/useToast.js';
 
 const OrderTracking = ({ orderId, onClose }) => {
   const [trackingData, setTrackingData] = useState(null);
-  const [refreshInterval, setRefreshInterval] = useState(null);
   const { get, loading, error } = useApi();
   const { toast } = useToast();
 
   useEffect(() => {
     fetchTrackingData();
     
-    // Set up auto-refresh every 30 seconds for active orders
-    const interval = setInterval(() => {
-      if (trackingData && !['delivered', 'cancelled'].includes(trackingData.status)) {
-        fetchTrackingData();
+    // Refresh only when the server pushes a status change for this order.
+    // The server answers a finished order with 204, which stops reconnects;
+    // closing on a final status also covers the stream ending on its own.
+    const events = new EventSource(`/api/orders/${orderId}/stream`);
+    const closeIfFinished = (update) => {
+      if (['delivered', 'cancelled'].includes(update.status)) {
+        events.close();
       }
-    }, 30000);
-    
-    setRefreshInterval(interval);
+    };
+    events.addEventListener('snapshot', (event) => {
+      closeIfFinished(JSON.parse(event.data));
+    });
+    events.addEventListener('status', (event) => {
+      const update = JSON.parse(event.data);
+      fetchTrackingData();
+      closeIfFinished(update);
+    });
     
     return () => {
-      if (interval) clearInterval(interval);
+      events.close();
     };
   }, [orderId]);
 
@@ -1,11 +1,48 @@
 import { defineConfig } from 'vite'
 import react from '@vitejs/plugin-react'
 import tailwindcss from '@tailwindcss/vite'
+import fs from 'fs'
 import path from 'path'
+import zlib from 'zlib'
+
+// Write .br and .gz variants of text assets for the backend to serve as-is
+function precompress({ extensions = ['.js', '.css', '.html', '.svg', '.json'], minSize = 1024 } = {}) {
+  let outDir
+  return {
+    name: 'precompress',
+    apply: 'build',
+    configResolved(config) {
+      outDir = path.resolve(config.root, config.build.outDir)
+    },
+    closeBundle() {
+      const walk = (dir) => fs.readdirSync(dir, { withFileTypes: true }).flatMap((entry) => {
+        const file = path.join(dir, entry.name)
+        return entry.isDirectory() ? walk(file) : [file]
+      })
+      for (const file of walk(outDir)) {
+        if (!extensions.includes(path.extname(file))) continue
+        const source = fs.readFileSync(file)
+        if (source.length < minSize) continue
+        const variants = {
+          '.br': zlib.brotliCompressSync(source, {
+            params: {
+              [zlib.constants.BROTLI_PARAM_QUALITY]: zlib.constants.BROTLI_MAX_QUALITY,
+              [zlib.constants.BROTLI_PARAM_SIZE_HINT]: source.length,
+            },
+          }),
+          '.gz': zlib.gzipSync(source, { level: zlib.constants.Z_BEST_COMPRESSION }),
+        }
+        for (const [suffix, compressed] of Object.entries(variants)) {
+          if (compressed.length < source.length) fs.writeFileSync(file + suffix, compressed)
+        }
+      }
+    },
+  }
+}
 
 // https://vite.dev/config/
 export default defineConfig({
-  plugins: [react(),tailwindcss()],
+  plugins: [react(),tailwindcss(),precompress()],
   resolve: {
     alias: {
       "@": path.resolve(__dirname, "./src"),